@@ -23,6 +23,7 @@ Each dataset is defined as a `tfds.DatasetBuilder`.
 
 # pylint: disable=g-multiple-import
 from tensorflow_datasets.core import download
+from tensorflow_datasets.core import metrics
 from tensorflow_datasets.core.dataset_builder import DatasetBuilder
 from tensorflow_datasets.core.dataset_builder import Split
 from tensorflow_datasets.core.download import GenerateMode
@@ -39,5 +40,6 @@ __all__ = [
     "list_builders",
     "load",
     "download",
+    "metrics",
     "GenerateMode",
 ]
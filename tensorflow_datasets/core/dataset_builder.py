@@ -22,18 +22,27 @@ from __future__ import print_function
 import abc
 import collections
 import datetime
+import functools
+import itertools
 import os
 import enum
 
+import concurrent.futures
 import six
+from six.moves import cPickle
 import tensorflow as tf
 
 from tensorflow_datasets.core import api_utils
+from tensorflow_datasets.core import dataset_info
 from tensorflow_datasets.core import dataset_utils
 from tensorflow_datasets.core import download
 from tensorflow_datasets.core import file_format_adapter
 from tensorflow_datasets.core import naming
 from tensorflow_datasets.core import registered
+from tensorflow_datasets.core import statistics
+from tensorflow_datasets.core import subsplits
+from tensorflow_datasets.core.utils import py_utils
+from tensorflow_datasets.core.utils import tf_utils
 
 __all__ = [
     "Split",
@@ -55,9 +64,9 @@ class Split(enum.Enum):
 
   Note that for datasets without a `VALIDATION` split, you should use a fraction
   of the `TRAIN` data for evaluation as you iterate on your model so as not to
-  overfit to the `TEST` data. You can do so by...
-
-  TODO(rsepassi): update when as_dataset supports this.
+  overfit to the `TEST` data. You can do so by reading slices of the `TRAIN`
+  split, e.g. `as_dataset(split="train[:90%]")` for training and
+  `as_dataset(split="train[90%:]")` for evaluation.
 
   * `TRAIN`: the training data.
   * `VALIDATION`: the validation data. If present, this is typically used as
@@ -75,31 +84,53 @@ class SplitFiles(object):
   """Utility to produce filepaths and filepatterns for a Split."""
 
   def __init__(self, dataset_name, split, num_shards, data_dir,
-               filetype_suffix=None):
+               filetype_suffix=None, shard_size=None):
     """Constructs a SplitFiles object.
 
     Args:
       dataset_name: `str`, name of the dataset. Typically `DatasetBuilder.name`.
       split: `tfds.Split`, which split of the dataset.
-      num_shards: `int`, number of file shards for this split on disk.
+      num_shards: `int`, number of file shards for this split on disk. Should be
+        None if `shard_size` is given.
       data_dir: `str`, directory containing the data files.
       filetype_suffix: `str`, if provided, will be added to the filenames before
         the sharding specification (e.g.
         "foo_dataset-train.csv-00000-of-00001").
+      shard_size: `int`, if provided, target size in bytes of the file shards.
+        The split is written in as many shards as needed, and `num_shards` is
+        set once the split has been written.
+
+    Raises:
+      ValueError: if both `num_shards` and `shard_size` are given.
     """
+    if num_shards and shard_size:
+      raise ValueError("Only one of num_shards and shard_size can be defined.")
     self.dataset_name = dataset_name
     self.split = split
     self.num_shards = num_shards
     self.data_dir = data_dir
     self.filetype_suffix = filetype_suffix
+    self.shard_size = shard_size
+    # Number of examples of each shard, set once the split has been written
+    self.shard_lengths = None
+    # `FeatureStatistics` of the examples, accumulated while writing the split
+    self.statistics = None
 
   @property
   def filepaths(self):
     """Returns list of filepaths for this split."""
+    if self.num_shards is None:
+      raise ValueError(
+          "The number of shards of split %s is only known once the split has "
+          "been written." % self.split.value)
+    return self.sharded_filepaths(self.num_shards)
+
+  def sharded_filepaths(self, num_shards):
+    """Returns list of filepaths for this split with `num_shards` shards."""
     return naming.filepaths_for_dataset_split(
         dataset_name=self.dataset_name,
         split=self.split,
-        num_shards=self.num_shards,
+        num_shards=num_shards,
         data_dir=self.data_dir,
         filetype_suffix=self.filetype_suffix)
 
@@ -113,6 +144,8 @@ class SplitFiles(object):
         filetype_suffix=self.filetype_suffix)
 
   def exists(self):
+    if self.num_shards is None:
+      return False
     return file_format_adapter.do_files_exist(self.filepaths)
 
 
@@ -151,7 +184,8 @@ class DatasetBuilder(object):
     self._data_dir = self._get_data_dir()
 
   @api_utils.disallow_positional_args
-  def download_and_prepare(self, cache_dir=None, dl_manager=None):
+  def download_and_prepare(self, cache_dir=None, dl_manager=None,
+                           executor=None):
     """Downloads and prepares dataset for reading.
 
     Subclasses must override _download_and_prepare.
@@ -161,6 +195,11 @@ class DatasetBuilder(object):
         a default tmp directory will be used.
       dl_manager (DownloadManager): DownloadManager to use. Only one of
         dl_manager and cache_dir can be set
+      executor (concurrent.futures.Executor): If given, the executor runs the
+        parallel parts of the generation (e.g.
+        `concurrent.futures.ProcessPoolExecutor()`). It is not shutdown. By
+        default, the generation runs in the current process. Only passed to
+        `_download_and_prepare` if given.
 
     Raises:
       ValueError: If the user defines both cache_dir and dl_manager
@@ -176,6 +215,15 @@ class DatasetBuilder(object):
     if cache_dir:
       dl_manager = download.DownloadManager(cache_dir=cache_dir)
 
+    # Only one process at a time generates the dataset. The other ones wait and
+    # reuse the generated data.
+    with self._lock_generation():
+      # The dataset may have been generated while waiting for the lock
+      self._data_dir = self._get_data_dir()
+      self._download_and_prepare_new_version(dl_manager, executor)
+
+  def _download_and_prepare_new_version(self, dl_manager, executor):
+    """Generates a new version of the dataset (unless it can be reused)."""
     # If the dataset already exists (data_dir not empty) and that we do not
     # overwrite the dataset
     if (self._data_dir and
@@ -183,24 +231,41 @@ class DatasetBuilder(object):
       tf.logging.info("Reusing dataset %s (%s)", self.name, self._data_dir)
       return
 
-    # Otherwise, create a new version in a new data_dir.
-    curr_date = datetime.datetime.now()
-    version_str = curr_date.strftime("v_%Y%m%d_%H%M")
-    data_dir = self._get_data_dir(version=version_str)
-    tf.logging.info("Generating dataset %s (%s)", self.name, data_dir)
-
-    # Wrap the Dataset generation in a .incomplete directory
-    with file_format_adapter.incomplete_dir(data_dir) as data_dir_tmp:
-      # TODO(epot): Data_dir should be an argument of download_and_prepare.
-      # Modify this once a better split API exists.
-      self._data_dir = data_dir_tmp
-      self._download_and_prepare(dl_manager)
-      self._data_dir = data_dir
-
-  # TODO(rsepassi): Make it easy to further shard the TRAIN data (e.g. for
-  # synthetic VALIDATION splits).
+    # Otherwise, resume the interrupted generation of a version, or create a
+    # new version in a new data_dir.
+    data_dir = self._get_interrupted_data_dir()
+    if (data_dir and
+        dl_manager.mode == download.GenerateMode.FORCE_REDOWNLOAD):
+      tf.logging.info("Deleting the interrupted generation of %s (%s)",
+                      self.name, data_dir)
+      tf.gfile.DeleteRecursively(
+          file_format_adapter.get_resumable_path(data_dir))
+      data_dir = None
+    if data_dir:
+      tf.logging.info("Resuming the generation of dataset %s (%s)", self.name,
+                      data_dir)
+    else:
+      curr_date = datetime.datetime.now()
+      version_str = curr_date.strftime("v_%Y%m%d_%H%M")
+      data_dir = self._get_data_dir(version=version_str)
+      tf.logging.info("Generating dataset %s (%s)", self.name, data_dir)
+
+    # Wrap the Dataset generation in a .incomplete directory, kept if the
+    # generation is interrupted. The cached downloads are pinned so they cannot
+    # be evicted during the generation.
+    with dl_manager.pin_trials():
+      with file_format_adapter.resumable_dir(data_dir) as data_dir_tmp:
+        # TODO(epot): Data_dir should be an argument of download_and_prepare.
+        # Modify this once a better split API exists.
+        self._data_dir = data_dir_tmp
+        # Subclasses overriding the previous `_download_and_prepare(self,
+        # dl_manager)` can still be generated without an executor
+        kwargs = {} if executor is None else {"executor": executor}
+        self._download_and_prepare(dl_manager, **kwargs)
+        self._data_dir = data_dir
+
   @api_utils.disallow_positional_args
-  def as_dataset(self, split, shuffle_files=None):
+  def as_dataset(self, split, shuffle_files=None, features=None):
     """Constructs a `tf.data.Dataset`.
 
     Callers must pass arguments as keyword arguments.
@@ -208,14 +273,24 @@ class DatasetBuilder(object):
     Subclasses must override _as_dataset.
 
     Args:
-      split: `tfds.Split`, which subset of the data to read.
+      split: `tfds.Split` or `str`, which subset of the data to read. A slice
+        of a split can be given as a string of example indices (e.g.
+        `"train[5000:10000]"`) or of percentages of the split (e.g.
+        `"train[:10%]"`). Only the files containing the slice are read.
       shuffle_files: `bool` (optional), whether to shuffle the input files.
-        Defaults to `True` if `split == tfds.Split.TRAIN` and `False` otherwise.
+        Defaults to `True` if `split` is `tfds.Split.TRAIN` (or a slice of it)
+        and `False` otherwise.
+      features: `list<str>` (optional), names of the stored features to read.
+        Defaults to all the features. With a columnar file format, the other
+        features are not even read from disk.
 
     Returns:
       `tf.data.Dataset`
     """
-    return self._as_dataset(split=split, shuffle_files=shuffle_files)
+    # Only passed if given, for the subclasses overriding the previous
+    # signature `_as_dataset(self, split, shuffle_files)`
+    kwargs = {} if features is None else {"features": features}
+    return self._as_dataset(split=split, shuffle_files=shuffle_files, **kwargs)
 
   def numpy_iterator(self, **as_dataset_kwargs):
     """Generates numpy elements from the given `tfds.Split`.
@@ -241,6 +316,13 @@ class DatasetBuilder(object):
       with tf.Graph().as_default():
         return iterate()
 
+  def _lock_generation(self):
+    """Lock shared by all the processes generating this dataset."""
+    lock_dir = os.path.join(self._data_dir_root, ".locks")
+    if not tf.gfile.Exists(lock_dir):
+      tf.gfile.MakeDirs(lock_dir)
+    return py_utils.file_lock(os.path.join(lock_dir, self.name + ".lock"))
+
   def _get_data_dir(self, version=None):
     """Return the data directory of one dataset version.
 
@@ -270,13 +352,29 @@ class DatasetBuilder(object):
     # No directory found
     return None
 
+  def _get_interrupted_data_dir(self):
+    """Return the data directory of an interrupted generation (or None)."""
+    data_root_dir = os.path.join(self._data_dir_root, self.name)
+    if not tf.gfile.Exists(data_root_dir):
+      return None
+    suffix = file_format_adapter.RESUMABLE_SUFFIX
+    interrupted_dirnames = [
+        f.rstrip("/")[:-len(suffix)]
+        for f in sorted(tf.gfile.ListDirectory(data_root_dir))
+        if f.rstrip("/").endswith(suffix)
+    ]
+    if interrupted_dirnames:
+      return os.path.join(data_root_dir, interrupted_dirnames[-1])
+    return None
+
   def _split_files(self, **kwargs):
+    kwargs.setdefault("num_shards", None)
     kwargs["dataset_name"] = self.name
     kwargs["data_dir"] = self._data_dir
     return SplitFiles(**kwargs)
 
   @abc.abstractmethod
-  def _download_and_prepare(self, dl_manager):
+  def _download_and_prepare(self, dl_manager, executor=None):
     """Downloads and prepares dataset for reading.
 
     This is the internal implementation to overwritte called when user call
@@ -286,11 +384,15 @@ class DatasetBuilder(object):
     Args:
       dl_manager (DownloadManager): `DownloadManager` used to download and cache
         data.
+      executor (concurrent.futures.Executor): if given, executor to run the
+        independent parts of the generation in parallel. Only passed if given
+        to `download_and_prepare`, so subclasses without parallel parts can
+        omit it.
     """
     raise NotImplementedError
 
   @abc.abstractmethod
-  def _as_dataset(self, split, shuffle_files=None):
+  def _as_dataset(self, split, shuffle_files=None, features=None):
     """Constructs a `tf.data.Dataset`.
 
     This is the internal implementation to overwritte called when user call
@@ -298,9 +400,14 @@ class DatasetBuilder(object):
     the `tf.data.Dataset` object.
 
     Args:
-      split (`tfds.Split`): which subset of the data to read.
+      split (`tfds.Split` or `str`): which subset (or slice of a subset, e.g.
+        `"train[:10%]"`) of the data to read.
       shuffle_files (bool): whether to shuffle the input files. Optional,
-        defaults to `True` if `split == tfds.Split.TRAIN` and `False` otherwise.
+        defaults to `True` for the `tfds.Split.TRAIN` split and `False`
+        otherwise.
+      features (list<str>): names of the stored features to read. Optional,
+        defaults to all the features. Only passed if given by the caller, so
+        subclasses not supporting the selection of features can omit it.
 
     Returns:
       `tf.data.Dataset`
@@ -308,16 +415,26 @@ class DatasetBuilder(object):
     raise NotImplementedError
 
 
-class SplitGenerator(collections.namedtuple("_SplitGenerator",
-                                            ["generator_fn", "split_files"])):
+class SplitGenerator(collections.namedtuple(
+    "_SplitGenerator", ["generator_fn", "split_files", "work_units"])):
   """Contains a generator to produce examples across splits.
 
   Args:
-    generator_fn: function with no arguments yielding feature dictionaries.
+    generator_fn: function with no arguments yielding feature dictionaries. If
+      `work_units` is given, function taking one work unit and yielding its
+      feature dictionaries.
     split_files: `list<SplitFiles>`, splits that the examples from
       `generator_fn` should be sharded across.
+    work_units: `list` (optional), partition of the source data (e.g. the files
+      of a `download_and_extract` output) whose examples can be generated
+      independently. Each work unit is written to its own shards, possibly in
+      parallel. See `GeneratorBasedDatasetBuilder._dataset_split_generators`.
   """
 
+  def __new__(cls, generator_fn, split_files, work_units=None):
+    return super(SplitGenerator, cls).__new__(
+        cls, generator_fn, split_files, work_units)
+
   def output_files_exist(self):
     """Whether all the specified output files exist."""
     return all([split.exists() for split in self.split_files])
@@ -346,7 +463,10 @@ class GeneratorBasedDatasetBuilder(DatasetBuilder):
 
   Minimally, subclasses must override `_dataset_split_generators` and
   `_file_format_adapter`. Subclasses may also override `_preprocess` if they
-  wish to do further runtime pre-processing on the `tf.data.Dataset`.
+  wish to do further runtime pre-processing on the `tf.data.Dataset`,
+  `_shuffle_config` to shuffle the generated examples before writing them,
+  `_checkpoint_shards` to resume interrupted generations shard by shard, and
+  `_num_parallel_calls` to set the parallelism of the decoding.
 
   `FileFormatAdapter`s are defined in
   `tensorflow_datasets.core.file_format_adapter` and specify constraints on the
@@ -393,6 +513,42 @@ class GeneratorBasedDatasetBuilder(DatasetBuilder):
     (`self._split_files(split=Split.TRAIN, num_shards=10)`) which fills in
     common fields.
 
+    Instead of a fixed number of shards, a `SplitFiles` can specify the target
+    size in bytes of its shards (`self._split_files(split=Split.TRAIN,
+    shard_size=256 * 1024**2)`). The number of shards is then chosen during the
+    generation. Such a split must be the only one of its `SplitGenerator`.
+
+    If the source data is partitioned (e.g. in many files), the
+    `SplitGenerator` can list its partitions as `work_units`. The generator
+    function then takes one work unit and yields its examples:
+
+    ```
+    def _generate_examples(filename):
+      ...
+
+    class MyDataset(GeneratorBasedDatasetBuilder):
+
+      def _dataset_split_generators(self, dl_manager):
+        train_dir = dl_manager.download_and_extract(url)
+        return [
+            SplitGenerator(
+                generator_fn=_generate_examples,
+                split_files=[self._split_files(split=Split.TRAIN)],
+                work_units=tf.gfile.Glob(os.path.join(train_dir, "*")),
+            )
+        ]
+    ```
+
+    The work units are written independently, each to one shard (or to as many
+    shards as needed if the split has a target shard size), and are generated
+    in parallel if `download_and_prepare` is given an `executor`. With a
+    `concurrent.futures.ProcessPoolExecutor`, `generator_fn` (e.g. a
+    module-level function rather than a method of the builder), the work units
+    and the file format adapter must be picklable, which is checked before the
+    generation starts. The metrics (see `tfds.core.metrics`) recorded by the
+    worker processes are dropped. A split generated from work units must be the
+    only one of its `SplitGenerator`.
+
     For downloads and extractions, use the given `download_manager`.
     Note that the `DownloadManager` caches downloads, so it is fine to have each
     generator attempt to download the source data.
@@ -426,6 +582,62 @@ class GeneratorBasedDatasetBuilder(DatasetBuilder):
     """
     raise NotImplementedError
 
+  @property
+  def _shuffle_config(self):
+    """Returns a `ShuffleConfig` to shuffle the generated examples (or None).
+
+    By default, the examples are written in the order of the generator, so
+    datasets have to shuffle their examples in memory. Returning a
+    `ShuffleConfig` (defined in `tensorflow_datasets.core.shuffle`) shuffles
+    the records before they are written to the shards, spilling them to disk if
+    they exceed the memory limit. This allows to shuffle datasets which do not
+    fit in memory:
+
+    ```python
+    return ShuffleConfig(seed=123, memory_limit=2 * 1024**3)
+    ```
+
+    Returns:
+      ShuffleConfig instance or None
+    """
+    return None
+
+  @property
+  def _checkpoint_shards(self):
+    """Whether to resume the splits with a target shard size from their shards.
+
+    An interrupted generation is resumed by the next `download_and_prepare`:
+    the `SplitGenerator`s whose splits were written are skipped. By default,
+    a split interrupted while being written is written again from the start.
+
+    If True, the splits with a target shard size (see
+    `_dataset_split_generators`) are instead checkpointed after each shard,
+    and the examples of their complete shards are skipped when resuming. This
+    requires the generators to always yield the same examples in the same
+    order, and the `_shuffle_config` (if any) to have a seed. This is useful
+    for datasets taking a long time to generate. Unless they are shuffled, the
+    skipped examples are not serialized again, and no statistics are recorded
+    for the resumed split.
+
+    Returns:
+      bool
+    """
+    return False
+
+  @property
+  def _num_parallel_calls(self):
+    """Number of examples decoded and preprocessed in parallel when reading.
+
+    The parsing of the records and `_preprocess` are fused into a single map
+    of the `tf.data.Dataset`, run with this parallelism. By default, tf.data
+    tunes it while reading.
+
+    Returns:
+      int (`dataset_utils.AUTOTUNE` to tune it), or None to decode and
+      preprocess the examples sequentially.
+    """
+    return dataset_utils.AUTOTUNE
+
   def _preprocess(self, feature_dict):
     """Preprocess the feature dictionary.
 
@@ -433,6 +645,9 @@ class GeneratorBasedDatasetBuilder(DatasetBuilder):
     outputs and must use TensorFlow ops. It will be used as a `map_fn` to the
     `tf.data.Dataset`.
 
+    If `as_dataset` is called with a subset of the `features`, the feature
+    dictionary only contains those features.
+
     Args:
       feature_dict: `dict<str feature_name, Tensor feature_value>`,
         a single entry from the `tf.data.Dataset`.
@@ -442,27 +657,287 @@ class GeneratorBasedDatasetBuilder(DatasetBuilder):
     """
     return feature_dict
 
-  def _download_and_prepare(self, dl_manager):
+  def _download_and_prepare(self, dl_manager, executor=None):
     if not tf.gfile.Exists(self._data_dir):
       tf.gfile.MakeDirs(self._data_dir)
+    # The metadata are saved after each SplitGenerator, so the splits already
+    # written by an interrupted generation are not written again.
+    info = (dataset_info.load_dataset_info(self._data_dir) or
+            dataset_info.DatasetInfo(name=self.name))
     for split_generator in self._dataset_split_generators(dl_manager):
+      split_infos = [
+          dataset_info.get_split_info(info, split_files.split)
+          for split_files in split_generator.split_files
+      ]
+      if all(split_infos):
+        tf.logging.info("Skipping download_and_prepare for splits %s as they "
+                        "were written before the generation was interrupted.",
+                        split_generator.splits)
+        for split_files, split_info in zip(split_generator.split_files,
+                                           split_infos):
+          split_files.num_shards = split_info.num_shards
+          split_files.shard_lengths = list(split_info.shard_lengths) or None
+        continue
       if split_generator.output_files_exist():
         tf.logging.info("Skipping download_and_prepare for splits %s as all "
                         "files exist.", split_generator.splits)
-        continue
-      self._file_format_adapter.write_from_generator(
-          split_generator.generator_fn, split_generator.output_files)
+      else:
+        self._write_split_generator(split_generator, executor)
+      for split_files in split_generator.split_files:
+        info.splits.add(
+            name=split_files.split.value,
+            num_shards=split_files.num_shards,
+            num_bytes=sum(tf_utils.get_path_size(f)
+                          for f in split_files.filepaths),
+            shard_lengths=split_files.shard_lengths or [],
+            statistics=split_files.statistics or [],
+        )
+      dataset_info.save_dataset_info(self._data_dir, info)
+    self._file_format_adapter.update_dataset_info(info)
+    dataset_info.save_dataset_info(self._data_dir, info)
+
+  def _write_split_generator(self, split_generator, executor=None):
+    """Writes the examples of the generator to its split files."""
+    split_files_list = split_generator.split_files
+    if split_generator.work_units is not None:
+      self._write_work_units(split_generator, executor)
+      return
+    if not any(split_files.shard_size for split_files in split_files_list):
+      written = self._file_format_adapter.write_from_generator(
+          split_generator.generator_fn,
+          split_generator.output_files,
+          shuffle_config=self._shuffle_config)
+      if written.shard_lengths is not None:
+        shard_lengths = list(written.shard_lengths)
+        for split_files in split_files_list:
+          split_files.shard_lengths = shard_lengths[:split_files.num_shards]
+          del shard_lengths[:split_files.num_shards]
+        # The statistics of a generator shared by several splits cannot be
+        # attributed to each split
+        if len(split_files_list) == 1:
+          split_files_list[0].statistics = written.statistics.to_protos()
+      return
 
-  def _as_dataset(self, split=Split.TRAIN, shuffle_files=None):
+    if len(split_files_list) != 1:
+      raise ValueError(
+          "Splits with a target shard size cannot share their generator with "
+          "other splits: %s" % split_generator.splits)
+    shuffle_config = self._shuffle_config
+    if (self._checkpoint_shards and shuffle_config is not None and
+        shuffle_config.seed is None):
+      raise ValueError(
+          "The shards can only be checkpointed if the shuffling has a seed.")
+    split_files, = split_files_list
+    generator_fn = split_generator.generator_fn
+    num_skipped = 0
+    if self._checkpoint_shards and shuffle_config is None:
+      # The examples of the complete shards are skipped before being
+      # serialized (shuffled examples can only be skipped once shuffled)
+      num_skipped = file_format_adapter.get_checkpointed_num_records(
+          split_files.sharded_filepaths)
+      if num_skipped:
+        generator_fn = functools.partial(_skip_examples, generator_fn,
+                                         num_skipped)
+    written = self._file_format_adapter.write_from_generator(
+        generator_fn,
+        split_files.sharded_filepaths,
+        shuffle_config=shuffle_config,
+        shard_size=split_files.shard_size,
+        checkpoint_shards=self._checkpoint_shards)
+    split_files.num_shards = len(written.filepaths)
+    split_files.shard_lengths = written.shard_lengths
+    if num_skipped:
+      tf.logging.info("No statistics for split %s, as its generation was "
+                      "resumed after %d examples.", split_files.split.value,
+                      num_skipped)
+    elif written.statistics is not None:
+      split_files.statistics = written.statistics.to_protos()
+
+  def _write_work_units(self, split_generator, executor=None):
+    """Writes each work unit of the generator to its own shards."""
+    if len(split_generator.split_files) != 1:
+      raise ValueError(
+          "Splits generated from work units cannot share their generator with "
+          "other splits: %s" % split_generator.splits)
+    split_files, = split_generator.split_files
+    work_units = list(split_generator.work_units)
+    if split_files.num_shards not in (None, len(work_units)):
+      raise ValueError(
+          "Split %s is generated from %d work units, so it is written in as "
+          "many shards, not %d." % (split_files.split.value, len(work_units),
+                                    split_files.num_shards))
+    if isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+      _check_picklable(split_files.split, [
+          ("generator_fn", split_generator.generator_fn),
+          ("file format adapter", self._file_format_adapter),
+          ("shuffle config", self._shuffle_config),
+      ] + [("work unit %r" % (work_unit,), work_unit)
+           for work_unit in work_units])
+
+    # The work units are written in a temporary dir, then the shards of all
+    # the work units are renamed to the split files.
+    output_dir = os.path.dirname(split_files.sharded_filepaths(1)[0])
+    tmp_dir = file_format_adapter.get_incomplete_path(
+        os.path.join(output_dir, ".work_units"))
+    tf.gfile.MakeDirs(tmp_dir)
+    try:
+      tasks = [
+          (_write_work_unit, self._file_format_adapter,
+           split_generator.generator_fn, work_unit,
+           os.path.join(tmp_dir, "unit-%05d" % i), split_files.shard_size,
+           self._shuffle_config)
+          for i, work_unit in enumerate(work_units)
+      ]
+      tf.logging.info("Writing %d work units of split %s", len(tasks),
+                      split_files.split.value)
+      tmp_files = []
+      shard_lengths = []
+      accumulator = statistics.StatisticsAccumulator()
+      for written in _run_tasks(tasks, executor):
+        tmp_files.extend(written.filepaths)
+        shard_lengths.extend(written.shard_lengths)
+        accumulator.merge(written.statistics)
+      output_files = split_files.sharded_filepaths(len(tmp_files))
+      for tmp, output in zip(tmp_files, output_files):
+        tf.gfile.Rename(tmp, output)
+    finally:
+      tf.gfile.DeleteRecursively(tmp_dir)
+    split_files.num_shards = len(output_files)
+    split_files.shard_lengths = shard_lengths
+    split_files.statistics = accumulator.to_protos()
+
+  def _as_dataset(self, split=Split.TRAIN, shuffle_files=None, features=None):
+    split, subsplit = _parse_split(split)
+    adapter = self._file_format_adapter
+    info = dataset_info.load_dataset_info(self._data_dir)
+    if info is not None:  # Datasets generated before the metadata were added
+      adapter.apply_dataset_info(info)
+    dataset_from_file_fn = adapter.records_from_filename
+    if features is not None:
+      dataset_from_file_fn = functools.partial(dataset_from_file_fn,
+                                               features=features)
+    split_files = self._split_files(num_shards=None, split=split)
+    file_slices = None
+    if subsplit is not None:
+      file_slices = self._get_file_slices(info, split_files, subsplit)
     return dataset_utils.build_dataset(
-        filepattern=self._split_files(num_shards=None, split=split).filepattern,
-        dataset_from_file_fn=self._file_format_adapter.dataset_from_filename,
+        filepattern=split_files.filepattern,
+        dataset_from_file_fn=dataset_from_file_fn,
         process_fn=self._preprocess,
         shuffle_files=(
-            split == Split.TRAIN if shuffle_files is None else shuffle_files))
+            split == Split.TRAIN if shuffle_files is None else shuffle_files),
+        file_slices=file_slices,
+        decode_fn=adapter.decode_fn(features),
+        num_parallel_calls=self._num_parallel_calls)
+
+  def _get_file_slices(self, info, split_files, subsplit):
+    """Returns the (filepath, skip, take) of the shards of the subsplit."""
+    split_info = info and dataset_info.get_split_info(info, split_files.split)
+    if not split_info or not split_info.shard_lengths:
+      raise ValueError(
+          "The number of examples of the shards of split %s is unknown, so it "
+          "cannot be sliced. Generate the dataset again to record it." %
+          split_files.split.value)
+    shard_lengths = list(split_info.shard_lengths)
+    start, stop = subsplit.example_range(sum(shard_lengths))
+    filepaths = split_files.sharded_filepaths(split_info.num_shards)
+    return [
+        (filepaths[i], skip, take)
+        for i, skip, take in subsplits.shard_slices(shard_lengths, start, stop)
+    ]
 
   def _split_files(self, **kwargs):
+    kwargs.setdefault("num_shards", None)
     kwargs["dataset_name"] = self.name
     kwargs["data_dir"] = self._data_dir
     kwargs["filetype_suffix"] = self._file_format_adapter.filetype_suffix
     return SplitFiles(**kwargs)
+
+
+def _parse_split(split):
+  """Returns the `Split` and the `Subsplit` (or None) of the given split."""
+  if isinstance(split, Split):
+    return split, None
+  subsplit = subsplits.parse_subsplit(split)
+  return Split(subsplit.split), subsplit if subsplit.is_slice else None
+
+
+def _skip_examples(generator_fn, num_examples):
+  """Returns the examples of `generator_fn()` after the first `num_examples`."""
+  return itertools.islice(generator_fn(), num_examples, None)
+
+
+def _check_picklable(split, named_objects):
+  """Raises a ValueError if the objects cannot be sent to worker processes."""
+  for name, obj in named_objects:
+    try:
+      cPickle.dumps(obj, protocol=cPickle.HIGHEST_PROTOCOL)
+    except Exception as e:  # pylint: disable=broad-except
+      raise ValueError(
+          "The work units of split %s are written by worker processes, so the "
+          "%s should be picklable (e.g. use a module-level function instead "
+          "of a method of the builder or a lambda): %s: %s" %
+          (split.value, name, type(e).__name__, e))
+
+
+def _write_work_unit(adapter, generator_fn, work_unit, output_prefix,
+                     shard_size=None, shuffle_config=None):
+  """Writes the examples of one work unit to its own shards.
+
+  Run by the workers of the executor, so the arguments have to be picklable.
+
+  Args:
+    adapter (FileFormatAdapter): adapter writing the files.
+    generator_fn (function): takes the work unit and yields its examples.
+    work_unit: the work unit.
+    output_prefix (str): prefix of the written shards.
+    shard_size (int): if set, target size in bytes of the shards. Otherwise,
+      the work unit is written to a single shard.
+    shuffle_config (ShuffleConfig): if set, shuffle the examples of the work
+      unit before writing them.
+
+  Returns:
+    WrittenFiles: the written shards and their number of examples.
+  """
+  def filepaths_fn(num_shards):
+    return naming.sharded_filenames(output_prefix, num_shards)
+
+  generator_fn = functools.partial(generator_fn, work_unit)
+  if shard_size:
+    return adapter.write_from_generator(
+        generator_fn, filepaths_fn, shuffle_config=shuffle_config,
+        shard_size=shard_size)
+  return adapter.write_from_generator(
+      generator_fn, filepaths_fn(1), shuffle_config=shuffle_config)
+
+
+def _run_tasks(tasks, executor=None):
+  """Runs the tasks with the executor and returns their results.
+
+  Args:
+    tasks (list<tuple>): function and arguments of each task.
+    executor (concurrent.futures.Executor): executor running the tasks. If
+      None, the tasks are run one after the other in the current process.
+
+  Returns:
+    The results of the tasks, in the same order.
+  """
+  if executor is None:
+    return [task[0](*task[1:]) for task in tasks]
+
+  futures = [executor.submit(*task) for task in tasks]
+  # The failures are raised only after all the tasks are done, so no worker is
+  # still writing files once the generation is aborted.
+  results = []
+  failures = []
+  for future in futures:
+    try:
+      results.append(future.result())
+    except Exception as e:  # pylint: disable=broad-except
+      failures.append(e)
+  if failures:
+    if len(failures) > 1:
+      tf.logging.error("%d work units failed:\n%s", len(failures),
+                       "\n".join("  * %s" % e for e in failures))
+    raise failures[0]
+  return results
@@ -19,12 +19,19 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
+import itertools
 import os
 
+import concurrent.futures
+
 import tensorflow as tf
 from tensorflow_datasets.core import dataset_builder
+from tensorflow_datasets.core import dataset_info
+from tensorflow_datasets.core import dataset_utils
 from tensorflow_datasets.core import file_format_adapter
 from tensorflow_datasets.core import registered
+from tensorflow_datasets.core import subsplits
 from tensorflow_datasets.core import test_utils
 
 tf.enable_eager_execution()
@@ -59,6 +66,134 @@ class DummyDatasetSharedGenerator(dataset_builder.GeneratorBasedDatasetBuilder):
     return file_format_adapter.TFRecordExampleAdapter(example_spec)
 
 
+class DummyDatasetShardSize(DummyDatasetSharedGenerator):
+
+  @property
+  def splits(self):
+    # Each written record is ~30 bytes, so the split has ~9 shards
+    return [
+        self._split_files(split=dataset_builder.Split.TRAIN, shard_size=100),
+    ]
+
+
+class DummyDatasetInterrupted(DummyDatasetSharedGenerator):
+  """Generation interrupted while writing the test split, the first time."""
+
+  num_generated = {"train": 0, "test": 0}
+  interrupt = True
+
+  @property
+  def _checkpoint_shards(self):
+    return True
+
+  def _dataset_split_generators(self, dl_manager):
+    del dl_manager
+
+    def generator_fn(split, values):
+      for x in values:
+        if split == "test" and x == 25 and self.interrupt:
+          raise RuntimeError("Interrupted")
+        self.num_generated[split] += 1
+        yield {"x": x}
+
+    return [
+        dataset_builder.SplitGenerator(
+            generator_fn=functools.partial(generator_fn, "train", range(20)),
+            split_files=[self._split_files(split=dataset_builder.Split.TRAIN,
+                                           shard_size=100)]),
+        dataset_builder.SplitGenerator(
+            generator_fn=functools.partial(generator_fn, "test",
+                                           range(20, 30)),
+            split_files=[self._split_files(split=dataset_builder.Split.TEST,
+                                           num_shards=1)]),
+    ]
+
+
+class DummyDatasetInterruptedShards(DummyDatasetShardSize):
+  """Generation interrupted while writing the shards, the first time."""
+
+  interrupt = True
+
+  @property
+  def _checkpoint_shards(self):
+    return True
+
+  def _dataset_split_generators(self, dl_manager):
+    del dl_manager
+
+    def generator_fn():
+      for x in range(30):
+        if x == 17 and self.interrupt:
+          raise RuntimeError("Interrupted")
+        yield {"x": x}
+
+    return [dataset_builder.SplitGenerator(generator_fn=generator_fn,
+                                           split_files=self.splits)]
+
+
+def dummy_work_unit_generator(work_unit):
+  start, end = work_unit
+  for i in range(start, end):
+    yield {"x": i}
+
+
+class DummyDatasetWorkUnits(DummyDatasetSharedGenerator):
+
+  shard_size = None
+
+  def _dataset_split_generators(self, dl_manager):
+    del dl_manager
+    return [
+        dataset_builder.SplitGenerator(
+            generator_fn=dummy_work_unit_generator,
+            split_files=[self._split_files(split=dataset_builder.Split.TRAIN,
+                                           shard_size=self.shard_size)],
+            work_units=[(0, 10), (10, 20), (20, 25), (25, 30)]),
+    ]
+
+
+class DummyDatasetWorkUnitsShardSize(DummyDatasetWorkUnits):
+  # Each work unit is written in ~3 shards
+  shard_size = 100
+
+
+class DummyDatasetWorkUnitsLambda(DummyDatasetWorkUnits):
+  """Work units generated by a lambda (not picklable)."""
+
+  def _dataset_split_generators(self, dl_manager):
+    del dl_manager
+    return [
+        dataset_builder.SplitGenerator(
+            generator_fn=lambda work_unit: dummy_work_unit_generator(
+                work_unit),
+            split_files=[self._split_files(split=dataset_builder.Split.TRAIN)],
+            work_units=[(0, 10), (10, 20), (20, 30)]),
+    ]
+
+
+class DummyDatasetPreprocessed(DummyDatasetSharedGenerator):
+
+  parallel_calls = None
+
+  @property
+  def _num_parallel_calls(self):
+    return self.parallel_calls
+
+  def _preprocess(self, feature_dict):
+    feature_dict["y"] = feature_dict["x"] * 2
+    return feature_dict
+
+
+class DummyDatasetPreviousApi(dataset_builder.DatasetBuilder):
+  """Builder overriding the previous signatures of the abstract methods."""
+
+  def _download_and_prepare(self, dl_manager):
+    del dl_manager
+
+  def _as_dataset(self, split, shuffle_files=None):
+    return (split, shuffle_files)
+
+
 class DatasetBuilderTest(tf.test.TestCase):
 
   def test_shared_generator(self):
@@ -71,11 +206,16 @@ class DatasetBuilderTest(tf.test.TestCase):
           for fname in tf.gfile.ListDirectory(builder._data_dir)
       ]
       # The data_dir contains the cached directory by default
-      expected_filepaths = []
+      expected_filepaths = [dataset_info.dataset_info_path(builder._data_dir)]
       for split in builder.splits:
         expected_filepaths.extend(split.filepaths)
       self.assertEqual(sorted(expected_filepaths), sorted(written_filepaths))
 
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      self.assertEqual(builder.name, info.name)
+      self.assertEqual(["train", "test"], [s.name for s in info.splits])
+      self.assertEqual([2, 1], [s.num_shards for s in info.splits])
+
       splits = [
           dataset_builder.Split.TRAIN, dataset_builder.Split.TEST
       ]
@@ -87,6 +227,214 @@ class DatasetBuilderTest(tf.test.TestCase):
       self.assertEqual(10, len(test_data))
       self.assertEqual(list(range(30)), sorted(train_data + test_data))
 
+  def test_shard_size(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetShardSize(data_dir=tmp_dir)
+      builder.download_and_prepare()
+
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      split_info = dataset_info.get_split_info(info,
+                                               dataset_builder.Split.TRAIN)
+      self.assertGreater(split_info.num_shards, 1)
+      filepaths = tf.gfile.Glob(
+          builder._split_files(split=dataset_builder.Split.TRAIN).filepattern)
+      self.assertEqual(split_info.num_shards, len(filepaths))
+      self.assertEqual(split_info.num_bytes,
+                       sum(tf.gfile.Stat(f).length for f in filepaths))
+
+      dataset = builder.as_dataset(split=dataset_builder.Split.TRAIN)
+      data = [el["x"].numpy() for el in dataset]
+      self.assertEqual(list(range(30)), sorted(data))
+
+  def test_resume_interrupted_generation(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetInterrupted(data_dir=tmp_dir)
+      with self.assertRaises(RuntimeError):
+        builder.download_and_prepare()
+      self.assertIsNone(builder._get_data_dir())
+      interrupted_data_dir = builder._get_interrupted_data_dir()
+      self.assertEqual({"train": 20, "test": 5}, builder.num_generated)
+
+      # The train split is not generated again
+      builder.interrupt = False
+      builder.download_and_prepare()
+      self.assertEqual(interrupted_data_dir, builder._data_dir)
+      self.assertIsNone(builder._get_interrupted_data_dir())
+      self.assertEqual({"train": 20, "test": 15}, builder.num_generated)
+
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      self.assertEqual(["train", "test"], [s.name for s in info.splits])
+      split_info = dataset_info.get_split_info(info,
+                                               dataset_builder.Split.TRAIN)
+      self.assertGreater(split_info.num_shards, 1)
+      filepaths = tf.gfile.Glob(
+          builder._split_files(split=dataset_builder.Split.TRAIN).filepattern)
+      self.assertEqual(split_info.num_shards, len(filepaths))
+
+  def test_resume_interrupted_shards(self):
+
+    def read_values(path):
+      return [tf.train.Example.FromString(record).features.feature["x"]
+              .int64_list.value[0]
+              for record in tf.python_io.tf_record_iterator(path)]
+
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetInterruptedShards(data_dir=tmp_dir)
+      # Smaller batches, so some shards are written before the interruption
+      with tf.test.mock.patch.object(file_format_adapter,
+                                     "_ENCODE_BATCH_SIZE", 5):
+        with self.assertRaises(RuntimeError):
+          builder.download_and_prepare()
+      # The shards complete before the interruption (the shard being written
+      # has an incomplete suffix)
+      resumable_dir = file_format_adapter.get_resumable_path(
+          builder._get_interrupted_data_dir())
+      complete_shards = sorted(tf.gfile.Glob(os.path.join(
+          resumable_dir, "*.checkpoint-?????")))
+      self.assertGreater(len(complete_shards), 1)
+      complete_stats = [os.stat(path) for path in complete_shards]
+      complete_values = sum([read_values(path) for path in complete_shards],
+                            [])
+      self.assertEqual(list(range(len(complete_values))), complete_values)
+
+      # Only the examples after the complete shards are serialized again
+      encoded_values = []
+      encode_batch = file_format_adapter._TFExampleEncoder.encode_batch
+
+      def recording_encode_batch(encoder, example_dicts):
+        encoded_values.extend(example["x"] for example in example_dicts)
+        return encode_batch(encoder, example_dicts)
+
+      builder.interrupt = False
+      with tf.test.mock.patch.object(file_format_adapter._TFExampleEncoder,
+                                     "encode_batch", recording_encode_batch):
+        builder.download_and_prepare()
+      self.assertEqual(list(range(len(complete_values), 30)), encoded_values)
+
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      split_info = dataset_info.get_split_info(info,
+                                               dataset_builder.Split.TRAIN)
+      filepaths = builder._split_files(
+          split=dataset_builder.Split.TRAIN).sharded_filepaths(
+              split_info.num_shards)
+      # The complete shards were renamed, not written again
+      for path, stat in zip(filepaths, complete_stats):
+        self.assertEqual(stat.st_ino, os.stat(path).st_ino)
+        self.assertEqual(stat.st_mtime, os.stat(path).st_mtime)
+      # No example is duplicated or dropped
+      values = sum([read_values(path) for path in filepaths], [])
+      self.assertEqual(list(range(30)), values)
+      self.assertEqual([len(read_values(path)) for path in filepaths],
+                       list(split_info.shard_lengths))
+
+  def test_work_units(self):
+    executors = [
+        None,
+        concurrent.futures.ThreadPoolExecutor(max_workers=2),
+        # The tasks of the work units are pickled
+        concurrent.futures.ProcessPoolExecutor(max_workers=2),
+    ]
+    for builder_cls, executor in itertools.product(
+        [DummyDatasetWorkUnits, DummyDatasetWorkUnitsShardSize], executors):
+      with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+        builder = builder_cls(data_dir=tmp_dir)
+        builder.download_and_prepare(executor=executor)
+
+        filepaths = tf.gfile.Glob(
+            builder._split_files(split=dataset_builder.Split.TRAIN).filepattern)
+        info = dataset_info.load_dataset_info(builder._data_dir)
+        num_shards = info.splits[0].num_shards
+        self.assertEqual(num_shards, len(filepaths))
+        if builder_cls is DummyDatasetWorkUnits:
+          self.assertEqual(4, num_shards)  # One shard per work unit
+        else:
+          self.assertGreater(num_shards, 4)
+        # The statistics of the work units are merged
+        x_stats, = info.splits[0].statistics
+        self.assertEqual(("x", 30, 0, 29),
+                         (x_stats.name, x_stats.num_examples, x_stats.min,
+                          x_stats.max))
+
+        dataset = builder.as_dataset(split=dataset_builder.Split.TRAIN)
+        data = [el["x"].numpy() for el in dataset]
+        self.assertEqual(list(range(30)), sorted(data))
+    for executor in executors[1:]:
+      executor.shutdown()
+
+  def test_work_units_not_picklable(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetWorkUnitsLambda(data_dir=tmp_dir)
+      with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        with self.assertRaisesRegexp(ValueError,
+                                     "generator_fn should be picklable"):
+          builder.download_and_prepare(executor=executor)
+      # Other executors do not pickle the tasks
+      with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        builder.download_and_prepare(executor=executor)
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      self.assertEqual([10, 10, 10], list(info.splits[0].shard_lengths))
+
+  def test_subsplits(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetSharedGenerator(data_dir=tmp_dir)
+      builder.download_and_prepare()
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      self.assertEqual([[10, 10], [10]],
+                       [list(s.shard_lengths) for s in info.splits])
+      # The examples of a shared generator are not attributed to the splits
+      self.assertEqual([[], []], [list(s.statistics) for s in info.splits])
+
+      def read(split):
+        return sorted(el["x"].numpy() for el in builder.as_dataset(split=split))
+
+      train_data = read(dataset_builder.Split.TRAIN)
+      first_data = read("train[:25%]")
+      last_data = read("train[25%:]")
+      self.assertEqual(5, len(first_data))
+      self.assertEqual(train_data, sorted(first_data + last_data))
+      self.assertEqual(10, len(read("train[5:15]")))
+      self.assertEqual(read(dataset_builder.Split.TEST), read("test[:100%]"))
+
+      # Only the shards containing the slice are read
+      split_files = builder._split_files(split=dataset_builder.Split.TRAIN)
+      self.assertEqual(
+          [(split_files.sharded_filepaths(2)[0], 0, 5)],
+          builder._get_file_slices(
+              info, split_files, subsplits.parse_subsplit("train[:25%]")))
+
+      for split in ["train[10]", "unknown[:10%]"]:
+        with self.assertRaises(ValueError):
+          builder.as_dataset(split=split)
+
+  def test_num_parallel_calls(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetPreprocessed(data_dir=tmp_dir)
+      builder.download_and_prepare()
+      for parallel_calls in [None, 4, dataset_utils.AUTOTUNE]:
+        builder.parallel_calls = parallel_calls
+        dataset = builder.as_dataset(split=dataset_builder.Split.TRAIN)
+        data = sorted((el["x"].numpy(), el["y"].numpy()) for el in dataset)
+        self.assertEqual(20, len(data))
+        self.assertEqual([(x, 2 * x) for x, _ in data], data)
+
+  def test_previous_download_and_prepare_signature(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetPreviousApi(data_dir=tmp_dir)
+      # executor is not passed to _download_and_prepare unless given
+      builder.download_and_prepare()
+      self.assertIsNotNone(builder._get_data_dir())
+
+  def test_previous_as_dataset_signature(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyDatasetPreviousApi(data_dir=tmp_dir)
+      # features is not passed to _as_dataset unless given
+      self.assertEqual(
+          (dataset_builder.Split.TEST, True),
+          builder.as_dataset(split=dataset_builder.Split.TEST,
+                             shuffle_files=True))
+      with self.assertRaises(TypeError):
+        builder.as_dataset(split=dataset_builder.Split.TEST, features=["x"])
+
   def test_load(self):
     with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
       dataset = registered.load(
@@ -0,0 +1,99 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Metadata of the generated datasets.
+
+The metadata (DatasetInfo proto) are saved as json next to the dataset files,
+in `<data_dir>/dataset_info.json`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+from google.protobuf import json_format
+import tensorflow as tf
+
+from tensorflow_datasets.core.proto import dataset_info_generated_pb2 as dataset_info_pb2
+
+__all__ = [
+    "DatasetInfo",
+    "SplitInfo",
+    "FeatureStatistics",
+    "ShardsCheckpoint",
+    "load_dataset_info",
+    "save_dataset_info",
+    "load_shards_checkpoint",
+    "save_shards_checkpoint",
+    "get_split_info",
+]
+
+DatasetInfo = dataset_info_pb2.DatasetInfo
+SplitInfo = dataset_info_pb2.SplitInfo
+FeatureStatistics = dataset_info_pb2.FeatureStatistics
+ShardsCheckpoint = dataset_info_pb2.ShardsCheckpoint
+
+DATASET_INFO_FILENAME = "dataset_info.json"
+
+
+def dataset_info_path(data_dir):
+  """Returns the path of the metadata file of the dataset."""
+  return os.path.join(data_dir, DATASET_INFO_FILENAME)
+
+
+def save_dataset_info(data_dir, info):
+  """Write the dataset metadata in the data directory."""
+  _save_proto(dataset_info_path(data_dir), info)
+
+
+def load_dataset_info(data_dir):
+  """Read the dataset metadata (returns None if not found)."""
+  return _load_proto(dataset_info_path(data_dir), DatasetInfo)
+
+
+def save_shards_checkpoint(path, checkpoint):
+  """Write the `ShardsCheckpoint` of a split being written."""
+  _save_proto(path, checkpoint)
+
+
+def load_shards_checkpoint(path):
+  """Read the `ShardsCheckpoint` of a split (returns None if not found)."""
+  return _load_proto(path, ShardsCheckpoint)
+
+
+def _save_proto(path, proto):
+  """Write the proto as json, atomically."""
+  tmp_path = path + ".incomplete"
+  with tf.gfile.Open(tmp_path, "w") as f:
+    f.write(json_format.MessageToJson(proto))
+  tf.gfile.Rename(tmp_path, path, overwrite=True)
+
+
+def _load_proto(path, proto_cls):
+  """Read the json proto (returns None if not found)."""
+  if not tf.gfile.Exists(path):
+    return None
+  with tf.gfile.Open(path) as f:
+    return json_format.Parse(f.read(), proto_cls())
+
+
+def get_split_info(info, split):
+  """Returns the SplitInfo of the given `tfds.Split` (None if not found)."""
+  for split_info in info.splits:
+    if split_info.name == split.value:
+      return split_info
+  return None
@@ -19,45 +19,121 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
 import tensorflow as tf
 
+from tensorflow_datasets.core import metrics
+from tensorflow_datasets.core.utils import tf_utils
+
 __all__ = [
+    "AUTOTUNE",
     "build_dataset",
     "iterate_over_dataset",
 ]
 
+# Lets tf.data choose the parallelism (same value as tf.contrib.data.AUTOTUNE)
+AUTOTUNE = -1
+
 
 def build_dataset(filepattern,
                   dataset_from_file_fn,
                   process_fn=None,
                   shuffle_files=False,
-                  parallel_reads=64):
+                  parallel_reads=64,
+                  file_slices=None,
+                  decode_fn=None,
+                  num_parallel_calls=AUTOTUNE):
   """Constructs a `tf.data.Dataset` from TFRecord files.
 
+  The records are decoded and processed by a single (fused) parallel map, and
+  the examples are prefetched.
+
+  If a `tfds.metrics` sink is set when the dataset is built, the files opened
+  and records read are recorded (`read.files_opened` and `read.records`).
+
   Args:
-    filepattern (str): Glob pattern for TFRecord files.
+    filepattern (str): Glob pattern for TFRecord files. Ignored if
+      `file_slices` is given.
     dataset_from_file_fn (function): returns a `tf.data.Dataset` given a
       filename.
     process_fn (function): If provided, will map over input records of the
-      `Dataset` returned by `dataset_from_file_fn`.
+      `Dataset` returned by `dataset_from_file_fn`, after `decode_fn`.
     shuffle_files (bool): Whether to shuffle the input filenames.
     parallel_reads (int): how many files to read in parallel.
+    file_slices (list<tuple>): If provided, (filename, number of records to
+      skip, number of records to take) of each file to read, instead of reading
+      all the files matching `filepattern`.
+    decode_fn (function): If provided, decodes the records of the `Dataset`
+      returned by `dataset_from_file_fn`.
+    num_parallel_calls (int): number of records decoded and processed in
+      parallel. Defaults to `AUTOTUNE`, and None for a sequential map.
 
   Returns:
     `tf.data.Dataset`
   """
-  dataset = tf.data.Dataset.list_files(filepattern, shuffle=shuffle_files)
+  if file_slices is None:
+    dataset = tf.data.Dataset.list_files(filepattern, shuffle=shuffle_files)
+    read_fn = dataset_from_file_fn
+  else:
+    filenames, skips, takes = [
+        list(values) for values in zip(*file_slices)] or [[], [], []]
+    dataset = tf.data.Dataset.from_tensor_slices((
+        tf.constant(filenames, dtype=tf.string),
+        tf.constant(skips, dtype=tf.int64),
+        tf.constant(takes, dtype=tf.int64),
+    ))
+    if shuffle_files:
+      dataset = dataset.shuffle(max(len(file_slices), 1))
+
+    def read_fn(filename, skip, take):
+      return dataset_from_file_fn(filename).skip(skip).take(take)
+
+  if metrics.is_enabled():
+    dataset = _count_elements(dataset, "read.files_opened")
+    read_fn = _count_records_fn(read_fn)
+
   dataset = dataset.interleave(
-      dataset_from_file_fn,
+      read_fn,
       cycle_length=parallel_reads,
       num_parallel_calls=parallel_reads)
-  if process_fn is not None:
-    dataset = dataset.map(process_fn)
-  return dataset
+  map_fns = [fn for fn in (decode_fn, process_fn) if fn is not None]
+  if map_fns:
+    def decode_and_process(record):
+      for map_fn in map_fns:
+        record = map_fn(record)
+      return record
+
+    dataset = dataset.map(decode_and_process,
+                          num_parallel_calls=num_parallel_calls)
+  return dataset.prefetch(AUTOTUNE)
+
+
+def _count_elements(dataset, metric_name):
+  """Increments the counter `metric_name` for each element of the dataset."""
+  def increment(unused_value):
+    metrics.increment(metric_name)
+    return np.int64(0)
+
+  # The counter is read (and incremented) after each element of the dataset
+  counter = tf.data.Dataset.from_tensors(np.int64(0)).repeat().map(
+      lambda value: tf.py_func(increment, [value], tf.int64, stateful=True))
+  return tf.data.Dataset.zip((dataset, counter)).map(
+      lambda element, unused_count: element)
+
+
+def _count_records_fn(read_fn):
+  """Wraps `read_fn` to count the records of the datasets it returns."""
+  def counted_read_fn(*args):
+    return _count_elements(read_fn(*args), "read.records")
+  return counted_read_fn
 
 
 def iterate_over_dataset(dataset):
-  """Yields numpy elements of `tf.data.Dataset`."""
+  """Yields numpy elements of `tf.data.Dataset`.
+
+  In graph mode, the dataset is run by a session sharing the process-wide
+  thread pools (see `tf_utils.configure_sessions`).
+  """
   if tf.executing_eagerly():
     for item in dataset:
       flat = tf.contrib.framework.nest.flatten(item)
@@ -65,7 +141,7 @@ def iterate_over_dataset(dataset):
       yield tf.contrib.framework.nest.pack_sequence_as(item, flat)
   else:
     item = dataset.make_one_shot_iterator().get_next()
-    with tf.Session(config=tf.ConfigProto(device_count={"GPU": 0})) as sess:
+    with tf_utils.new_session(device_count={"GPU": 0}) as sess:
       while True:
         try:
           yield sess.run(item)
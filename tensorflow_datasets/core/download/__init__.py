@@ -15,6 +15,7 @@
 
 """Public API of the download manager."""
 
+from tensorflow_datasets.core.download.cache import EvictionPolicy
 from tensorflow_datasets.core.download.download_manager import DownloadManager
 from tensorflow_datasets.core.download.proto.download_generated_pb2 import ExtractInfo
 from tensorflow_datasets.core.download.proto.download_generated_pb2 import UrlInfo
@@ -22,6 +23,7 @@ from tensorflow_datasets.core.download.util import GenerateMode
 
 __all__ = [
     "DownloadManager",
+    "EvictionPolicy",
     "ExtractInfo",
     "UrlInfo",
     "GenerateMode",
@@ -0,0 +1,367 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Bookkeeping of the download manager cache.
+
+Each completed trial has its metadata (UriTrial) saved next to its output as
+`<trial_id>.trial.json`. The metadata keep track of the size and the last
+access of each cached entry, which allow to evict the least recently (or least
+frequently) used entries once the cache exceeds its budget.
+
+Trials in use by a running process can be pinned to protect them from the
+eviction triggered by other processes sharing the same cache.
+
+Each trial is processed under a file lock, so concurrent threads or processes
+needing the same trial do not duplicate the work: the first one processes the
+trial while the other ones wait and reuse the result.
+
+Downloaded files are stored once in a content-addressed storage (keyed by their
+sha256) and hard-linked into the trial directories, so identical files
+downloaded from different urls (mirrors, query strings,...) share the same
+storage. The trial metadata record the sha256 of their content, and the size of
+a stored content shared by several trials is only counted once in the cache
+size. The stored contents no trial links to anymore are removed after the
+eviction. Only local caches are deduplicated, as the other gfile filesystems
+(e.g. GCS) have no hard links.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import errno
+import os
+import socket
+
+import enum
+from google.protobuf import json_format
+from tensorflow import gfile
+
+from tensorflow_datasets.core.download import util
+from tensorflow_datasets.core.utils import py_utils
+from tensorflow_datasets.core.download.proto import download_generated_pb2 as download_pb2
+
+_METADATA_SUFFIX = '.trial.json'
+_PINS_DIRNAME = '.pins'
+_BLOBS_DIRNAME = '.blobs'
+_LOCKS_DIRNAME = '.locks'
+
+
+class EvictionPolicy(enum.Enum):
+  """Enum for the order in which the cached trials are evicted."""
+
+  # Evict first the trials which have not been used for the longest time
+  LRU = 'lru'
+  # Evict first the trials which have been used the least number of times
+  LFU = 'lfu'
+
+
+def trial_metadata_path(cache_dir, trial_id):
+  """Returns the path of the metadata file of the trial."""
+  return os.path.join(cache_dir, trial_id + _METADATA_SUFFIX)
+
+
+def save_trial(cache_dir, trial):
+  """Write the trial metadata on disk."""
+  path = trial_metadata_path(cache_dir, trial.id)
+  tmp_path = '{}.incomplete{}'.format(path, util.random_str())
+  with gfile.Open(tmp_path, 'w') as f:
+    f.write(json_format.MessageToJson(trial))
+  gfile.Rename(tmp_path, path, overwrite=True)
+
+
+def load_trial(cache_dir, trial_id):
+  """Read the trial metadata from disk (returns None if not found)."""
+  path = trial_metadata_path(cache_dir, trial_id)
+  if not gfile.Exists(path):
+    return None
+  with gfile.Open(path) as f:
+    return json_format.Parse(f.read(), download_pb2.UriTrial())
+
+
+def list_trials(cache_dir):
+  """Returns the metadata of all the trials recorded in the cache."""
+  trials = []
+  for filename in gfile.ListDirectory(cache_dir):
+    if not filename.endswith(_METADATA_SUFFIX):
+      continue
+    trial = load_trial(cache_dir, util.rchop(filename, _METADATA_SUFFIX))
+    if trial is not None:  # Could have been deleted in the meantime
+      trials.append(trial)
+  return trials
+
+
+def touch_trial(trial):
+  """Record a new access to the trial."""
+  trial.last_access_time.GetCurrentTime()
+  trial.access_count += 1
+
+
+def delete_trial(cache_dir, trial_id):
+  """Remove the trial output and metadata from the cache."""
+  output_dir = os.path.join(cache_dir, trial_id)
+  if gfile.Exists(output_dir):
+    gfile.DeleteRecursively(output_dir)
+  metadata_path = trial_metadata_path(cache_dir, trial_id)
+  if gfile.Exists(metadata_path):
+    gfile.Remove(metadata_path)
+
+
+@contextlib.contextmanager
+def lock_trial(cache_dir, trial_id, blocking=True):
+  """Exclusive lock on the trial, shared across threads and processes.
+
+  Args:
+    cache_dir (str): The download manager cache directory.
+    trial_id (str): The trial to lock.
+    blocking (bool): If False, do not wait if the trial is already locked.
+
+  Yields:
+    locked (bool): Whether the lock has been acquired.
+  """
+  lock_path = os.path.join(cache_dir, _LOCKS_DIRNAME, trial_id + '.lock')
+  gfile.MakeDirs(os.path.dirname(lock_path))
+  with py_utils.file_lock(lock_path, blocking=blocking) as locked:
+    yield locked
+
+
+def get_blob_path(cache_dir, content_sha256):
+  """Returns the path of the content in the content-addressed storage."""
+  return os.path.join(cache_dir, _BLOBS_DIRNAME, content_sha256)
+
+
+def store_blob(cache_dir, path):
+  """Store the file in the content-addressed storage, and link it back.
+
+  If a file with the same content is already stored, the given file is replaced
+  by a link to the existing content. The file is kept as is (not deduplicated)
+  if the cache is not local, or if its filesystem has no hard links.
+
+  Args:
+    cache_dir (str): The download manager cache directory.
+    path (str): The file to store.
+
+  Returns:
+    content_sha256 (str): The sha256 of the file content.
+  """
+  content_sha256 = util.hash_file(path)
+  if not _is_local(cache_dir):
+    return content_sha256
+  blob_path = get_blob_path(cache_dir, content_sha256)
+  gfile.MakeDirs(os.path.dirname(blob_path))
+  try:
+    if gfile.Exists(blob_path):
+      # Atomically replace the file by a link to the stored content
+      tmp_path = '{}.incomplete{}'.format(path, util.random_str())
+      os.link(blob_path, tmp_path)
+      os.rename(tmp_path, path)
+    else:
+      os.link(path, blob_path)
+  except OSError:
+    # No hard links, or same content stored concurrently: the file is kept
+    pass
+  return content_sha256
+
+
+def remove_unreferenced_blobs(cache_dir):
+  """Delete the stored contents no trial links to anymore.
+
+  A stored content is only deleted once its blob is its last link, so a content
+  just linked into a trial whose metadata are not saved yet is kept. If a trial
+  links the content while it is being deleted, the trial keeps its own link.
+
+  Args:
+    cache_dir (str): The download manager cache directory.
+  """
+  blobs_dir = os.path.join(cache_dir, _BLOBS_DIRNAME)
+  if not gfile.Exists(blobs_dir):
+    return
+  for content_sha256 in gfile.ListDirectory(blobs_dir):
+    blob_path = os.path.join(blobs_dir, content_sha256)
+    try:
+      if os.stat(blob_path).st_nlink == 1:
+        os.remove(blob_path)
+    except OSError:  # Removed in the meantime
+      pass
+
+
+def get_cache_size(cache_dir):
+  """Returns the size in bytes of the completed trials of the cache.
+
+  The stored contents shared by several trials are counted once.
+
+  Args:
+    cache_dir (str): The download manager cache directory.
+
+  Returns:
+    size (int): The size of the cache, as compared to the eviction budget.
+  """
+  return _CacheUsage(cache_dir, _list_completed_trials(cache_dir)).total_size
+
+
+def add_pin(cache_dir, trial_id):
+  """Protect the trial from eviction while the current process is alive."""
+  pin_path = _pin_path(cache_dir, trial_id)
+  gfile.MakeDirs(os.path.dirname(pin_path))
+  with gfile.Open(pin_path, 'w') as f:
+    f.write('')
+
+
+def remove_pin(cache_dir, trial_id):
+  """Release the pin added by the current process."""
+  pin_path = _pin_path(cache_dir, trial_id)
+  if gfile.Exists(pin_path):
+    gfile.Remove(pin_path)
+
+
+def is_pinned(cache_dir, trial_id):
+  """Returns True if a living process has pinned the trial."""
+  pins_dir = os.path.join(cache_dir, _PINS_DIRNAME, trial_id)
+  if not gfile.Exists(pins_dir):
+    return False
+  return any(_is_pin_alive(pin) for pin in gfile.ListDirectory(pins_dir))
+
+
+def evict(cache_dir, max_size, policy=EvictionPolicy.LRU, pinned_ids=()):
+  """Delete completed trials until the cache fits in the given budget.
+
+  Only the trials with recorded metadata are considered. Pinned trials are never
+  evicted but still count in the total cache size. A stored content shared by
+  several trials is only freed once all of them are evicted.
+
+  Args:
+    cache_dir (str): The download manager cache directory.
+    max_size (int): The cache budget in bytes.
+    policy (EvictionPolicy): Order in which the trials are evicted.
+    pinned_ids (list[str]): Additional trial ids to keep (ex: the trials in use
+      by the current process).
+
+  Returns:
+    evicted_ids (list[str]): The ids of the deleted trials.
+  """
+  policy = EvictionPolicy(policy)
+  log = util.build_log(prefix='cache')
+
+  trials = _list_completed_trials(cache_dir)
+  usage = _CacheUsage(cache_dir, trials)
+  if usage.total_size <= max_size:
+    return []
+
+  if policy == EvictionPolicy.LRU:
+    sort_key = lambda t: t.last_access_time.ToNanoseconds()
+  else:
+    sort_key = lambda t: (t.access_count, t.last_access_time.ToNanoseconds())
+  pinned_ids = set(pinned_ids)
+  candidates = sorted(
+      (t for t in trials
+       if t.id not in pinned_ids and not is_pinned(cache_dir, t.id)),
+      key=sort_key,
+  )
+
+  evicted_ids = []
+  for trial in candidates:
+    if usage.total_size <= max_size:
+      break
+    # Skip the trials currently processed or reused by another process
+    with lock_trial(cache_dir, trial.id, blocking=False) as locked:
+      if not locked:
+        continue
+      log('Evict {} ({} bytes)', trial.id, trial.size_bytes)
+      delete_trial(cache_dir, trial.id)
+    usage.remove(trial.id)
+    evicted_ids.append(trial.id)
+
+  if evicted_ids:
+    remove_unreferenced_blobs(cache_dir)
+  if usage.total_size > max_size:
+    log('Cache size ({} bytes) still exceeds the budget ({} bytes) as the '
+        'remaining trials are pinned.', usage.total_size, max_size)
+  return evicted_ids
+
+
+class _CacheUsage(object):
+  """Size of the trials on disk, counting their shared contents once."""
+
+  def __init__(self, cache_dir, trials):
+    self._trial_sizes = {}  # Size of each trial, without its stored content
+    self._trial_blobs = {}  # Stored content linked by each trial
+    self._blob_sizes = {}
+    self._blob_num_trials = collections.Counter()
+    for trial in trials:
+      blob_size = _get_linked_blob_size(cache_dir, trial)
+      if blob_size:
+        self._trial_blobs[trial.id] = trial.content_sha256
+        self._blob_sizes[trial.content_sha256] = blob_size
+        self._blob_num_trials[trial.content_sha256] += 1
+      self._trial_sizes[trial.id] = max(trial.size_bytes - blob_size, 0)
+    self.total_size = (sum(self._trial_sizes.values()) +
+                       sum(self._blob_sizes.values()))
+
+  def remove(self, trial_id):
+    """Update the size once the trial is deleted."""
+    self.total_size -= self._trial_sizes.pop(trial_id)
+    content_sha256 = self._trial_blobs.pop(trial_id, None)
+    if content_sha256 is None:
+      return
+    self._blob_num_trials[content_sha256] -= 1
+    # The content is only freed with its last trial
+    if not self._blob_num_trials[content_sha256]:
+      self.total_size -= self._blob_sizes[content_sha256]
+
+
+def _list_completed_trials(cache_dir):
+  return [
+      t for t in list_trials(cache_dir)
+      if t.status == download_pb2.UriTrial.COMPLETED
+  ]
+
+
+def _get_linked_blob_size(cache_dir, trial):
+  """Returns the size of the stored content linked by the trial (or 0)."""
+  if not trial.content_sha256 or not _is_local(cache_dir):
+    return 0
+  blob_path = get_blob_path(cache_dir, trial.content_sha256)
+  try:
+    if not os.path.samefile(blob_path, trial.output_path):
+      return 0  # Not deduplicated (ex: stored concurrently)
+    return os.stat(blob_path).st_size
+  except OSError:  # Content or trial removed
+    return 0
+
+
+def _is_local(path):
+  """Returns True if the path is on the local filesystem."""
+  return '://' not in path
+
+
+def _pin_path(cache_dir, trial_id):
+  pin_name = '{}-{}'.format(socket.gethostname(), os.getpid())
+  return os.path.join(cache_dir, _PINS_DIRNAME, trial_id, pin_name)
+
+
+def _is_pin_alive(pin_name):
+  """Check whether the process which created the pin is still running."""
+  hostname, _, pid = pin_name.rpartition('-')
+  if hostname != socket.gethostname():
+    return True  # Processes from other hosts cannot be checked
+  try:
+    os.kill(int(pid), 0)
+  except OSError as e:
+    # EPERM means the process exists but belongs to another user
+    return e.errno == errno.EPERM
+  return True
@@ -0,0 +1,184 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.download.cache."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+from tensorflow import gfile
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.core.download import cache
+from tensorflow_datasets.core.download.proto import download_generated_pb2 as download_pb2
+from tensorflow_datasets.core.utils import tf_utils
+
+
+def _add_trial(cache_dir, trial_id, size, access_time, access_count=1):
+  """Write a completed trial of the given size in the cache."""
+  output_dir = os.path.join(cache_dir, trial_id)
+  gfile.MakeDirs(output_dir)
+  with gfile.Open(os.path.join(output_dir, 'data.bin'), 'wb') as f:
+    f.write(b'x' * size)
+  trial = download_pb2.UriTrial(
+      id=trial_id,
+      status=download_pb2.UriTrial.COMPLETED,
+      output_path=output_dir,
+      access_count=access_count,
+      size_bytes=tf_utils.get_path_size(output_dir),
+  )
+  trial.last_access_time.FromSeconds(access_time)
+  cache.save_trial(cache_dir, trial)
+  return trial
+
+
+class CacheTest(tf.test.TestCase):
+
+  def test_save_load_trial(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      self.assertIsNone(cache.load_trial(cache_dir, 'abc'))
+      trial = _add_trial(cache_dir, 'abc', size=10, access_time=5)
+      self.assertEqual(10, trial.size_bytes)
+      self.assertEqual(trial, cache.load_trial(cache_dir, 'abc'))
+      self.assertEqual([trial], cache.list_trials(cache_dir))
+
+      cache.touch_trial(trial)
+      self.assertEqual(2, trial.access_count)
+      self.assertGreater(trial.last_access_time.seconds, 5)
+
+  def test_evict_lru(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      _add_trial(cache_dir, 'old', size=10, access_time=1, access_count=10)
+      _add_trial(cache_dir, 'new', size=10, access_time=3, access_count=1)
+      _add_trial(cache_dir, 'mid', size=10, access_time=2, access_count=1)
+
+      # Cache fits in the budget
+      self.assertEqual([], cache.evict(cache_dir, max_size=30))
+
+      evicted = cache.evict(cache_dir, max_size=15)
+      self.assertEqual(['old', 'mid'], evicted)
+      self.assertFalse(gfile.Exists(os.path.join(cache_dir, 'old')))
+      self.assertIsNone(cache.load_trial(cache_dir, 'old'))
+      self.assertTrue(gfile.Exists(os.path.join(cache_dir, 'new')))
+
+  def test_evict_lfu(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      _add_trial(cache_dir, 'old', size=10, access_time=1, access_count=10)
+      _add_trial(cache_dir, 'new', size=10, access_time=3, access_count=1)
+      _add_trial(cache_dir, 'mid', size=10, access_time=2, access_count=1)
+
+      evicted = cache.evict(
+          cache_dir, max_size=15, policy=cache.EvictionPolicy.LFU)
+      self.assertEqual(['mid', 'new'], evicted)
+
+  def test_evict_pinned(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      _add_trial(cache_dir, 'a', size=10, access_time=1)
+      _add_trial(cache_dir, 'b', size=10, access_time=2)
+      _add_trial(cache_dir, 'c', size=10, access_time=3)
+
+      # 'a' pinned by the current process, 'b' by the caller
+      cache.add_pin(cache_dir, 'a')
+      self.assertTrue(cache.is_pinned(cache_dir, 'a'))
+      evicted = cache.evict(cache_dir, max_size=0, pinned_ids=['b'])
+      self.assertEqual(['c'], evicted)
+
+      cache.remove_pin(cache_dir, 'a')
+      self.assertFalse(cache.is_pinned(cache_dir, 'a'))
+      evicted = cache.evict(cache_dir, max_size=0)
+      self.assertEqual(['a', 'b'], evicted)
+
+  def test_dead_pin_ignored(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      _add_trial(cache_dir, 'a', size=10, access_time=1)
+      cache.add_pin(cache_dir, 'a')
+      # Simulate a pin from a process which has crashed
+      pin_path = cache._pin_path(cache_dir, 'a')
+      gfile.Rename(pin_path, pin_path.rpartition('-')[0] + '-999999999')
+      self.assertFalse(cache.is_pinned(cache_dir, 'a'))
+      self.assertEqual(['a'], cache.evict(cache_dir, max_size=0))
+
+  def test_store_blob(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      paths = []
+      for trial_id in ['a', 'b']:
+        trial = _add_trial(cache_dir, trial_id, size=10, access_time=1)
+        paths.append(os.path.join(trial.output_path, 'data.bin'))
+        trial.content_sha256 = cache.store_blob(cache_dir, paths[-1])
+        cache.save_trial(cache_dir, trial)
+      # Both trials link the same stored content
+      blob_path = cache.get_blob_path(cache_dir, trial.content_sha256)
+      self.assertEqual(os.stat(blob_path).st_ino, os.stat(paths[0]).st_ino)
+      self.assertEqual(os.stat(blob_path).st_ino, os.stat(paths[1]).st_ino)
+
+      # The content is removed once no trial records it
+      cache.evict(cache_dir, max_size=10)
+      self.assertTrue(gfile.Exists(blob_path))
+      cache.evict(cache_dir, max_size=0)
+      self.assertFalse(gfile.Exists(blob_path))
+
+  def test_evict_shared_blob(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      for trial_id, access_time in [('a', 1), ('b', 2), ('c', 3)]:
+        trial = _add_trial(cache_dir, trial_id, size=10,
+                           access_time=access_time)
+        if trial_id != 'c':  # 'a' and 'b' share their content
+          trial.output_path = os.path.join(trial.output_path, 'data.bin')
+          trial.content_sha256 = cache.store_blob(cache_dir,
+                                                  trial.output_path)
+          cache.save_trial(cache_dir, trial)
+          blob_path = cache.get_blob_path(cache_dir, trial.content_sha256)
+
+      # The shared content is counted once
+      self.assertEqual([], cache.evict(cache_dir, max_size=20))
+      # Evicting 'a' frees nothing, as 'b' still links the content
+      self.assertEqual(['a', 'b'], cache.evict(cache_dir, max_size=15))
+      self.assertFalse(gfile.Exists(blob_path))
+      self.assertTrue(gfile.Exists(os.path.join(cache_dir, 'c')))
+
+  def test_remove_unreferenced_blobs_unsaved_trial(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      # The content is linked by a trial whose metadata are not saved yet
+      path = os.path.join(cache_dir, 'a', 'data.bin')
+      gfile.MakeDirs(os.path.dirname(path))
+      with gfile.Open(path, 'wb') as f:
+        f.write(b'x')
+      blob_path = cache.get_blob_path(cache_dir,
+                                      cache.store_blob(cache_dir, path))
+      cache.remove_unreferenced_blobs(cache_dir)
+      self.assertTrue(gfile.Exists(blob_path))
+
+      gfile.Remove(path)
+      cache.remove_unreferenced_blobs(cache_dir)
+      self.assertFalse(gfile.Exists(blob_path))
+
+  def test_store_blob_not_local(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      path = os.path.join(cache_dir, 'data.bin')
+      with gfile.Open(path, 'wb') as f:
+        f.write(b'x')
+      with tf.test.mock.patch.object(cache, '_is_local', return_value=False):
+        content_sha256 = cache.store_blob(cache_dir, path)
+      # Not deduplicated, but the sha256 is still recorded
+      self.assertFalse(
+          gfile.Exists(cache.get_blob_path(cache_dir, content_sha256)))
+      self.assertTrue(gfile.Exists(path))
+
+
+if __name__ == '__main__':
+  tf.test.main()
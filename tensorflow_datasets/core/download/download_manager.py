@@ -24,14 +24,20 @@ from __future__ import print_function
 import collections
 import contextlib
 import os
+import random
+import threading
+import time
 
 import concurrent.futures
 import six
 from tensorflow import gfile
 
+from tensorflow_datasets.core import metrics
+from tensorflow_datasets.core.download import cache
 from tensorflow_datasets.core.download import local_backend
 from tensorflow_datasets.core.download import util
 from tensorflow_datasets.core.download.proto import download_generated_pb2 as download_pb2
+from tensorflow_datasets.core.utils import tf_utils
 
 DEFAULT_CACHE_DIR = os.path.join('~', 'tensorflow_datasets', 'tmp')
 
@@ -39,11 +45,21 @@ DEFAULT_CACHE_DIR = os.path.join('~', 'tensorflow_datasets', 'tmp')
 _NUM_PARALLEL_DOWNLOADS = 50
 _NUM_PARALLEL_EXTRACTS = 1
 
+# Number of times a failed download is retried, and delay (in seconds) before
+# the first retry. The delay is doubled (with random jitter) at each retry.
+_NUM_RETRIES = 3
+_RETRY_BACKOFF = 1.
+_MAX_RETRY_DELAY = 60.
+
 TAR_EXT = ['.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tbz', '.tb2']
 # Tuple to match extensions with extraction function.
 ExtractFormat = collections.namedtuple('ExtractFormat', 'ext, fn')
 
 
+class DownloadError(Exception):
+  """Error raised when the download (or extraction,...) of uris failed."""
+
+
 class DownloadManager(object):
   """Class which manages the download and extraction of data.
 
@@ -55,7 +71,10 @@ class DownloadManager(object):
      not be compatible with one of the backend.
    * Allow to launch multiple download in parallel.
    * Better ressources management (ex: a same url used by multiple
-     datasets is downloaded/extracted only once).
+     datasets is downloaded/extracted only once). Downloads are deduplicated
+     by content, so identical files from different urls are stored and
+     extracted only once. Concurrent threads or processes needing the same
+     trial wait for the first one instead of processing it again.
 
   The function members accept either plain value, or values wrapped into list
   or dict. Giving a data structure will parallelize the downloads.
@@ -90,9 +109,22 @@ class DownloadManager(object):
     # the path already exists, the cached value is re-used
     vocab_dir = dl_manager.execute_and_cache(generate_vocab_fn, '/vocab/en-fr')
 
+  The size of the cache can be bounded by giving a `max_cache_size`. Once the
+  budget is exceeded, the least recently used trials are evicted (the trials
+  used by this download manager are never evicted). The eviction can also be
+  triggered manually with `dl_manager.gc()`. The size of the cache is only
+  scanned once, then updated with the size of the trials added by this
+  download manager (the trials added by other processes are accounted for by
+  their own eviction, or at the next scan).
+
+  The accesses to the cached trials are recorded in their metadata once per
+  download manager, at the end of the call which used them.
+
   """
 
-  def __init__(self, cache_dir, mode=None):
+  def __init__(self, cache_dir, mode=None, max_cache_size=None,
+               eviction_policy=None, num_retries=_NUM_RETRIES,
+               retry_backoff=_RETRY_BACKOFF):
     """Download manager constructor.
 
     Args:
@@ -100,15 +132,48 @@ class DownloadManager(object):
         other artifacts are stored.
       mode (GenerateMode): Mode to FORCE_REDOWNLOAD, REUSE_CACHE_IF_EXISTS or
         REUSE_DATASET_IF_EXISTS. Default to REUSE_DATASET_IF_EXISTS.
+      max_cache_size (int): If set, budget of the cache in bytes. Completed
+        trials are evicted after each call adding new trials to the cache.
+      eviction_policy (EvictionPolicy): Order in which the trials are evicted
+        (LRU or LFU). Default to LRU.
+      num_retries (int): Number of times a failed download is retried.
+      retry_backoff (float): Delay (in seconds) before the first retry. The
+        delay is doubled at each retry (with random jitter).
     """
     self._cache_dir = os.path.expanduser(cache_dir or DEFAULT_CACHE_DIR)
     self._backend = local_backend.LocalBackend()
+    # The download threads are reused across calls (the threads are only
+    # started when needed)
+    self._download_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=_NUM_PARALLEL_DOWNLOADS)
 
     # The generation mode to indicates if we re-use the cached download or
     # force re-downloading data.
     mode = mode or util.GenerateMode.REUSE_DATASET_IF_EXISTS
     self._mode = util.GenerateMode(mode)  # str to Enum
 
+    self._num_retries = num_retries
+    self._retry_backoff = retry_backoff
+
+    self._max_cache_size = max_cache_size
+    eviction_policy = eviction_policy or cache.EvictionPolicy.LRU
+    self._eviction_policy = cache.EvictionPolicy(eviction_policy)
+
+    # Trials used by this download manager, protected from eviction
+    self._used_trial_ids = set()
+    # Whether the used trials should also be pinned on disk, to protect them
+    # from the eviction triggered by other processes
+    self._pin_on_disk = False
+    # Whether new trials have been added since the last eviction
+    self._cache_grown = False
+    # Size of the cache (None if unknown), updated with the added trials
+    self._cache_size = None
+    # Accessed trials whose metadata are not saved yet
+    self._pending_accesses = {}
+    self._cache_lock = threading.Lock()
+    # Number of trials being processed (reported as a gauge)
+    self._num_active_trials = 0
+
     # Create the root directory if not exists yet
     gfile.MakeDirs(self._cache_dir)
 
@@ -118,6 +183,8 @@ class DownloadManager(object):
     """Downloads the given urls.
 
     If one of the download already exists, the cached value will be reused.
+    Failed downloads are retried. If some downloads still fail, the other ones
+    are completed (and cached) before raising an error listing the failed urls.
 
     Args:
       urls_info (UrlInfo): The url to download. If a string is passed, it will
@@ -140,14 +207,17 @@ class DownloadManager(object):
           uri=url_info.url,
           uri_info=url_info,
           process_trial_fn=self._download,
+          num_retries=self._num_retries,
       )
 
     # Run the download function on each of the urls
-    return _parallel_run(
+    downloaded_filepaths = _parallel_run(
         _download,
         urls_info,
-        max_workers=_NUM_PARALLEL_DOWNLOADS,
+        executor=self._download_executor,
     )
+    self._maybe_gc()
+    return downloaded_filepaths
 
   def extract(self, extracts_info):
     """Extract the given path.
@@ -172,10 +242,14 @@ class DownloadManager(object):
         raise ValueError(
             'Trying to extract a file ({}) which is not in the cache of the '
             'download manager ({})'.format(extract_info.path, self._cache_dir))
-      extract_uri = util.lchop(extract_info.path, self._cache_dir)
-      # TODO(epot): There is a risk to reach the max length of filename (256
-      # characters in linux and 1k total on CNS)
-      extract_uri = os.path.join('extract://', extract_uri.strip('/'))
+      # The extraction is keyed by the archive content, so identical archives
+      # are only extracted once. The filename is kept as the name of the
+      # extracted file depends on it (ex: "abc.gz" => "abc").
+      extract_uri = os.path.join(
+          'extract://sha256',
+          self._get_content_sha256(extract_info.path),
+          os.path.basename(extract_info.path),
+      )
 
       # Process an extraction
       return self._process_and_cache_uri(
@@ -185,11 +259,13 @@ class DownloadManager(object):
       )
 
     # Run the extract function on each of the paths
-    return _parallel_run(
+    extracted_dirs = _parallel_run(
         _extract,
         extracts_info,
         max_workers=_NUM_PARALLEL_EXTRACTS,
     )
+    self._maybe_gc()
+    return extracted_dirs
 
   def download_and_extract(self, urls_info):
     """Convinience method to perform download+extract in a single command.
@@ -246,11 +322,78 @@ class DownloadManager(object):
       # Call the function to process the additional data
       return process_fn(trial.output_path)
 
-    return self._process_and_cache_uri(
+    cache_dir = self._process_and_cache_uri(
         uri=cache_uri,
         uri_info=None,
         process_trial_fn=inner_process,
     )
+    self._maybe_gc()
+    return cache_dir
+
+  def gc(self, max_cache_size=None):
+    """Evicts completed trials until the cache fits in its budget.
+
+    The trials used by this download manager (or pinned by other running
+    processes) are never evicted.
+
+    Args:
+      max_cache_size (int): Budget of the cache in bytes. Default to the
+        `max_cache_size` given to the constructor.
+
+    Returns:
+      evicted_ids (list[str]): The ids of the evicted trials.
+
+    Raises:
+      ValueError: If no budget is defined.
+    """
+    if max_cache_size is None:
+      max_cache_size = self._max_cache_size
+    if max_cache_size is None:
+      raise ValueError('gc() requires a max_cache_size.')
+    self._save_accesses()
+    with self._cache_lock:
+      # Scanned again at the next check
+      self._cache_size = None
+      return cache.evict(
+          self._cache_dir,
+          max_size=max_cache_size,
+          policy=self._eviction_policy,
+          pinned_ids=self._used_trial_ids,
+      )
+
+  def _maybe_gc(self):
+    """Evict trials if new trials have made the cache exceed its budget."""
+    self._save_accesses()
+    with self._cache_lock:
+      cache_grown, self._cache_grown = self._cache_grown, False
+    if self._max_cache_size is None or not cache_grown:
+      return
+    if self._cache_size is None:
+      self._cache_size = cache.get_cache_size(self._cache_dir)
+    if self._cache_size > self._max_cache_size:
+      self.gc()
+
+  @contextlib.contextmanager
+  def pin_trials(self):
+    """Protects the trials used within the context from other processes.
+
+    While the context is active, the used trials cannot be evicted by the `gc()`
+    of other processes sharing the same cache dir.
+
+    Yields:
+      None
+    """
+    with self._cache_lock:
+      self._pin_on_disk = True
+      for trial_id in self._used_trial_ids:
+        cache.add_pin(self._cache_dir, trial_id)
+    try:
+      yield
+    finally:
+      with self._cache_lock:
+        self._pin_on_disk = False
+        for trial_id in self._used_trial_ids:
+          cache.remove_pin(self._cache_dir, trial_id)
 
   @property
   def mode(self):
@@ -259,7 +402,8 @@ class DownloadManager(object):
 
   # Internal functions
 
-  def _process_and_cache_uri(self, uri, uri_info, process_trial_fn):
+  def _process_and_cache_uri(self, uri, uri_info, process_trial_fn,
+                             num_retries=0):
     """Internal function which manage the cache and launch the trials.
 
     Args:
@@ -268,24 +412,130 @@ class DownloadManager(object):
         be saved with the trial
       process_trial_fn (fct): Function with the signature "(UriTrial) -> None"
         which is called if the uri isn't found in the cache
+      num_retries (int): Number of times process_trial_fn is retried on failure
 
     Returns:
       output_path (str): The output from the Trial
+
+    Raises:
+      DownloadError: If the trial has failed (after all retries).
     """
 
     # Maybe should normalize the uri so that semantically equivalent urls
     # are detected as the same (ex: "http://a.io/" and "http://a.io") and
     # stored in the same register. Or issue guidelines about the url format.
 
-    # Either get the previous cached location or build a new trial
-    trial = self._get_or_create_trial(uri=uri, uri_info=uri_info)
-
-    if trial.status != download_pb2.UriTrial.COMPLETED:
-      with self._process_trial_controllers(trial):
-        process_trial_fn(trial)
+    trial_id = get_trial_id(uri)
+
+    # Only one thread/process at a time process a given trial. The other ones
+    # wait and reuse the result.
+    with cache.lock_trial(self._cache_dir, trial_id, blocking=False) as locked:
+      if not locked:
+        util.build_log(prefix=trial_id)('Waiting for another process...')
+    with cache.lock_trial(self._cache_dir, trial_id):
+      # Either get the previous cached location or build a new trial
+      trial = self._get_or_create_trial(uri=uri, uri_info=uri_info)
+
+      if trial.status != download_pb2.UriTrial.COMPLETED:
+        self._process_trial(trial, uri, process_trial_fn, num_retries)
+        trial.size_bytes = tf_utils.get_path_size(
+            os.path.join(self._cache_dir, trial.id))
+        with self._cache_lock:
+          self._cache_grown = True
+          if self._cache_size is not None:
+            # Stored contents shared with other trials are counted again, so
+            # this may trigger an eviction scan which frees nothing
+            self._cache_size += trial.size_bytes
+        metrics.increment('download.bytes', trial.size_bytes,
+                          {'host': util.get_uri_host(uri)})
+        self._record_access(trial, is_new=True)
+      else:
+        metrics.increment('download.cache_hits',
+                          tags={'host': util.get_uri_host(uri)})
+        self._record_access(trial)
 
     return trial.output_path  # Return cached or processed trial
 
+  def _process_trial(self, trial, uri, process_trial_fn, num_retries):
+    """Process the trial, retrying on failure, and record its outcome."""
+    log = util.build_log(prefix=trial.id)
+    tags = {'host': util.get_uri_host(uri)}
+    trial.start_time.GetCurrentTime()
+    start_time = time.time()
+    self._update_active_trials(1)
+    try:
+      for attempt in range(num_retries + 1):
+        try:
+          with self._process_trial_controllers(trial):
+            process_trial_fn(trial)
+        except Exception as e:  # pylint: disable=broad-except
+          trial.error_msg = '{}: {}'.format(type(e).__name__, e)
+          if attempt < num_retries:
+            metrics.increment('download.retries', tags=tags)
+            delay = min(self._retry_backoff * 2**attempt, _MAX_RETRY_DELAY)
+            delay *= random.uniform(0.5, 1.5)  # Jitter
+            log('Attempt {} of {} failed ({}). Retrying in {:.1f}s...',
+                attempt + 1, uri, trial.error_msg, delay)
+            time.sleep(delay)
+            continue
+          # Record the failure
+          metrics.increment('download.failures', tags=tags)
+          trial.status = download_pb2.UriTrial.ABORTED
+          trial.end_time.GetCurrentTime()
+          cache.save_trial(self._cache_dir, trial)
+          raise DownloadError('{} failed after {} attempt(s): {}'.format(
+              uri, attempt + 1, trial.error_msg))
+        else:
+          break
+    finally:
+      self._update_active_trials(-1)
+    metrics.record_time('download.latency', time.time() - start_time, tags)
+    trial.status = download_pb2.UriTrial.COMPLETED
+    trial.error_msg = ''
+    trial.end_time.GetCurrentTime()
+
+  def _update_active_trials(self, delta):
+    with self._cache_lock:
+      self._num_active_trials += delta
+      metrics.set_gauge('download.active_trials', self._num_active_trials)
+
+  def _record_access(self, trial, is_new=False):
+    """Update the trial access time and protect it from eviction.
+
+    Only the first access of the download manager to a cached trial is
+    recorded, and its metadata are saved at the end of the call (see
+    `_save_accesses`).
+
+    Args:
+      trial (UriTrial): The completed trial.
+      is_new (bool): Whether the trial has just been processed, in which case
+        its metadata are saved immediately.
+    """
+    with self._cache_lock:
+      if trial.id in self._used_trial_ids and not is_new:
+        return
+      self._used_trial_ids.add(trial.id)
+      if self._pin_on_disk:
+        cache.add_pin(self._cache_dir, trial.id)
+      cache.touch_trial(trial)
+      if not is_new:
+        self._pending_accesses[trial.id] = trial
+        return
+      self._pending_accesses.pop(trial.id, None)
+    cache.save_trial(self._cache_dir, trial)
+
+  def _save_accesses(self):
+    """Save the metadata of the accessed trials."""
+    with self._cache_lock:
+      trials = list(self._pending_accesses.values())
+      self._pending_accesses = {}
+    for trial in trials:
+      # Skip the trials being processed again or evicted by another process
+      with cache.lock_trial(self._cache_dir, trial.id,
+                            blocking=False) as locked:
+        if locked and gfile.Exists(trial.output_path):
+          cache.save_trial(self._cache_dir, trial)
+
   def _get_or_create_trial(self, uri, uri_info=None):
     """Create a new trial or get the previous one.
 
@@ -301,13 +551,7 @@ class DownloadManager(object):
       trial (UriTrial): Result of the trial containing the destination, status,
         timestamp,...
     """
-    # The generation is deterministic so generating keys for the same uri will
-    # always gives the same result
-    trial_id = '{}_{}'.format(
-        util.escape_uri(uri),
-        util.hash_uri(uri),
-    )
-
+    trial_id = get_trial_id(uri)
     log = util.build_log(prefix=trial_id)
 
     # Generate a new trial to eventually use
@@ -321,15 +565,29 @@ class DownloadManager(object):
     if gfile.Exists(trial.output_path):
 
       # If the directory exists, the previous trial was complete (as it was
-      # renamed successfully from ".incomplete")
-      if self._mode == util.GenerateMode.FORCE_REDOWNLOAD:
+      # renamed successfully from ".incomplete"). When forcing the
+      # re-download, the trials already processed by this download manager
+      # (ex: same url used twice) are reused.
+      if (self._mode == util.GenerateMode.FORCE_REDOWNLOAD and
+          trial_id not in self._used_trial_ids):
         log('Cleanup previous trial: {}', trial.output_path)
-        gfile.DeleteRecursively(trial.output_path)
+        cache.delete_trial(self._cache_dir, trial_id)
       else:
         log('Reusing previously cached data...')
         # Try to reuse the previous download
         trial.status = download_pb2.UriTrial.COMPLETED
 
+        # Restore the cache bookkeeping of the previous trial
+        previous_trial = cache.load_trial(self._cache_dir, trial_id)
+        if previous_trial is not None:
+          trial.access_count = previous_trial.access_count
+          trial.size_bytes = previous_trial.size_bytes
+          trial.content_sha256 = previous_trial.content_sha256
+          trial.start_time.CopyFrom(previous_trial.start_time)
+          trial.end_time.CopyFrom(previous_trial.end_time)
+        else:  # Cached before the metadata were recorded
+          trial.size_bytes = tf_utils.get_path_size(trial.output_path)
+
         # For the downloads, the output_path contains the file
         # TODO(epot): Should instead write the meta-data on disk (in a
         # ._trial.json) and replace ListDirectory() by a version which filter
@@ -347,6 +605,16 @@ class DownloadManager(object):
 
     return trial
 
+  def _get_content_sha256(self, path):
+    """Returns the sha256 of the file content (reuse the download one)."""
+    # The downloaded files are at "<cache_dir>/<trial_id>/<filename>"
+    trial_id = util.lchop(path, self._cache_dir).strip('/').split('/')[0]
+    trial = cache.load_trial(self._cache_dir, trial_id)
+    if (trial is not None and trial.content_sha256 and
+        trial.output_path == path):
+      return trial.content_sha256
+    return util.hash_file(path)
+
   def _process_trial_controllers(self, trial):
     """Decorators to apply before and after the process_trial_fn."""
     return use_incomplete_dir(trial)
@@ -370,14 +638,15 @@ class DownloadManager(object):
 
     gfile.MakeDirs(trial.output_path)
 
-    log('Start downloading...')
+    log('Start downloading {}...', trial.url_info.url)
     self._backend.download(trial)
 
-    # TODO(epot): Compute the checksum
-
     # Update the output path
     trial.output_path = get_download_filepath(trial)
 
+    # Store the file content only once, even if downloaded from multiple urls
+    trial.content_sha256 = cache.store_blob(self._cache_dir, trial.output_path)
+
     log('Download complete at {}', trial.output_path)
 
   def _extract(self, trial):
@@ -429,6 +698,16 @@ class DownloadManager(object):
       trial.output_path = get_download_filepath(trial)
 
 
+def get_trial_id(uri):
+  """Returns the id of the trial associated with the uri."""
+  # The generation is deterministic so generating keys for the same uri will
+  # always gives the same result
+  return '{}_{}'.format(
+      util.escape_uri(uri),
+      util.hash_uri(uri),
+  )
+
+
 def to_url_info(value):
   """Convert the strings into UrlInfo."""
   if isinstance(value, six.string_types):
@@ -477,12 +756,18 @@ def get_download_filepath(trial):
 @contextlib.contextmanager
 def use_incomplete_dir(trial):
   """Wrap the trial in a temporary .incomplete path while it is processed."""
-  # Replace the output dir by a temporary dir
+  # Replace the output dir by a temporary dir. The trial is locked while
+  # processed, so an existing temporary dir is a leftover from a crash.
   output_path_original = trial.output_path
-  # Should add random string to avoid collision with local download manager ?
   output_path_tmp = trial.output_path + '.incomplete'
+  if gfile.Exists(output_path_tmp):
+    gfile.DeleteRecursively(output_path_tmp)
   trial.output_path = output_path_tmp
-  yield
+  try:
+    yield
+  except Exception:  # Restore the original path, for the trial to be retried
+    trial.output_path = output_path_original
+    raise
   if not trial.output_path.startswith(output_path_tmp):
     raise ValueError(
         'The output path for {} has been modified to {} and do not match '
@@ -492,23 +777,50 @@ def use_incomplete_dir(trial):
   trial.output_path = output_path_original + output_path_extension
 
 
-def _parallel_run(function, input_struct, max_workers=1):
-  """Run the function on each element of data_struct using a pool of workers."""
+def _parallel_run(function, input_struct, max_workers=1, executor=None):
+  """Run the function on each element of data_struct using a pool of workers.
 
-  # Distribute the work in a pool
-  launch_thread_pool = concurrent.futures.ThreadPoolExecutor
-  with launch_thread_pool(max_workers=max_workers) as executor:
+  Args:
+    function (fct): Function to apply to each element.
+    input_struct (obj): Singleton, list or dict of elements.
+    max_workers (int): Number of workers of the pool.
+    executor (concurrent.futures.Executor): If given, the executor is used
+      (and not shutdown) instead of creating a new pool of `max_workers`.
 
-    def launch_worker(value):
-      return executor.submit(function, value)
+  Returns:
+    output_struct (obj): The results, with the same structure as the inputs.
+  """
+  if executor is None:
+    launch_thread_pool = concurrent.futures.ThreadPoolExecutor
+    with launch_thread_pool(max_workers=max_workers) as executor:
+      return _parallel_run(function, input_struct, executor=executor)
 
-    output_struct = _map(launch_worker, input_struct)
+  # Distribute the work in the pool
+  def launch_worker(value):
+    return executor.submit(function, value)
 
-  # Gather all results once all workers have finished
-  def gather_results(value):
-    return value.result()
+  output_struct = _map(launch_worker, input_struct)
 
-  return _map(gather_results, output_struct)
+  # Gather all results once all workers have finished. The failures are
+  # raised only after all the workers are done, so the successful ones are
+  # not abandoned.
+  failures = []
+
+  def gather_results(value):
+    try:
+      return value.result()
+    except Exception as e:  # pylint: disable=broad-except
+      failures.append(e)
+      return None
+
+  output_struct = _map(gather_results, output_struct)
+
+  if len(failures) == 1:
+    raise failures[0]
+  elif failures:
+    raise DownloadError('{} tasks failed:\n{}'.format(
+        len(failures), '\n'.join('  * {}'.format(e) for e in failures)))
+  return output_struct
 
 
 def _map(function, data_struct):
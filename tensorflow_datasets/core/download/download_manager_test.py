@@ -20,16 +20,58 @@ from __future__ import division
 from __future__ import print_function
 
 import gzip
+import io
 import os
 import shutil
 import tarfile
+import threading
 import time
 import zipfile
 
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
 import tensorflow as tf
 from tensorflow import gfile
+from tensorflow_datasets.core import metrics
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.core.download import cache
 from tensorflow_datasets.core.download import download_manager
+from tensorflow_datasets.core.download import local_backend
 from tensorflow_datasets.core.download import util
+from tensorflow_datasets.core.download.proto import download_generated_pb2 as download_pb2
+
+
+def _mock_response(url, content):
+  """Returns a mock of the requests.Response."""
+  response = tf.test.mock.Mock()
+  response.url = url
+  response.iter_content.return_value = [content]
+  return response
+
+
+class _SmallFilesHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  """Serves small files (whose content is their path) with keep-alive."""
+
+  protocol_version = 'HTTP/1.1'  # Keep the connections alive
+
+  def setup(self):
+    BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+    self.server.connections.append(self.client_address)
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    content = tf.compat.as_bytes('content of {}'.format(self.path))
+    self.send_response(200)
+    self.send_header('Content-Length', str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def log_message(self, *args):
+    pass
+
+
+class _ThreadedHTTPServer(socketserver.ThreadingMixIn,
+                          BaseHTTPServer.HTTPServer):
+  daemon_threads = True
 
 
 class DownloadManagerBaseTest(tf.test.TestCase):
@@ -151,6 +193,214 @@ class DownloadManagerBaseTest(tf.test.TestCase):
     # The process function should have been called twice
     self.assertEqual(process_mock.call_count, 2)
 
+  def test_max_cache_size(self):
+    """Check that least recently used trials are evicted."""
+
+    def write_data(cache_dir):
+      with gfile.Open(os.path.join(cache_dir, 'data.bin'), 'wb') as f:
+        f.write(b'x' * 10)
+
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager_1 = download_manager.DownloadManager(cache_dir=cache_dir)
+      dir_a = dl_manager_1.execute_and_cache(write_data, cache_key='/a')
+      dir_b = dl_manager_1.execute_and_cache(write_data, cache_key='/b')
+
+      # The trials used by the manager are protected from eviction
+      self.assertEqual([], dl_manager_1.gc(max_cache_size=0))
+
+      dl_manager_2 = download_manager.DownloadManager(
+          cache_dir=cache_dir,
+          max_cache_size=25,
+      )
+      dl_manager_2.execute_and_cache(write_data, cache_key='/a')  # Reuse 'a'
+      dir_c = dl_manager_2.execute_and_cache(write_data, cache_key='/c')
+      # 'b' is the least recently used
+      self.assertTrue(gfile.Exists(dir_a))
+      self.assertFalse(gfile.Exists(dir_b))
+      self.assertTrue(gfile.Exists(dir_c))
+
+  def test_cache_bookkeeping_writes(self):
+    """Check that the cache is not scanned or rewritten at each call."""
+
+    def write_data(cache_dir):
+      with gfile.Open(os.path.join(cache_dir, 'data.bin'), 'wb') as f:
+        f.write(b'x' * 10)
+
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager_1 = download_manager.DownloadManager(cache_dir=cache_dir)
+      dl_manager_1.execute_and_cache(write_data, cache_key='/a')
+
+      dl_manager_2 = download_manager.DownloadManager(
+          cache_dir=cache_dir,
+          max_cache_size=100,
+      )
+      with tf.test.mock.patch.object(
+          cache, 'save_trial', wraps=cache.save_trial) as save_trial, \
+          tf.test.mock.patch.object(
+              cache, 'list_trials', wraps=cache.list_trials) as list_trials:
+        for _ in range(3):
+          dl_manager_2.execute_and_cache(write_data, cache_key='/a')
+        # The access to the cached trial is only saved once
+        self.assertEqual(1, save_trial.call_count)
+        for key in ['/b', '/c', '/d']:
+          dl_manager_2.execute_and_cache(write_data, cache_key=key)
+        # The cache is scanned once, then its size is updated
+        self.assertEqual(1, list_trials.call_count)
+      trial_id = download_manager.get_trial_id('local://a')
+      trial = cache.load_trial(cache_dir, trial_id)
+      self.assertEqual(2, trial.access_count)
+
+      # Once over the budget, the least recently used trial is evicted
+      dl_manager_3 = download_manager.DownloadManager(
+          cache_dir=cache_dir,
+          max_cache_size=40,
+      )
+      dl_manager_3.execute_and_cache(write_data, cache_key='/e')
+      self.assertFalse(gfile.Exists(os.path.join(cache_dir, trial_id)))
+
+  @tf.test.mock.patch('requests.Session.get')
+  def test_max_cache_size_shared_content(self, mock_get):
+    """Check that the content downloaded from two urls is counted once."""
+    urls = ['http://a.org/data.bin', 'http://mirror.a.org/data.bin']
+    mock_get.side_effect = [_mock_response(url, b'x' * 10) for url in urls]
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager_1 = download_manager.DownloadManager(cache_dir=cache_dir)
+      output_files = dl_manager_1.download(urls)
+
+      # The two trials only use the size of a single copy
+      dl_manager_2 = download_manager.DownloadManager(cache_dir=cache_dir)
+      self.assertEqual([], dl_manager_2.gc(max_cache_size=15))
+      self.assertEqual(2, len(dl_manager_2.gc(max_cache_size=5)))
+      for output_file in output_files:
+        self.assertFalse(gfile.Exists(output_file))
+      self.assertFalse(gfile.ListDirectory(
+          os.path.join(cache_dir, cache._BLOBS_DIRNAME)))
+
+  @tf.test.mock.patch('requests.Session.get')
+  def test_download_retry(self, mock_get):
+    """Check that transient failures are retried and recorded."""
+    mock_get.side_effect = [
+        IOError('503'),
+        IOError('503'),
+        _mock_response('http://a.org/retry.txt', b'Hello world'),
+    ]
+    sink = metrics.InMemorySink()
+    previous_sink = metrics.set_sink(sink)
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager = download_manager.DownloadManager(
+          cache_dir=cache_dir,
+          num_retries=2,
+          retry_backoff=0.,
+      )
+      try:
+        with tf.test.mock.patch.object(
+            sink, 'increment', wraps=sink.increment) as increment:
+          output_file = dl_manager.download('http://a.org/retry.txt')
+          dl_manager.download('http://a.org/retry.txt')
+      finally:
+        metrics.set_sink(previous_sink)
+      with gfile.Open(output_file, 'rb') as f:
+        self.assertEqual(b'Hello world', f.read())
+      self.assertEqual(3, mock_get.call_count)
+
+      # The retries, size and latency of the trial are recorded
+      self.assertEqual(2, sink.counters['download.retries'])
+      self.assertEqual(len(b'Hello world'), sink.counters['download.bytes'])
+      self.assertEqual(1, sink.counters['download.cache_hits'])
+      self.assertEqual(1, len(sink.timers['download.latency']))
+      self.assertEqual(0, sink.gauges['download.active_trials'])
+      # Tagged with the host rather than the URL (one series per file)
+      self.assertEqual(
+          [{'host': 'a.org'}] * 4,
+          [args[2] for args, _ in increment.call_args_list])
+
+      trial_id = download_manager.get_trial_id('http://a.org/retry.txt')
+      trial = cache.load_trial(cache_dir, trial_id)
+      self.assertEqual(download_pb2.UriTrial.COMPLETED, trial.status)
+      self.assertGreater(trial.end_time.ToNanoseconds(), 0)
+
+  @tf.test.mock.patch('requests.Session.get')
+  def test_download_failures(self, mock_get):
+    """Check that a failure does not abandon the other downloads."""
+
+    def get(url, stream):
+      del stream
+      if 'fail' in url:
+        raise IOError('Service unavailable')
+      return _mock_response(url, b'Hello world')
+
+    mock_get.side_effect = get
+    urls = [
+        'http://a.org/ok_1.txt',
+        'http://a.org/fail_1.txt',
+        'http://a.org/ok_2.txt',
+        'http://a.org/fail_2.txt',
+    ]
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager = download_manager.DownloadManager(
+          cache_dir=cache_dir,
+          num_retries=1,
+          retry_backoff=0.,
+      )
+      with self.assertRaises(download_manager.DownloadError) as context:
+        dl_manager.download(urls)
+      # Only the failed urls are reported
+      error_msg = str(context.exception)
+      self.assertIn('2 tasks failed', error_msg)
+      self.assertIn('fail_1.txt', error_msg)
+      self.assertIn('fail_2.txt', error_msg)
+      self.assertNotIn('ok_1.txt', error_msg)
+
+      # The failures are recorded in the trials
+      trial = cache.load_trial(
+          cache_dir, download_manager.get_trial_id(urls[1]))
+      self.assertEqual(download_pb2.UriTrial.ABORTED, trial.status)
+      self.assertIn('Service unavailable', trial.error_msg)
+
+      # The successful downloads are kept
+      mock_get.reset_mock()
+      dl_manager.download(urls[0])
+      dl_manager.download(urls[2])
+      self.assertEqual(0, mock_get.call_count)
+
+
+class DownloadManagerHttpTest(tf.test.TestCase):
+
+  def setUp(self):
+    self.server = _ThreadedHTTPServer(('localhost', 0), _SmallFilesHandler)
+    self.server.connections = []
+    self.server_thread = threading.Thread(target=self.server.serve_forever)
+    self.server_thread.daemon = True
+    self.server_thread.start()
+
+  def tearDown(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+  def test_download_many_small_files(self):
+    num_files = 200
+    urls = [
+        'http://localhost:{}/files/{}.txt'.format(self.server.server_port, i)
+        for i in range(num_files)
+    ]
+    with test_utils.tmp_dir(self.get_temp_dir()) as cache_dir:
+      dl_manager = download_manager.DownloadManager(cache_dir=cache_dir)
+      output_files = dl_manager.download(urls)
+
+      self.assertEqual(num_files, len(output_files))
+      for i, output_file in enumerate(output_files):
+        self.assertEqual('{}.txt'.format(i), os.path.basename(output_file))
+        with gfile.Open(output_file, 'rb') as f:
+          self.assertEqual(
+              tf.compat.as_bytes('content of /files/{}.txt'.format(i)),
+              f.read())
+
+    # The connections are pooled and kept alive across downloads
+    self.assertLessEqual(
+        len(self.server.connections),
+        local_backend._MAX_CONNECTIONS_PER_HOST,
+    )
+
 
 class DownloadManagerClassTest(tf.test.TestCase):
 
@@ -186,25 +436,65 @@ class DownloadManagerClassTest(tf.test.TestCase):
     with gfile.Open(os.path.join(dirpath, 'dummy.txt')) as f:
       self.assertEqual(self.dummy_file_contents, f.read().strip())
 
-  @tf.test.mock.patch('six.moves.urllib.request.urlopen')
-  def test_download(self, mock_urlopen):
-    # Path urllib.request.urlopen to return some dummy message
-    urlfile_mock = tf.test.mock.Mock()
-    urlfile_mock.geturl.return_value = 'http://b.org/response.txt'
-    urlfile_mock.read.return_value = 'Hello world'
-    mock_urlopen.return_value = urlfile_mock
+  @tf.test.mock.patch('requests.Session.get')
+  def test_download(self, mock_get):
+    # Path requests.Session.get to return some dummy message
+    mock_get.return_value = _mock_response(
+        'http://b.org/response.txt', b'Hello world')
 
-    with tf.test.mock.patch('six.moves.urllib.request.urlopen', mock_urlopen):
-      output_file = self.dl_manager.download('https://a.org/query.txt')
+    output_file = self.dl_manager.download('https://a.org/query.txt')
 
     # Correct url called
-    mock_urlopen.assert_called_with('https://a.org/query.txt')
+    mock_get.assert_called_with('https://a.org/query.txt', stream=True)
     # Name correctly extracted
     self.assertEqual(os.path.basename(output_file), 'response.txt')
     # Content correctly fetched
     with gfile.Open(output_file, 'rb') as f:
       self.assertEqual(b'Hello world', f.read())
 
+  @tf.test.mock.patch('requests.Session.get')
+  def test_download_deduplicated(self, mock_get):
+    # Both urls serve the same archive
+    gzip_content = io.BytesIO()
+    with gzip.GzipFile(fileobj=gzip_content, mode='wb') as gf:
+      gf.write(b'hello world')
+    mock_get.return_value = _mock_response(
+        'http://b.org/dedup.txt.gz', gzip_content.getvalue())
+
+    output_files = self.dl_manager.download([
+        'https://a.org/dedup.txt.gz',
+        'https://mirror.a.org/dedup.txt.gz?token=abc',
+    ])
+    # Each url has its own trial, but the content is stored only once
+    self.assertNotEqual(output_files[0], output_files[1])
+    self.assertEqual(
+        os.stat(output_files[0]).st_ino, os.stat(output_files[1]).st_ino)
+
+    # The archive is extracted only once
+    extracted_files = self.dl_manager.extract(output_files)
+    self.assertEqual(extracted_files[0], extracted_files[1])
+    with gfile.Open(extracted_files[0], 'rb') as f:
+      self.assertEqual(b'hello world', f.read())
+
+  @tf.test.mock.patch('requests.Session.get')
+  def test_download_single_flight(self, mock_get):
+
+    def slow_get(url, stream):
+      del url, stream
+      time.sleep(0.5)  # Let the other thread wait for the download
+      return _mock_response('http://b.org/single_flight.txt', b'Hello world')
+
+    mock_get.side_effect = slow_get
+
+    # The same url is given twice
+    output_files = self.dl_manager.download([
+        'https://a.org/single_flight.txt',
+        'https://a.org/single_flight.txt',
+    ])
+    self.assertEqual(output_files[0], output_files[1])
+    # Downloaded only once
+    self.assertEqual(1, mock_get.call_count)
+
   def test_extract_zip(self):
     # Create zip
     zip_input = os.path.join(self.input_dir, 'foo.zip')
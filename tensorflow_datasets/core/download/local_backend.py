@@ -21,29 +21,63 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import contextlib
 import gzip
 import os
 import tarfile
+import threading
 import zipfile
 
+import requests
 import six.moves.urllib as urllib
 from tensorflow import gfile
 
 from tensorflow_datasets.core.download import download_backend
 from tensorflow_datasets.core.download import util
 
+# Maximum number of simultaneous connections (and pooled keep-alive
+# connections) to a same host
+_MAX_CONNECTIONS_PER_HOST = 16
+# Size of the chunks written to disk while downloading
+_DOWNLOAD_CHUNK_SIZE = 2**16
+
 
 class LocalBackend(download_backend.DownloadBackendAbc):
-  """Download manager which saves data locally."""
+  """Download manager which saves data locally.
+
+  The HTTP connections are pooled and kept alive across downloads, which avoid
+  re-opening a connection for each file when downloading many small files from
+  the same host. The number of simultaneous connections per host is bounded.
+  """
+
+  def __init__(self):
+    # The session is shared across the download threads
+    self._session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_maxsize=_MAX_CONNECTIONS_PER_HOST)
+    self._session.mount('http://', adapter)
+    self._session.mount('https://', adapter)
+
+    self._host_semaphores = collections.defaultdict(
+        lambda: threading.BoundedSemaphore(_MAX_CONNECTIONS_PER_HOST))
+    self._host_semaphores_lock = threading.Lock()
 
   def download(self, trial):
     """Download and extract the given url (thread safe)."""
     url = trial.url_info.url
     if any(url.startswith(u) for u in ('http://', 'https://')):
-      download(url, trial.output_path)
+      with self._host_semaphore(url):
+        download(url, trial.output_path, session=self._session)
     else:
       raise ValueError('Unsuported URI: {}'.format(url))
 
+  def _host_semaphore(self, url):
+    """Returns the semaphore limiting the connections to the url host."""
+    host = urllib.parse.urlparse(url).netloc
+    with self._host_semaphores_lock:
+      return self._host_semaphores[host]
+
   def extract_zip(self, src, dst):
     """Extract the given file."""
     return extract_zip(src, dst)
@@ -57,30 +91,35 @@ class LocalBackend(download_backend.DownloadBackendAbc):
     return extract_tar(src, dst)
 
 
-def download(uri, dst_dir):
+def download(uri, dst_dir, session=None):
   """Download the given URI.
 
   Args:
     uri: URI to copy (or download) from.
     dst_dir: path to the directory that will be used.
+    session: `requests.Session` to use (to reuse the pooled connections). If
+      None, a new connection is opened.
 
   Returns:
     The path to the downloaded file.
   """
-  # Download the URI
-  # Should use context manager with Py3 (with urllib2.urlopen(uri) as response)
-  response = urllib.request.urlopen(uri)
-  filename = response.geturl().split('/')[-1]
-  incomplete_path = os.path.join(dst_dir, '{}.incomplete'.format(filename))
-  dst_path = os.path.join(dst_dir, filename)
-
-  # TODO(epot): Could add a shared tqdm instance across parallel download
-  # to display a single shared progression bar.
-
-  # TODO(epot): Add Google Drive support (cf Ryan code)
-
-  with gfile.Open(incomplete_path, 'wb') as f:
-    f.write(response.read())
+  session = session or requests
+  # Download the URI. The content is streamed to disk by chunks. Closing the
+  # fully read response release the connection back to the pool.
+  with contextlib.closing(session.get(uri, stream=True)) as response:
+    response.raise_for_status()
+    filename = response.url.split('/')[-1]
+    incomplete_path = os.path.join(dst_dir, '{}.incomplete'.format(filename))
+    dst_path = os.path.join(dst_dir, filename)
+
+    # TODO(epot): Could add a shared tqdm instance across parallel download
+    # to display a single shared progression bar.
+
+    # TODO(epot): Add Google Drive support (cf Ryan code)
+
+    with gfile.Open(incomplete_path, 'wb') as f:
+      for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+        f.write(chunk)
   gfile.Rename(incomplete_path, dst_path)
 
   return dst_path
@@ -35,7 +35,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   package='tensorflow_datasets.download.proto',
   syntax='proto3',
   serialized_options=None,
-  serialized_pb=_b('\n\x0e\x64ownload.proto\x12\"tensorflow_datasets.download.proto\x1a\x1fgoogle/protobuf/timestamp.proto\"\x16\n\x07UrlInfo\x12\x0b\n\x03url\x18\x01 \x01(\t\"\x9a\x01\n\x0b\x45xtractInfo\x12\x0c\n\x04path\x18\x01 \x01(\t\x12J\n\x08\x66iletype\x18\x03 \x01(\x0e\x32\x38.tensorflow_datasets.download.proto.ExtractInfo.FileType\"1\n\x08\x46ileType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x07\n\x03RAR\x10\x01\x12\x07\n\x03ZIP\x10\x02\x12\x06\n\x02GZ\x10\x03\"\xc5\x03\n\x08UriTrial\x12\n\n\x02id\x18\x01 \x01(\t\x12\x13\n\x0boutput_path\x18\x02 \x01(\t\x12?\n\x08url_info\x18\n \x01(\x0b\x32+.tensorflow_datasets.download.proto.UrlInfoH\x00\x12G\n\x0c\x65xtract_info\x18\x0b \x01(\x0b\x32/.tensorflow_datasets.download.proto.ExtractInfoH\x00\x12H\n\x06status\x18\x03 \x01(\x0e\x32\x38.tensorflow_datasets.download.proto.UriTrial.TrialStatus\x12\x11\n\terror_msg\x18\x04 \x01(\t\x12.\n\nstart_time\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_time\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\"G\n\x0bTrialStatus\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0f\n\x0bIN_PROGRESS\x10\x01\x12\r\n\tCOMPLETED\x10\x02\x12\x0b\n\x07\x41\x42ORTED\x10\x03\x42\n\n\x08uri_infob\x06proto3')
+  serialized_pb=_b('\n\x0e\x64ownload.proto\x12\"tensorflow_datasets.download.proto\x1a\x1fgoogle/protobuf/timestamp.proto\"\x16\n\x07UrlInfo\x12\x0b\n\x03url\x18\x01 \x01(\t\"\x9a\x01\n\x0b\x45xtractInfo\x12\x0c\n\x04path\x18\x01 \x01(\t\x12J\n\x08\x66iletype\x18\x03 \x01(\x0e\x32\x38.tensorflow_datasets.download.proto.ExtractInfo.FileType\"1\n\x08\x46ileType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x07\n\x03RAR\x10\x01\x12\x07\n\x03ZIP\x10\x02\x12\x06\n\x02GZ\x10\x03\"\xbd\x04\n\x08UriTrial\x12\n\n\x02id\x18\x01 \x01(\t\x12\x13\n\x0boutput_path\x18\x02 \x01(\t\x12?\n\x08url_info\x18\n \x01(\x0b\x32+.tensorflow_datasets.download.proto.UrlInfoH\x00\x12G\n\x0c\x65xtract_info\x18\x0b \x01(\x0b\x32/.tensorflow_datasets.download.proto.ExtractInfoH\x00\x12H\n\x06status\x18\x03 \x01(\x0e\x32\x38.tensorflow_datasets.download.proto.UriTrial.TrialStatus\x12\x11\n\terror_msg\x18\x04 \x01(\t\x12.\n\nstart_time\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12,\n\x08\x65nd_time\x18\x06 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x34\n\x10last_access_time\x18\x07 \x01(\x0b\x32\x1a.google.protobuf.Timestamp\x12\x14\n\x0c\x61\x63\x63\x65ss_count\x18\x08 \x01(\x03\x12\x12\n\nsize_bytes\x18\t \x01(\x03\x12\x16\n\x0e\x63ontent_sha256\x18\x0c \x01(\t\"G\n\x0bTrialStatus\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0f\n\x0bIN_PROGRESS\x10\x01\x12\r\n\tCOMPLETED\x10\x02\x12\x0b\n\x07\x41\x42ORTED\x10\x03\x42\n\n\x08uri_infob\x06proto3')
   ,
   dependencies=[google_dot_protobuf_dot_timestamp__pb2.DESCRIPTOR,])
 
@@ -96,8 +96,8 @@ _URITRIAL_TRIALSTATUS = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   serialized_options=None,
-  serialized_start=639,
-  serialized_end=710,
+  serialized_start=759,
+  serialized_end=830,
 )
 _sym_db.RegisterEnumDescriptor(_URITRIAL_TRIALSTATUS)
 
@@ -235,6 +235,34 @@ _URITRIAL = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='last_access_time', full_name='tensorflow_datasets.download.proto.UriTrial.last_access_time', index=8,
+      number=7, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='access_count', full_name='tensorflow_datasets.download.proto.UriTrial.access_count', index=9,
+      number=8, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='size_bytes', full_name='tensorflow_datasets.download.proto.UriTrial.size_bytes', index=10,
+      number=9, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='content_sha256', full_name='tensorflow_datasets.download.proto.UriTrial.content_sha256', index=11,
+      number=12, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -252,7 +280,7 @@ _URITRIAL = _descriptor.Descriptor(
       index=0, containing_type=None, fields=[]),
   ],
   serialized_start=269,
-  serialized_end=722,
+  serialized_end=842,
 )
 
 _EXTRACTINFO.fields_by_name['filetype'].enum_type = _EXTRACTINFO_FILETYPE
@@ -262,6 +290,7 @@ _URITRIAL.fields_by_name['extract_info'].message_type = _EXTRACTINFO
 _URITRIAL.fields_by_name['status'].enum_type = _URITRIAL_TRIALSTATUS
 _URITRIAL.fields_by_name['start_time'].message_type = google_dot_protobuf_dot_timestamp__pb2._TIMESTAMP
 _URITRIAL.fields_by_name['end_time'].message_type = google_dot_protobuf_dot_timestamp__pb2._TIMESTAMP
+_URITRIAL.fields_by_name['last_access_time'].message_type = google_dot_protobuf_dot_timestamp__pb2._TIMESTAMP
 _URITRIAL_TRIALSTATUS.containing_type = _URITRIAL
 _URITRIAL.oneofs_by_name['uri_info'].fields.append(
   _URITRIAL.fields_by_name['url_info'])
@@ -33,6 +33,9 @@ import pytz
 from six.moves import urllib
 import tensorflow as tf
 
+# Size of the blocks read when hashing a file
+_HASH_BLOCK_SIZE = 2**20
+
 
 class GenerateMode(enum.Enum):
   """Enum for the different version conflict resolution modes."""
@@ -173,6 +176,25 @@ def escape_uri(uri):
   )
 
 
+def get_uri_host(uri):
+  """Host of the URI, or its scheme for the extract:// and local:// ones.
+
+  Unlike the URI, the host is shared by all the files of a dataset, so it can
+  tag the metrics without creating a series per file.
+
+  Args:
+    uri (str): the URI.
+
+  Returns:
+    str: the host (without port), or the scheme if the URI has no network
+      location.
+  """
+  parse_results = urllib.parse.urlparse(uri)
+  if parse_results.scheme in ('extract', 'local'):
+    return parse_results.scheme
+  return parse_results.hostname or parse_results.scheme
+
+
 def hash_uri(uri):
   """Hash of the URI string."""
   # Should use base64 instead of hex for shorter string.
@@ -180,6 +202,18 @@ def hash_uri(uri):
   return hashlib.sha256(uri).hexdigest()[:5]
 
 
+def hash_file(path):
+  """Sha256 of the file content (read by blocks to bound the memory)."""
+  checksum = hashlib.sha256()
+  with tf.gfile.Open(path, 'rb') as f:
+    while True:
+      block = f.read(_HASH_BLOCK_SIZE)
+      if not block:
+        break
+      checksum.update(block)
+  return checksum.hexdigest()
+
+
 def time_str():
   """Time string (current UTC datetime, precise to the second)."""
   curr_date = datetime.datetime.now()
@@ -19,13 +19,18 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import pdb
 
+import concurrent.futures
 import numpy as np
 import tensorflow as tf
 
 from tensorflow_datasets.core import dataset_builder
+from tensorflow_datasets.core import dataset_info
+from tensorflow_datasets.core import dataset_utils
 from tensorflow_datasets.core import registered
+from tensorflow_datasets.core import statistics
 
 # pylint: disable=unused-import,g-bad-import-order
 # TODO(rsepassi): Determine importing policy for tensorflow_datasets
@@ -41,6 +46,14 @@ flags.DEFINE_string("data_dir", None, "Directory for data")
 flags.DEFINE_string("cache_dir", None, "Directory for downloads")
 flags.DEFINE_boolean("debug", False,
                      "If True, will drop into debugger after generation")
+flags.DEFINE_integer("stats_batch_size", 256,
+                     "Number of examples reduced at once by the statistics")
+flags.DEFINE_integer("stats_parallelism", 8,
+                     "Number of shards read in parallel by the statistics")
+flags.DEFINE_boolean("recompute_stats", False,
+                     "If True, computes the statistics of the decoded features "
+                     "by reading the splits, instead of using the statistics "
+                     "of the stored features computed while writing them")
 
 STATS_STR = """
 Stats
@@ -52,7 +65,7 @@ Per-feature stats:
 """
 
 FEATURE_STATS_STR = """\
-{name}: {dtype} {shape}
+{name}: {shapes}
     {stats}\
 """
 
@@ -61,60 +74,106 @@ def main(_):
   builder = registered.builder(FLAGS.dataset_name, data_dir=FLAGS.data_dir)
   builder.download_and_prepare(cache_dir=FLAGS.cache_dir)
 
-  # TODO(rsepassi): Get splits from info
-  splits = [dataset_builder.Split.TRAIN, dataset_builder.Split.TEST]
-  for split in splits:
-    compute_stats(builder, split)
-
-
-def compute_stats(builder, split):
-  """Print statistics for this split."""
-  dataset = builder.as_dataset(split=split)
+  info = dataset_info.load_dataset_info(builder._data_dir)  # pylint: disable=protected-access
+  if info is None:  # Datasets generated before the metadata were added
+    info = dataset_info.DatasetInfo(name=builder.name)
+    for split in [dataset_builder.Split.TRAIN, dataset_builder.Split.TEST]:
+      info.splits.add(name=split.value)
+  for split_info in info.splits:
+    if split_info.statistics and not (FLAGS.recompute_stats or FLAGS.debug):
+      # Computed while writing the split
+      print_stats(builder, split_info)
+    else:
+      compute_stats(builder, split_info)
+  if not FLAGS.debug:
+    # The statistics are saved with the metadata, next to the data
+    dataset_info.save_dataset_info(builder._data_dir, info)  # pylint: disable=protected-access
+
+
+def compute_stats(builder, split_info):
+  """Computes, saves in split_info and prints the statistics of the split."""
+  split = dataset_builder.Split(split_info.name)
   if FLAGS.debug:
+    dataset = builder.as_dataset(split=split)
     iterator = tf.contrib.eager.Iterator(dataset)
     pdb.set_trace()
     del iterator
     return
 
-  first_example = None
-  count = 0
-  per_feature_stats = {}
-  for example in dataset:
-    count += 1
-    if first_example is None:
-      first_example = example
-      for k in example:
-        per_feature_stats[k] = {
-            "min": np.inf,
-            "max": -np.inf,
-        }
-
-    # TODO(rsepassi): Check feature names, types, shapes stay constant and match
-    # DatasetInfo.
-
-    for k in example:
-      fmin = np.min(example[k].numpy())
-      if fmin < per_feature_stats[k]["min"]:
-        per_feature_stats[k]["min"] = fmin
-      fmax = np.max(example[k].numpy())
-      if fmax > per_feature_stats[k]["max"]:
-        per_feature_stats[k]["max"] = fmax
-
+  # The shards are read and reduced in parallel, then their statistics merged
+  with concurrent.futures.ThreadPoolExecutor(
+      max_workers=FLAGS.stats_parallelism) as executor:
+    accumulators = executor.map(
+        functools.partial(_compute_subsplit_stats, builder),
+        _shard_subsplits(split_info))
+    accumulator = functools.reduce(
+        lambda a, b: a.merge(b), accumulators,
+        statistics.StatisticsAccumulator())
+  del split_info.statistics[:]
+  split_info.statistics.extend(accumulator.to_protos())
+  print_stats(builder, split_info)
+
+
+def print_stats(builder, split_info):
+  """Prints the statistics of the split."""
   per_feature_stats_str = "\n  ".join([
       FEATURE_STATS_STR.format(
-          name=k,
-          dtype=repr(first_example[k].dtype),
-          shape=first_example[k].shape,
-          stats=v) for k, v in per_feature_stats.items()
+          name=feature.name,
+          shapes={tuple(s.dims): s.num_examples for s in feature.shapes},
+          stats=_format_feature_stats(feature))
+      for feature in split_info.statistics
   ])
   print(
       STATS_STR.format(
           name=builder.name,
-          split=split,
-          count=count,
+          split=dataset_builder.Split(split_info.name),
+          count=max([f.num_examples for f in split_info.statistics] or [0]),
           per_feature_stats=per_feature_stats_str))
 
 
+def _shard_subsplits(split_info):
+  """Returns the subsplits covering each shard of the split."""
+  if not split_info.shard_lengths:  # Read as a single subsplit
+    return [split_info.name]
+  offsets = np.cumsum([0] + list(split_info.shard_lengths))
+  return ["%s[%d:%d]" % (split_info.name, start, stop)
+          for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def _compute_subsplit_stats(builder, subsplit):
+  """Returns the StatisticsAccumulator of the examples of the subsplit."""
+  accumulator = statistics.StatisticsAccumulator()
+  with tf.Graph().as_default():
+    dataset = builder.as_dataset(split=subsplit, shuffle_files=False)
+    # The examples are reduced by batches, unless their shapes vary
+    shapes = tf.contrib.framework.nest.flatten(dataset.output_shapes)
+    if all(shape.is_fully_defined() for shape in shapes):
+      dataset = dataset.batch(FLAGS.stats_batch_size)
+      update_fn = accumulator.update_batch
+    else:
+      update_fn = accumulator.update
+    for element in dataset_utils.iterate_over_dataset(dataset):
+      update_fn(element)
+  return accumulator
+
+
+def _format_feature_stats(feature):
+  """Returns the statistics of the FeatureStatistics as a str."""
+  stats = {}
+  if feature.num_values:
+    stats.update({
+        "min": feature.min,
+        "max": feature.max,
+        "mean": feature.mean,
+        "std": float(np.sqrt(feature.variance)),
+    })
+  if feature.histogram:
+    stats["histogram"] = {h.value: h.num_examples for h in feature.histogram}
+  if feature.HasField("string_lengths"):
+    stats["string_lengths"] = _format_feature_stats(feature.string_lengths)
+  return stats
+
+
 if __name__ == "__main__":
   flags.mark_flags_as_required(["dataset_name"])
   tf.enable_eager_execution()
@@ -23,47 +23,155 @@ import abc
 import collections
 import contextlib
 import csv
+import functools
+import itertools
+import os
 import random
+import re
 import string
+import time
 
 import numpy as np
 import six
+from six.moves import cPickle
+import six.moves.urllib as urllib
 import tensorflow as tf
 import tqdm
 
+from tensorflow_datasets.core import dataset_info
+from tensorflow_datasets.core import metrics
+from tensorflow_datasets.core import shuffle
+from tensorflow_datasets.core import statistics
+from tensorflow_datasets.core.utils import tf_utils
+
 __all__ = [
     "FileFormatAdapter",
+    "WrittenFiles",
     "TFRecordExampleAdapter",
     "CSVAdapter",
+    "ColumnarAdapter",
     "do_files_exist",
 ]
 
+_COMPRESSION_TYPES = (None, "GZIP", "ZLIB")
+
+# Suffix of the temporary dirs of `resumable_dir`
+RESUMABLE_SUFFIX = ".incomplete"
+# Temporary files of `get_incomplete_path`
+_INCOMPLETE_PATH_RE = re.compile(r"\.incomplete[A-Z0-9]{6}$")
+
+
+class WrittenFiles(collections.namedtuple(
+    "_WrittenFiles", ["filepaths", "shard_lengths", "statistics"])):
+  """Files written by `FileFormatAdapter.write_from_generator`.
+
+  Args:
+    filepaths: `list<str>`, the written files.
+    shard_lengths: `list<int>`, number of examples of each file (None if the
+      files were not written).
+    statistics: `StatisticsAccumulator`, statistics of the written examples,
+      accumulated while writing them (None if the files were not written).
+  """
+
+  def __new__(cls, filepaths, shard_lengths, statistics=None):
+    return super(WrittenFiles, cls).__new__(
+        cls, filepaths, shard_lengths, statistics)
+
+
+# Same line terminator as csv.writer
+_CSV_LINE_TERMINATOR = "\r\n"
+# Number of rows formatted at once when batching rows
+_CSV_BATCH_SIZE = 10000
+_ENCODE_BATCH_SIZE = 100
+
 
 @six.add_metaclass(abc.ABCMeta)
 class FileFormatAdapter(object):
   """Provides writing and reading methods for a file format."""
 
   @abc.abstractmethod
-  def write_from_generator(self, generator_fn, output_files):
+  def write_from_generator(self, generator_fn, output_files,
+                           shuffle_config=None, shard_size=None,
+                           checkpoint_shards=False):
     """Write to files from generators_and_filenames.
 
     Args:
       generator_fn: returns generator yielding dictionaries of feature name to
         value.
-      output_files (list<str>): output files to write records to.
+      output_files (list<str>): output files to write records to. If
+        `shard_size` is set, function returning the output files for a given
+        number of shards.
+      shuffle_config (ShuffleConfig): if set, the records are shuffled (on disk
+        if they do not fit in memory) before being written.
+      shard_size (int): if set, the records are written sequentially in as many
+        shards as needed for each shard to hold about `shard_size` bytes.
+      checkpoint_shards (bool): if set (with `shard_size`), the progress is
+        saved after each shard, and an interrupted writing to the same output
+        files is resumed from the last complete shard. The generator must
+        yield the same records in the same order. Unless `shuffle_config` is
+        set, it must skip the examples of the complete shards itself (see
+        `get_checkpointed_num_records`), so they are not serialized again.
+
+    Returns:
+      WrittenFiles: the written files and their number of examples.
     """
     raise NotImplementedError
 
   @abc.abstractmethod
-  def dataset_from_filename(self, filename):
-    """Returns a `tf.data.Dataset` whose elements are dicts given a filename."""
+  def dataset_from_filename(self, filename, features=None):
+    """Returns a `tf.data.Dataset` whose elements are dicts given a filename.
+
+    Args:
+      filename: `str` `Tensor`, the file to read.
+      features (list<str>): if set, only those features are read.
+
+    Returns:
+      `tf.data.Dataset`
+    """
     raise NotImplementedError
 
+  def records_from_filename(self, filename, features=None):
+    """Returns a `tf.data.Dataset` of the records of a file, before decoding.
+
+    The records are decoded by the function returned by `decode_fn`, which is
+    run in parallel (fused with the preprocessing) when reading the datasets.
+    By default, the records are the decoded dicts of `dataset_from_filename`.
+
+    Args:
+      filename: `str` `Tensor`, the file to read.
+      features (list<str>): if set, only those features are read.
+
+    Returns:
+      `tf.data.Dataset`
+    """
+    return self.dataset_from_filename(filename, features=features)
+
+  def decode_fn(self, features=None):
+    """Returns the function decoding a record of `records_from_filename`.
+
+    Args:
+      features (list<str>): if set, only those features are decoded.
+
+    Returns:
+      function taking a record and returning its dict of features, or None if
+      the records are already decoded.
+    """
+    del features
+    return None
+
   @abc.abstractproperty
   def filetype_suffix(self):
     """Returns a str file type suffix (e.g. "csv")."""
     raise NotImplementedError
 
+  def update_dataset_info(self, info):
+    """Records in the `DatasetInfo` the options needed to read the files."""
+    del info
+
+  def apply_dataset_info(self, info):
+    """Restores the options recorded in the `DatasetInfo` before reading."""
+    del info
+
 
 class TFRecordExampleAdapter(FileFormatAdapter):
   """Writes/Reads serialized Examples protos to/from TFRecord files.
@@ -74,28 +182,71 @@ class TFRecordExampleAdapter(FileFormatAdapter):
     feature_value>`).
   * The allowed feature types are `int`, `float`, and `str` (or `bytes` in
     Python 3; `unicode` strings will be encoded in `utf-8`), or lists thereof.
+
+  The files can be compressed with GZIP or ZLIB, which trades CPU for I/O when
+  reading from slow (e.g. network) storage. The compression is recorded in the
+  dataset metadata, so the files are always read with the compression they
+  were written with.
   """
 
-  def __init__(self, example_reading_spec):
+  def __init__(self, example_reading_spec, compression_type=None,
+               compression_level=None):
     """Construcs a TFRecordExampleAdapter.
 
     Args:
       example_reading_spec (dict): feature name to tf.FixedLenFeature or
         tf.VarLenFeature. Passed to tf.parse_single_example.
+      compression_type (str): "GZIP" or "ZLIB" to compress the written files.
+        Files are not compressed by default.
+      compression_level (int): compression level (between 0 and 9) of the
+        written files. Defaults to the zlib default level.
+
+    Raises:
+      ValueError: if the compression type is not supported.
     """
+    if compression_type not in _COMPRESSION_TYPES:
+      raise ValueError("Unsupported compression type %s. Should be one of %s" %
+                       (compression_type, _COMPRESSION_TYPES))
     self._example_reading_spec = example_reading_spec
-
-  def write_from_generator(self, generator_fn, output_files):
-    wrapped = _generate_tf_examples(generator_fn())
-    _write_tfrecords_from_generator(wrapped, output_files)
-
-  def dataset_from_filename(self, filename):
-    dataset = tf.data.TFRecordDataset(filename, buffer_size=int(16 * 1e6))
-    return dataset.map(self._decode)
-
-  def _decode(self, *record):
-    record, = record
-    return tf.parse_single_example(record, self._example_reading_spec)
+    self._compression_type = compression_type
+    self._compression_level = compression_level
+
+  def write_from_generator(self, generator_fn, output_files,
+                           shuffle_config=None, shard_size=None,
+                           checkpoint_shards=False):
+    encoder = _TFExampleEncoder(self._example_reading_spec)
+    accumulator = statistics.StatisticsAccumulator()
+    wrapped = _generate_tf_examples(
+        accumulator.accumulate(generator_fn()), encoder)
+    options = tf.python_io.TFRecordOptions(
+        compression_type=self._compression_type or "",
+        compression_level=self._compression_level)
+    return _record_written_files(_write_tfrecords_from_generator(
+        wrapped, output_files, shuffle_config, shard_size, options,
+        checkpoint_shards), accumulator)
+
+  def dataset_from_filename(self, filename, features=None):
+    return self.records_from_filename(filename).map(self.decode_fn(features))
+
+  def records_from_filename(self, filename, features=None):
+    del features  # The features are selected when parsing the examples
+    return tf.data.TFRecordDataset(
+        filename,
+        compression_type=self._compression_type or "",
+        buffer_size=int(16 * 1e6))
+
+  def decode_fn(self, features=None):
+    reading_spec = _select_features(self._example_reading_spec, features)
+    return functools.partial(self._decode, reading_spec=reading_spec)
+
+  def update_dataset_info(self, info):
+    info.compression_type = self._compression_type or ""
+
+  def apply_dataset_info(self, info):
+    self._compression_type = info.compression_type or None
+
+  def _decode(self, record, reading_spec):
+    return tf.parse_single_example(record, reading_spec)
 
   @property
   def filetype_suffix(self):
@@ -116,6 +267,11 @@ class CSVAdapter(FileFormatAdapter):
 
   You can modify how records are read by passing `csv_dataset_kwargs`.
 
+  For large tabular datasets, the generator can instead yield batches of rows
+  as column arrays (`dict<str feature_name, np.array>`) by passing
+  `batched=True`. Each batch is then formatted with vectorized numpy operations
+  and written as a single block.
+
   Note that all CSV files produced will have a header row.
   """
 
@@ -124,7 +280,8 @@ class CSVAdapter(FileFormatAdapter):
   def __init__(self,
                feature_types,
                csv_dataset_kwargs=None,
-               csv_writer_ctor=csv.writer):
+               csv_writer_ctor=csv.writer,
+               batched=False):
     """Constructs CSVAdapter.
 
     Args:
@@ -132,29 +289,50 @@ class CSVAdapter(FileFormatAdapter):
         features (columns in the CSV file).
       csv_dataset_kwargs (dict): forwarded to `tf.contrib.data.CsvDataset`.
       csv_writer_ctor (function): takes file handle and returns writer.
+      batched (bool): whether the generator yields batches of rows as
+        dictionaries of column arrays instead of single rows.
 
     Raises:
-      ValueError: if csv_dataset_kwargs["header"] is present.
+      ValueError: if csv_dataset_kwargs["header"] is present, or if a custom
+        `csv_writer_ctor` is used with `batched`.
     """
     self._csv_kwargs = csv_dataset_kwargs or {}
     if "header" in self._csv_kwargs:
       raise ValueError("header must not be present")
+    if batched and csv_writer_ctor is not csv.writer:
+      raise ValueError("Batches are formatted without csv_writer_ctor")
     self._feature_types = _sort_dict_by_key(feature_types)
     self._csv_kwargs["header"] = True
     if "record_defaults" not in self._csv_kwargs:
       types = list(zip(*self._feature_types))[1]
       self._csv_kwargs["record_defaults"] = types
     self._csv_writer_ctor = csv_writer_ctor
+    self._batched = batched
 
   # TODO(rsepassi): Add support for non-scalar features (e.g. list of integers).
-  def write_from_generator(self, generator_fn, output_files):
-    wrapped = _generate_csv_rows(generator_fn())
-    _write_csv_from_generator(wrapped, output_files,
-                              self._csv_writer_ctor)
-
-  def dataset_from_filename(self, filename):
+  def write_from_generator(self, generator_fn, output_files,
+                           shuffle_config=None, shard_size=None,
+                           checkpoint_shards=False):
+    accumulator = statistics.StatisticsAccumulator()
+    if self._batched:
+      wrapped = _generate_csv_batches(
+          accumulator.accumulate_batches(generator_fn()))
+      return _record_written_files(_write_csv_batches_from_generator(
+          wrapped, output_files, shuffle_config, shard_size,
+          checkpoint_shards), accumulator)
+    wrapped = _generate_csv_rows(accumulator.accumulate(generator_fn()))
+    return _record_written_files(_write_csv_from_generator(
+        wrapped, output_files, self._csv_writer_ctor, shuffle_config,
+        shard_size, checkpoint_shards), accumulator)
+
+  def dataset_from_filename(self, filename, features=None):
     dataset = tf.contrib.data.CsvDataset(filename, **self._csv_kwargs)
-    return dataset.map(self._decode)
+    dataset = dataset.map(self._decode)
+    if features is not None:
+      _select_features(dict(self._feature_types), features)  # Check names
+      dataset = dataset.map(
+          lambda record: {name: record[name] for name in features})
+    return dataset
 
   def _decode(self, *record):
     record_dict = {}
@@ -168,6 +346,72 @@ class CSVAdapter(FileFormatAdapter):
     return "csv"
 
 
+class ColumnarAdapter(FileFormatAdapter):
+  """Writes/reads each feature to/from its own column file.
+
+  Each shard is a directory containing one file per feature, so reading a
+  subset of the features (e.g. `as_dataset(..., features=["target"])`) only
+  reads the files of those features. For instance, the labels of an image
+  dataset can be scanned without reading the images.
+
+  Numeric features are stored as the raw bytes of their numpy arrays (one fixed
+  length record per example). String features are stored as TFRecords.
+
+  Constraints on generators:
+
+  * The generator must yield feature dictionaries (`dict<str feature_name,
+    feature_value>`).
+  * Each feature value must match the shape and dtype of its
+    `tf.FixedLenFeature` (numpy arrays are written without conversion).
+  """
+
+  def __init__(self, example_reading_spec):
+    """Constructs a ColumnarAdapter.
+
+    Args:
+      example_reading_spec (dict): feature name to tf.FixedLenFeature. Only
+        scalar string features are supported.
+
+    Raises:
+      ValueError: if a feature is not supported.
+    """
+    for name, spec in example_reading_spec.items():
+      if not isinstance(spec, tf.FixedLenFeature):
+        raise ValueError("Feature %s should be a FixedLenFeature" % name)
+      if spec.dtype == tf.string and tuple(spec.shape):
+        raise ValueError("String feature %s should be a scalar" % name)
+    self._feature_specs = _sort_dict_by_key(example_reading_spec)
+
+  def write_from_generator(self, generator_fn, output_files,
+                           shuffle_config=None, shard_size=None,
+                           checkpoint_shards=False):
+    accumulator = statistics.StatisticsAccumulator()
+    wrapped = _generate_column_values(
+        accumulator.accumulate(generator_fn()), self._feature_specs)
+    return _record_written_files(_write_columns_from_generator(
+        wrapped, output_files, self._feature_specs, shuffle_config,
+        shard_size, checkpoint_shards), accumulator)
+
+  def dataset_from_filename(self, filename, features=None):
+    feature_specs = _select_features(dict(self._feature_specs), features)
+    columns = {}
+    for name, spec in feature_specs.items():
+      path = tf.string_join([filename, "/" + _column_filename(name)])
+      if spec.dtype == tf.string:
+        columns[name] = tf.data.TFRecordDataset(path)
+      else:
+        record_bytes = (
+            int(np.prod(spec.shape, dtype=np.int64)) * spec.dtype.size)
+        columns[name] = tf.data.FixedLengthRecordDataset(
+            path, record_bytes).map(
+                functools.partial(_decode_column_value, spec=spec))
+    return tf.data.Dataset.zip(columns)
+
+  @property
+  def filetype_suffix(self):
+    return "columns"
+
+
 def do_files_exist(filenames):
   """Whether all filenames exist."""
   preexisting = [tf.gfile.Exists(f) for f in filenames]
@@ -201,8 +445,17 @@ def _incomplete_files(filenames):
       tf.gfile.Rename(tmp, output)
   finally:
     for tmp in tmp_files:
-      if tf.gfile.Exists(tmp):
-        tf.gfile.Remove(tmp)
+      _remove_if_exists(tmp)
+
+
+def _remove_if_exists(path):
+  """Remove the file or directory if it exists."""
+  if not tf.gfile.Exists(path):
+    return
+  if tf.gfile.IsDirectory(path):
+    tf.gfile.DeleteRecursively(path)
+  else:
+    tf.gfile.Remove(path)
 
 
 @contextlib.contextmanager
@@ -217,24 +470,284 @@ def incomplete_dir(dirname):
       tf.gfile.DeleteRecursively(tmp_dir)
 
 
+def get_resumable_path(dirname):
+  """Returns the temporary dir of `resumable_dir(dirname)`."""
+  return dirname + RESUMABLE_SUFFIX
+
+
+@contextlib.contextmanager
+def resumable_dir(dirname):
+  """Create temporary dir for dirname, kept on error, and rename on exit.
+
+  Unlike `incomplete_dir`, the temporary dir has a fixed name and is kept if an
+  error occurs, so its content can be reused by the next call. The temporary
+  files left by the interrupted writes (see `get_incomplete_path`) are deleted.
+
+  Args:
+    dirname (str): the final directory.
+
+  Yields:
+    The temporary directory.
+  """
+  tmp_dir = get_resumable_path(dirname)
+  if tf.gfile.Exists(tmp_dir):
+    for filename in tf.gfile.ListDirectory(tmp_dir):
+      if _INCOMPLETE_PATH_RE.search(filename.rstrip("/")):
+        _remove_if_exists(os.path.join(tmp_dir, filename))
+  else:
+    tf.gfile.MakeDirs(tmp_dir)
+  yield tmp_dir
+  tf.gfile.Rename(tmp_dir, dirname)
+
+
 # TODO(rsepassi): Use the TFRecordWriter.write op to get multithreading
-def _write_tfrecords_from_generator(generator, output_files):
-  """Writes generated str records to output_files in round-robin order."""
-  if do_files_exist(output_files):
-    return
+def _write_tfrecords_from_generator(generator, output_files,
+                                    shuffle_config=None, shard_size=None,
+                                    options=None, checkpoint_shards=False):
+  """Writes generated str records to output_files in round-robin order.
+
+  If `shard_size` is set, the records are instead written in as many shards as
+  needed (see `_write_size_based_shards`).
+
+  Args:
+    generator: yields the serialized records.
+    output_files (list<str>): output files to write the records to. If
+      `shard_size` is set, function returning the output files for a given
+      number of shards.
+    shuffle_config (ShuffleConfig): if set, shuffle the records before writing.
+    shard_size (int): target size in bytes of the shards (before compression).
+    options (TFRecordOptions): options of the TFRecordWriters (e.g.
+      compression).
+    checkpoint_shards (bool): if set, resume an interrupted writing of the
+      shards (see `_write_size_based_shards`).
+
+  Returns:
+    WrittenFiles: the written files and their number of examples.
+  """
+  if shard_size is None and do_files_exist(output_files):
+    return WrittenFiles(output_files, None)
+
+  if shuffle_config is not None:
+    generator = _shuffle_records(
+        generator, _output_dir(output_files), shuffle_config)
+
+  tf.logging.info("Writing TFRecords")
+  if shard_size is not None:
+    return _write_size_based_shards(
+        generator, output_files, shard_size,
+        open_writer_fn=functools.partial(
+            tf.python_io.TFRecordWriter, options=options),
+        # Each record is framed by its length and 2 crc (16 bytes)
+        record_size_fn=lambda record: len(record) + 16,
+        checkpoint_shards=checkpoint_shards,
+        skip_records=shuffle_config is not None)
 
   with _incomplete_files(output_files) as tmp_files:
-    writers = [tf.python_io.TFRecordWriter(fname) for fname in tmp_files]
+    writers = [
+        tf.python_io.TFRecordWriter(fname, options=options)
+        for fname in tmp_files
+    ]
     with _close_on_exit(writers) as writers:
-      tf.logging.info("Writing TFRecords")
-      _round_robin_write(writers, generator)
+      shard_lengths = _round_robin_write(writers, generator)
+  return WrittenFiles(output_files, shard_lengths)
+
+
+def _record_written_files(written, accumulator):
+  """Records the metrics and statistics of the written shards.
+
+  Args:
+    written (WrittenFiles): the written shards.
+    accumulator (StatisticsAccumulator): statistics of the examples consumed
+      from the generator.
+
+  Returns:
+    WrittenFiles: the written shards, with their statistics if they were
+      written.
+  """
+  if written.shard_lengths is None:
+    return written
+  if metrics.is_enabled():
+    for path, num_examples in zip(written.filepaths, written.shard_lengths):
+      tags = {"path": path}
+      metrics.increment("write.records", num_examples, tags)
+      metrics.increment("write.bytes", tf_utils.get_path_size(path), tags)
+  return written._replace(statistics=accumulator)
+
+
+def _output_dir(output_files):
+  """Returns the directory of the output files (list or function)."""
+  if callable(output_files):
+    output_files = output_files(1)
+  return os.path.dirname(output_files[0])
+
+
+def _shuffle_records(records, output_dir, shuffle_config):
+  """Shuffles the records, spilling them in the output directory."""
+  tmp_dir = get_incomplete_path(os.path.join(output_dir, ".shuffle"))
+  return shuffle.shuffle_records(records, tmp_dir, shuffle_config)
 
 
 def _round_robin_write(writers, generator):
-  """Write records from generator round-robin across writers."""
+  """Write records from generator round-robin across writers.
+
+  Returns:
+    shard_lengths (list<int>): the number of records written by each writer.
+  """
+  num_records = 0
   for i, record in enumerate(tqdm.tqdm(generator, unit=" records",
                                        mininterval=10)):
     writers[i % len(writers)].write(record)
+    num_records += 1
+  return _round_robin_lengths(num_records, len(writers))
+
+
+def _round_robin_lengths(num_records, num_shards):
+  """Returns the number of records of each shard written round-robin."""
+  return [(num_records - i + num_shards - 1) // num_shards
+          for i in range(num_shards)]
+
+
+def get_checkpointed_num_records(filepaths_fn):
+  """Returns the number of records of the complete shards of a writing.
+
+  Those records were written before the writing with `checkpoint_shards` to
+  the same output files was interrupted, and are not written again when it is
+  resumed. Each record is written from one element of the generator.
+
+  Args:
+    filepaths_fn (function): returns the output files for a given number of
+      shards.
+
+  Returns:
+    int: 0 if there is no checkpoint.
+  """
+  checkpoint = dataset_info.load_shards_checkpoint(
+      _checkpoint_prefix(filepaths_fn) + ".json")
+  return checkpoint.num_records if checkpoint else 0
+
+
+def _checkpoint_prefix(filepaths_fn):
+  """Returns the prefix of the checkpoint and complete shards of a writing."""
+  return filepaths_fn(1)[0] + ".checkpoint"
+
+
+def _write_size_based_shards(generator, filepaths_fn, shard_size,
+                             open_writer_fn, record_size_fn,
+                             record_length_fn=None, checkpoint_shards=False,
+                             skip_records=True):
+  """Writes records sequentially, rolling over to a new shard once full.
+
+  A new shard is started each time the current one reaches `shard_size` bytes,
+  so the number of shards is only known once all the records are written. The
+  shards are written to temporary files and renamed at the end.
+
+  If `checkpoint_shards` is set, the temporary files have fixed names and are
+  not deleted if an error occurs. After each complete shard, the number of
+  shards and records written so far are saved as a `ShardsCheckpoint`. Writing
+  again to the same output files then keeps the complete shards and skips
+  their records from the generator, which must yield the same records in the
+  same order. When the records are not shuffled, the caller can instead skip
+  the examples of the complete shards before serializing them (see
+  `get_checkpointed_num_records`), and set `skip_records` to False.
+
+  Args:
+    generator: yields the records to write.
+    filepaths_fn (function): returns the output files for a given number of
+      shards.
+    shard_size (int): target size in bytes of each shard.
+    open_writer_fn (function): returns a writer (with `write` and `close`
+      methods) given a filename.
+    record_size_fn (function): returns the size in bytes of a written record.
+    record_length_fn (function): returns the number of examples of a record.
+      Defaults to one example per record.
+    checkpoint_shards (bool): whether to resume from (and save) the checkpoint
+      of the complete shards.
+    skip_records (bool): whether to skip the records of the complete shards
+      from the generator. False if the generator already starts after them.
+
+  Returns:
+    WrittenFiles: the written shards and their number of examples.
+  """
+  if checkpoint_shards:
+    tmp_prefix = _checkpoint_prefix(filepaths_fn)
+    checkpoint_path = tmp_prefix + ".json"
+    checkpoint = (dataset_info.load_shards_checkpoint(checkpoint_path) or
+                  dataset_info.ShardsCheckpoint())
+  else:
+    tmp_prefix = get_incomplete_path(filepaths_fn(1)[0])
+    checkpoint = dataset_info.ShardsCheckpoint()
+  if checkpoint.num_shards:
+    tf.logging.info("Resuming the writing after %d shards (%d records)",
+                    checkpoint.num_shards, checkpoint.num_records)
+    if skip_records:
+      generator = itertools.islice(generator, checkpoint.num_records, None)
+
+  def tmp_file(shard_index):
+    return "%s-%05d" % (tmp_prefix, shard_index)
+
+  writers = []
+  writing_files = []  # File of the shard being written
+
+  def open_shard():
+    path = tmp_file(checkpoint.num_shards)
+    if checkpoint_shards:
+      path = get_incomplete_path(path)
+    writing_files.append(path)
+    writers.append(open_writer_fn(path))
+
+  def close_shard(num_records, num_examples):
+    writers.pop().close()
+    path = writing_files.pop()
+    if checkpoint_shards:
+      _remove_if_exists(tmp_file(checkpoint.num_shards))
+      tf.gfile.Rename(path, tmp_file(checkpoint.num_shards))
+    checkpoint.num_shards += 1
+    checkpoint.num_records += num_records
+    checkpoint.shard_lengths.append(num_examples)
+    if checkpoint_shards:
+      dataset_info.save_shards_checkpoint(checkpoint_path, checkpoint)
+
+  try:
+    shard_bytes = 0
+    shard_records = 0
+    shard_examples = 0
+    for record in tqdm.tqdm(generator, unit=" records", mininterval=10):
+      if not writers:
+        open_shard()
+      writers[-1].write(record)
+      shard_bytes += record_size_fn(record)
+      shard_records += 1
+      shard_examples += record_length_fn(record) if record_length_fn else 1
+      if shard_bytes >= shard_size:
+        close_shard(shard_records, shard_examples)
+        shard_bytes = 0
+        shard_records = 0
+        shard_examples = 0
+    # Always write at least one (possibly empty) shard
+    if not writers and not checkpoint.num_shards:
+      open_shard()
+    if writers:
+      close_shard(shard_records, shard_examples)
+
+    output_files = filepaths_fn(checkpoint.num_shards)
+    tf.logging.info("Wrote %d shards of %d bytes", len(output_files),
+                    shard_size)
+    for i, output in enumerate(output_files):
+      # Shards may have been renamed before an interruption
+      if tf.gfile.Exists(tmp_file(i)):
+        _remove_if_exists(output)
+        tf.gfile.Rename(tmp_file(i), output)
+    if checkpoint_shards:
+      _remove_if_exists(checkpoint_path)
+    return WrittenFiles(output_files, list(checkpoint.shard_lengths))
+  finally:
+    for writer in writers:
+      writer.close()
+    for path in writing_files:
+      _remove_if_exists(path)
+    if not checkpoint_shards:
+      for i in range(checkpoint.num_shards):
+        _remove_if_exists(tmp_file(i))
 
 
 def _sort_dict_by_key(feature_dict):
@@ -242,20 +755,183 @@ def _sort_dict_by_key(feature_dict):
   return [(k, feature_dict[k]) for k in keys]
 
 
+def _select_features(feature_dict, features):
+  """Returns the subset of feature_dict with the given feature names."""
+  if features is None:
+    return feature_dict
+  unknown_features = set(features) - set(feature_dict)
+  if unknown_features:
+    raise ValueError("Unknown features %s. Available features: %s" % (
+        sorted(unknown_features), sorted(feature_dict)))
+  return {name: feature_dict[name] for name in features}
+
+
 def _generate_csv_rows(generator):
+  """Yields the (sorted) header row, then the values of each record."""
   header_row = None
   for record in generator:
-    this_header, record_row = zip(*_sort_dict_by_key(record))
     if header_row is None:
-      header_row = this_header
+      header_row = tuple(sorted(record))
       yield header_row
-    yield record_row
+    yield tuple(record[name] for name in header_row)
 
 
-def _write_csv_from_generator(generator, output_files, writer_ctor=None):
-  """Write records to CSVs using writer_ctor (defaults to csv.writer)."""
-  if do_files_exist(output_files):
-    return
+def _generate_csv_batches(generator):
+  """Yields the (sorted) header row, then the columns of each batch."""
+  header_row = None
+  for batch in generator:
+    if header_row is None:
+      header_row = tuple(sorted(batch))
+      yield header_row
+    yield [np.asarray(batch[name]) for name in header_row]
+
+
+def _batch_rows(rows, batch_size=_CSV_BATCH_SIZE):
+  """Groups rows into batches of column arrays."""
+  rows = iter(rows)
+  while True:
+    batch = list(itertools.islice(rows, batch_size))
+    if not batch:
+      return
+    yield [np.asarray(column) for column in zip(*batch)]
+
+
+def _format_csv_column(values):
+  """Formats the values of a column as (quoted if needed) strings."""
+  if values.dtype.kind == "S":
+    strings = np.char.decode(values, "utf-8")
+  elif values.dtype.kind == "O":
+    strings = np.array([tf.compat.as_text(v) for v in values.tolist()],
+                       dtype=six.text_type)
+  else:
+    strings = values.astype(six.text_type)
+  if values.dtype.kind not in "SUO":
+    return strings
+  # Quote the strings with special characters, as csv.writer does
+  needs_quotes = np.zeros(strings.shape, dtype=bool)
+  for char in (",", "\"", "\n", "\r"):
+    needs_quotes |= np.char.find(strings, char) >= 0
+  if needs_quotes.any():
+    quoted = np.char.add(
+        np.char.add("\"", np.char.replace(strings, "\"", "\"\"")), "\"")
+    strings = np.where(needs_quotes, quoted, strings)
+  return strings
+
+
+def _format_csv_lines(columns):
+  """Returns the array of CSV lines (without terminator) of a batch."""
+  formatted_columns = [_format_csv_column(column) for column in columns]
+  lines = formatted_columns[0]
+  if len(formatted_columns) == 1:
+    # A lone empty field is quoted, as csv.writer does, so that its line is not
+    # read back as a blank line (and dropped)
+    return np.where(lines == "", "\"\"", lines)
+  for column in formatted_columns[1:]:
+    lines = np.char.add(np.char.add(lines, ","), column)
+  return lines
+
+
+def _join_csv_lines(lines):
+  """Returns the block of text of the lines (including terminators)."""
+  if not len(lines):  # pylint: disable=g-explicit-length-test
+    return ""
+  return _CSV_LINE_TERMINATOR.join(lines.tolist()) + _CSV_LINE_TERMINATOR
+
+
+def _write_csv_batches_from_generator(generator, output_files,
+                                      shuffle_config=None, shard_size=None,
+                                      checkpoint_shards=False):
+  """Write batches of rows to CSVs, formatting each batch in bulk.
+
+  Args:
+    generator: yields the header row, then the columns of each batch.
+    output_files (list<str>): output files to write the rows to. If
+      `shard_size` is set, function returning the output files for a given
+      number of shards.
+    shuffle_config (ShuffleConfig): if set, shuffle the rows before writing.
+    shard_size (int): target size in bytes of the shards. The shards roll over
+      between batches.
+    checkpoint_shards (bool): if set, resume an interrupted writing of the
+      shards (see `_write_size_based_shards`).
+
+  Returns:
+    WrittenFiles: the written files and their number of examples.
+  """
+  if shard_size is None and do_files_exist(output_files):
+    return WrittenFiles(output_files, None)
+
+  # No header if all the batches were already written before an interruption
+  header_line = ",".join(next(generator, ())) + _CSV_LINE_TERMINATOR
+  if shuffle_config is not None:
+    # The rows are shuffled one by one, then batched again to be written
+    serialized_rows = (
+        cPickle.dumps(row, protocol=2)
+        for columns in generator for row in zip(*columns))
+    generator = _batch_rows(
+        cPickle.loads(row) for row in _shuffle_records(
+            serialized_rows, _output_dir(output_files), shuffle_config))
+
+  def open_writer(filename):
+    f = tf.gfile.Open(filename, "w")
+    f.write(header_line)
+    return f
+
+  tf.logging.info("Writing CSVs")
+  if shard_size is not None:
+    # The blocks of text are written with their number of rows
+    blocks = ((_join_csv_lines(lines), len(lines)) for lines in (
+        _format_csv_lines(columns) for columns in generator))
+
+    def open_block_writer(filename):
+      f = open_writer(filename)
+      return collections.namedtuple("_writer", ["write", "close"])(
+          write=lambda block: f.write(block[0]), close=f.close)
+
+    return _write_size_based_shards(
+        blocks, output_files, shard_size,
+        open_writer_fn=open_block_writer,
+        record_size_fn=lambda block: len(block[0]),
+        record_length_fn=lambda block: block[1],
+        checkpoint_shards=checkpoint_shards,
+        skip_records=shuffle_config is not None)
+
+  with _incomplete_files(output_files) as tmp_files:
+    handles = [open_writer(fname) for fname in tmp_files]
+    with _close_on_exit(handles):
+      # Rows are distributed round-robin across the files, as
+      # _round_robin_write does for single rows.
+      num_rows = 0
+      for columns in tqdm.tqdm(generator, unit=" batches", mininterval=10):
+        lines = _format_csv_lines(columns)
+        for i, handle in enumerate(handles):
+          start = (i - num_rows) % len(handles)
+          handle.write(_join_csv_lines(lines[start::len(handles)]))
+        num_rows += len(lines)
+  return WrittenFiles(output_files, _round_robin_lengths(num_rows,
+                                                         len(output_files)))
+
+
+def _write_csv_from_generator(generator, output_files, writer_ctor=None,
+                              shuffle_config=None, shard_size=None,
+                              checkpoint_shards=False):
+  """Write records to CSVs using writer_ctor (defaults to csv.writer).
+
+  Args:
+    generator: yields the header row, then the record rows.
+    output_files (list<str>): output files to write the records to. If
+      `shard_size` is set, function returning the output files for a given
+      number of shards.
+    writer_ctor (function): takes file handle and returns writer.
+    shuffle_config (ShuffleConfig): if set, shuffle the rows before writing.
+    shard_size (int): target size in bytes of the shards.
+    checkpoint_shards (bool): if set, resume an interrupted writing of the
+      shards (see `_write_size_based_shards`).
+
+  Returns:
+    WrittenFiles: the written files and their number of examples.
+  """
+  if shard_size is None and do_files_exist(output_files):
+    return WrittenFiles(output_files, None)
 
   if writer_ctor is None:
     writer_ctor = csv.writer
@@ -268,14 +944,134 @@ def _write_csv_from_generator(generator, output_files, writer_ctor=None):
           write=writer.writerow)
     return f, writer
 
+  # No header if all the rows were already written before an interruption
+  header = next(generator, ())
+  if shuffle_config is not None:
+    # The rows are pickled to be shuffled as bytes records
+    serialized_rows = (cPickle.dumps(row, protocol=2) for row in generator)
+    generator = (cPickle.loads(row) for row in _shuffle_records(
+        serialized_rows, _output_dir(output_files), shuffle_config))
+
+  tf.logging.info("Writing CSVs")
+  if shard_size is not None:
+    def open_shard_writer(filename):
+      f, writer = create_csv_writer(filename)
+      writer.write(header)
+      return collections.namedtuple("_writer", ["write", "close"])(
+          write=writer.write, close=f.close)
+
+    return _write_size_based_shards(
+        generator, output_files, shard_size,
+        open_writer_fn=open_shard_writer,
+        # Values, separators and end of line
+        record_size_fn=lambda row: sum(len(str(v)) + 1 for v in row) + 1,
+        checkpoint_shards=checkpoint_shards,
+        skip_records=shuffle_config is not None)
+
   with _incomplete_files(output_files) as tmp_files:
     handles, writers = zip(*[create_csv_writer(fname) for fname in tmp_files])
     with _close_on_exit(handles):
-      tf.logging.info("Writing CSVs")
-      header = next(generator)
       for w in writers:
         w.write(header)
-      _round_robin_write(writers, generator)
+      shard_lengths = _round_robin_write(writers, generator)
+  return WrittenFiles(output_files, shard_lengths)
+
+
+def _column_filename(feature_name):
+  """Returns the name of the column file of the feature (without '/')."""
+  return urllib.parse.quote(feature_name, safe="")
+
+
+def _generate_column_values(generator, feature_specs):
+  """Wraps dict generator to produce the encoded value of each column."""
+  # Numeric values are written in little endian, as expected by tf.decode_raw
+  dtypes = [
+      None if spec.dtype == tf.string else
+      np.dtype(spec.dtype.as_numpy_dtype).newbyteorder("<")
+      for _, spec in feature_specs
+  ]
+  for example_dict in generator:
+    values = []
+    for (name, spec), dtype in zip(feature_specs, dtypes):
+      value = example_dict[name]
+      if dtype is None:
+        values.append(tf.compat.as_bytes(value))
+      else:
+        value = np.asarray(value, dtype=dtype).reshape(spec.shape)
+        values.append(value.tobytes())
+    yield tuple(values)
+
+
+def _decode_column_value(record, spec):
+  return tf.reshape(tf.decode_raw(record, spec.dtype), spec.shape)
+
+
+class _ColumnsWriter(object):
+  """Writes the column values of one shard, each column in its own file."""
+
+  def __init__(self, dirname, feature_specs):
+    tf.gfile.MakeDirs(dirname)
+    self._writers = []
+    for name, spec in feature_specs:
+      path = os.path.join(dirname, _column_filename(name))
+      if spec.dtype == tf.string:
+        self._writers.append(tf.python_io.TFRecordWriter(path))
+      else:
+        self._writers.append(tf.gfile.Open(path, "wb"))
+
+  def write(self, values):
+    for writer, value in zip(self._writers, values):
+      writer.write(value)
+
+  def close(self):
+    for writer in self._writers:
+      writer.close()
+
+
+def _write_columns_from_generator(generator, output_files, feature_specs,
+                                  shuffle_config=None, shard_size=None,
+                                  checkpoint_shards=False):
+  """Writes generated column values to the output shards (directories).
+
+  Args:
+    generator: yields the tuple of encoded values (one per column).
+    output_files (list<str>): output shards to write the columns to. If
+      `shard_size` is set, function returning the output shards for a given
+      number of shards.
+    feature_specs (list<tuple>): sorted (feature name, tf.FixedLenFeature).
+    shuffle_config (ShuffleConfig): if set, shuffle the records before writing.
+    shard_size (int): target size in bytes of the shards.
+    checkpoint_shards (bool): if set, resume an interrupted writing of the
+      shards (see `_write_size_based_shards`).
+
+  Returns:
+    WrittenFiles: the written shards and their number of examples.
+  """
+  if shard_size is None and do_files_exist(output_files):
+    return WrittenFiles(output_files, None)
+
+  if shuffle_config is not None:
+    # The values are pickled to be shuffled as bytes records
+    serialized = (cPickle.dumps(values, protocol=2) for values in generator)
+    generator = (cPickle.loads(values) for values in _shuffle_records(
+        serialized, _output_dir(output_files), shuffle_config))
+
+  open_writer_fn = functools.partial(_ColumnsWriter,
+                                     feature_specs=feature_specs)
+  tf.logging.info("Writing columns")
+  if shard_size is not None:
+    return _write_size_based_shards(
+        generator, output_files, shard_size,
+        open_writer_fn=open_writer_fn,
+        record_size_fn=lambda values: sum(len(v) for v in values),
+        checkpoint_shards=checkpoint_shards,
+        skip_records=shuffle_config is not None)
+
+  with _incomplete_files(output_files) as tmp_files:
+    writers = [open_writer_fn(fname) for fname in tmp_files]
+    with _close_on_exit(writers) as writers:
+      shard_lengths = _round_robin_write(writers, generator)
+  return WrittenFiles(output_files, shard_lengths)
 
 
 def _dict_to_tf_example(example_dict):
@@ -284,24 +1080,283 @@ def _dict_to_tf_example(example_dict):
   for (k, v) in six.iteritems(example_dict):
     if v is None:
       continue
-    if not isinstance(v, (list, tuple, np.ndarray)):
-      v = [v]
-
-    if isinstance(v[0], six.integer_types + (np.integer,)):
-      features[k] = tf.train.Feature(int64_list=tf.train.Int64List(value=v))
-    elif isinstance(v[0], (float, np.floating)):
-      features[k] = tf.train.Feature(float_list=tf.train.FloatList(value=v))
-    elif isinstance(v[0], six.string_types + (bytes,)):
-      v = [tf.compat.as_bytes(x) for x in v]
-      features[k] = tf.train.Feature(bytes_list=tf.train.BytesList(value=v))
-    else:
-      raise ValueError("Value for %s is not a recognized type; v: %s type: %s" %
-                       (k, str(v[0]), str(type(v[0]))))
+    features[k] = _item_to_tf_feature(k, v)
 
   return tf.train.Example(features=tf.train.Features(feature=features))
 
 
-def _generate_tf_examples(generator):
-  """Wraps dict generator to produce serialized tf.train.Examples."""
-  for example_dict in generator:
-    yield _dict_to_tf_example(example_dict).SerializeToString()
+def _item_to_tf_feature(k, v):
+  """Builds tf.train.Feature from int/float/str (list), inferring its type."""
+  if not isinstance(v, (list, tuple, np.ndarray)):
+    v = [v]
+
+  if isinstance(v[0], six.integer_types + (np.integer,)):
+    return tf.train.Feature(int64_list=tf.train.Int64List(value=v))
+  elif isinstance(v[0], (float, np.floating)):
+    return tf.train.Feature(float_list=tf.train.FloatList(value=v))
+  elif isinstance(v[0], six.string_types + (bytes,)):
+    v = [tf.compat.as_bytes(x) for x in v]
+    return tf.train.Feature(bytes_list=tf.train.BytesList(value=v))
+  else:
+    raise ValueError("Value for %s is not a recognized type; v: %s type: %s" %
+                     (k, str(v[0]), str(type(v[0]))))
+
+
+# Tag bytes of the wire format of tf.train.Example, see
+# tensorflow/core/example/{example,feature}.proto. All the fields written are
+# length-delimited (wire type 2): Example.features (1), Features.feature (1),
+# the key (1) and value (2) of the feature map entries, Feature.bytes_list (1),
+# Feature.float_list (2), Feature.int64_list (3), and the (packed) value (1) of
+# the lists.
+_FIELD_1_TAG = b"\x0a"
+_FIELD_2_TAG = b"\x12"
+_LIST_TAGS = {
+    "bytes_list": b"\x0a",
+    "float_list": b"\x12",
+    "int64_list": b"\x1a",
+}
+# A varint holds 7 bits per byte, so a 64 bits integer takes up to 10 bytes
+_VARINT_SHIFTS = np.arange(0, 70, 7, dtype=np.uint64)
+
+
+def _encode_varint(value):
+  """Returns the protobuf varint encoding of the integer `value`."""
+  if value < 0:
+    value += 1 << 64  # Negative int64 are encoded as their two's complement
+  if value < 0x80:
+    return six.int2byte(value)
+  encoded = bytearray()
+  while value >= 0x80:
+    encoded.append((value & 0x7f) | 0x80)
+    value >>= 7
+  encoded.append(value)
+  return bytes(encoded)
+
+
+def _encode_varints(values):
+  """Encodes the int64 array `values` as varints, without a Python loop.
+
+  Args:
+    values (np.ndarray): 1-D array of int64.
+
+  Returns:
+    encoded (bytes): the concatenated varints.
+    sizes (np.ndarray): the number of bytes of the varint of each value.
+  """
+  values = values.view(np.uint64)
+  groups = values[:, None] >> _VARINT_SHIFTS  # Groups of 7 bits, low first
+  # The encoding stops after the last non-zero group, with at least one byte
+  sizes = np.maximum(np.count_nonzero(groups, axis=1), 1)
+  kept = np.arange(len(_VARINT_SHIFTS)) < sizes[:, None]
+  continued = np.arange(len(_VARINT_SHIFTS)) < sizes[:, None] - 1
+  encoded = (groups & 0x7f) | (continued.astype(np.uint64) << 7)
+  return encoded.astype(np.uint8)[kept].tobytes(), sizes
+
+
+def _encode_length_delimited(tag, payload):
+  return tag + _encode_varint(len(payload)) + payload
+
+
+class _TFExampleEncoder(object):
+  """Serializes feature dictionaries, with types known from the reading spec.
+
+  Equivalent to `_dict_to_tf_example(example_dict).SerializeToString()`, but
+  the type of each feature of the `example_reading_spec` is resolved once
+  instead of being inferred from the values of each example, and the features
+  are written directly in the wire format of `tf.train.Example`: the float and
+  int64 lists are packed from the numpy buffer of all the values of a feature
+  across a batch of examples, without converting them to Python numbers. The
+  features are written in the order of their names, so the records are the
+  same bytes as `SerializeToString(deterministic=True)`.
+
+  Features which are not in the spec are still written, with their type
+  inferred from their values.
+  """
+
+  def __init__(self, example_reading_spec):
+    """Constructs a _TFExampleEncoder.
+
+    Args:
+      example_reading_spec (dict): feature name to tf.FixedLenFeature or
+        tf.VarLenFeature.
+    """
+    self._list_names = {}  # Feature name to the name of its proto list field
+    for name, spec in six.iteritems(example_reading_spec):
+      dtype = getattr(spec, "dtype", None)
+      if dtype is None:
+        continue
+      if dtype == tf.string:
+        self._list_names[name] = "bytes_list"
+      elif dtype.is_floating:
+        self._list_names[name] = "float_list"
+      elif dtype.is_integer or dtype == tf.bool:
+        self._list_names[name] = "int64_list"
+    self._sorted_names = sorted(self._list_names)
+    # Start of the feature map entry of each feature, up to its value
+    self._key_prefixes = {
+        name: _encode_length_delimited(_FIELD_1_TAG, tf.compat.as_bytes(name))
+        + _FIELD_2_TAG for name in self._list_names
+    }
+
+  def encode(self, example_dict):
+    """Returns the serialized tf.train.Example of the feature dictionary."""
+    return self.encode_batch([example_dict])[0]
+
+  def encode_batch(self, example_dicts):
+    """Returns the list of serialized tf.train.Example of the dictionaries."""
+    # Serialized feature map entries of each example, in the order of the names
+    entries = [[] for _ in example_dicts]
+    for name in self._sorted_names:
+      list_name = self._list_names[name]
+      indices = []
+      values = []
+      for i, example_dict in enumerate(example_dicts):
+        value = example_dict.get(name)
+        if value is not None:
+          indices.append(i)
+          values.append(value)
+      if not values:
+        continue
+      key_prefix = self._key_prefixes[name]
+      for i, feature in zip(indices, _encode_features(list_name, values)):
+        entries[i].append(_encode_length_delimited(
+            _FIELD_1_TAG, key_prefix + _encode_varint(len(feature)) + feature))
+
+    for i, example_dict in enumerate(example_dicts):
+      other_entries = []
+      for name, value in six.iteritems(example_dict):
+        if value is None or name in self._list_names:
+          continue
+        # A single feature Features message is its (framed) map entry
+        entry = tf.train.Features(
+            feature={name: _item_to_tf_feature(name, value)})
+        other_entries.append((name, entry.SerializeToString()))
+      if other_entries:
+        names = [name for name in self._sorted_names
+                 if example_dict.get(name) is not None]
+        entries[i] = [
+            entry for _, entry in sorted(
+                list(zip(names, entries[i])) + other_entries)
+        ]
+
+    return [
+        _encode_length_delimited(_FIELD_1_TAG, b"".join(example_entries))
+        for example_entries in entries
+    ]
+
+
+def _encode_features(list_name, values):
+  """Returns the serialized tf.train.Feature of each of the values.
+
+  Args:
+    list_name (str): name of the proto list field of the feature.
+    values (list): the non-None values of the feature, of any shape.
+
+  Returns:
+    The list of the serialized tf.train.Feature.
+  """
+  if list_name == "bytes_list":
+    features = []
+    for value in values:
+      if isinstance(value, np.ndarray):
+        value = value.ravel()
+      elif not isinstance(value, (list, tuple)):
+        value = [value]
+      payload = b"".join(
+          _encode_length_delimited(_FIELD_1_TAG, tf.compat.as_bytes(v))
+          for v in value)
+      features.append(_encode_length_delimited(_LIST_TAGS[list_name], payload))
+    return features
+
+  if list_name == "float_list":
+    dtype, kinds = np.dtype("<f4"), "biuf"
+  else:
+    dtype, kinds = np.dtype("<i8"), "biu"
+  try:
+    array = np.asarray(values)
+  except ValueError:  # Values of different shapes
+    array = None
+  if (list_name == "int64_list" and array is not None and
+      array.dtype.kind == "u" and array.size and
+      array.max() > np.iinfo(np.int64).max):
+    array = None  # Would wrap around when cast to int64
+  if array is None or array.dtype.kind not in kinds:
+    if len(values) > 1:
+      # Values of different shapes, or of a type to check: one at a time
+      return [_encode_features(list_name, [value])[0] for value in values]
+    # Let the proto list check the type and range of the values
+    feature = tf.train.Feature()
+    value = values[0]
+    if isinstance(value, np.ndarray):
+      value = value.ravel().tolist()
+    elif not isinstance(value, (list, tuple)):
+      value = [value]
+    value_list = getattr(feature, list_name)
+    value_list.SetInParent()  # Empty lists are still written
+    value_list.value.extend(value)
+    return [feature.SerializeToString()]
+
+  array = array.astype(dtype).reshape((len(values), -1))
+  if list_name == "float_list":
+    data = array.tobytes()
+    offsets = np.arange(len(values) + 1) * array.shape[1] * dtype.itemsize
+  else:
+    data, sizes = _encode_varints(array.ravel())
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(sizes.reshape(array.shape).sum(axis=1), out=offsets[1:])
+  tag = _LIST_TAGS[list_name]
+  features = []
+  for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+    packed = data[start:end]
+    if packed:
+      packed = _encode_length_delimited(_FIELD_1_TAG, packed)
+    features.append(_encode_length_delimited(tag, packed))
+  return features
+
+
+def _generate_tf_examples(generator, encoder=None):
+  """Wraps dict generator to produce serialized tf.train.Examples.
+
+  With an `encoder`, the examples are serialized by batches of
+  `_ENCODE_BATCH_SIZE`.
+  """
+  if metrics.is_enabled():
+    for record in _generate_timed_tf_examples(generator, encoder):
+      yield record
+  elif encoder is None:
+    for example_dict in generator:
+      yield _dict_to_tf_example(example_dict).SerializeToString()
+  else:
+    for example_dicts in _iter_batches(generator, _ENCODE_BATCH_SIZE):
+      for record in encoder.encode_batch(example_dicts):
+        yield record
+
+
+def _generate_timed_tf_examples(generator, encoder=None):
+  """Same as `_generate_tf_examples`, recording the serialization time."""
+  if encoder is None:
+    encode_fn = lambda exs: [_dict_to_tf_example(ex).SerializeToString()
+                             for ex in exs]
+  else:
+    encode_fn = encoder.encode_batch
+  # Only the serialization is timed, not the generation of the examples
+  serialization_time = 0.
+  try:
+    for example_dicts in _iter_batches(generator, _ENCODE_BATCH_SIZE):
+      start_time = time.time()
+      records = encode_fn(example_dicts)
+      serialization_time += time.time() - start_time
+      for record in records:
+        yield record
+  finally:
+    metrics.record_time("write.serialization_time", serialization_time)
+
+
+def _iter_batches(iterable, batch_size):
+  """Yields the lists of `batch_size` consecutive elements of `iterable`."""
+  iterator = iter(iterable)
+  while True:
+    batch = list(itertools.islice(iterator, batch_size))
+    if not batch:
+      return
+    yield batch
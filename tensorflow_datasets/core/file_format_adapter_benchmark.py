@@ -0,0 +1,117 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the serialization of the examples into tf.train.Example.
+
+Compares `_dict_to_tf_example`, which infers the type of each feature from its
+values, with `_TFExampleEncoder`, which resolves the types once from the
+example reading spec and writes the wire format directly, one example at a
+time (`_encoder`) or packing the numeric features of a whole batch at once
+(`_encoder_batch`).
+
+Run with:
+
+```
+python -m tensorflow_datasets.core.file_format_adapter_benchmark --benchmarks=.
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_datasets.core import file_format_adapter
+
+_NUM_EXAMPLES = 10000
+_NUM_WIDE_FEATURES = 100
+
+
+def _mnist_like_examples():
+  """Returns MNIST-like examples (encoded image and label)."""
+  spec = {
+      "input/encoded": tf.FixedLenFeature(tuple(), tf.string),
+      "target": tf.FixedLenFeature(tuple(), tf.int64),
+  }
+  examples = [{
+      "input/encoded": np.random.bytes(300),
+      "target": np.int64(i % 10),
+  } for i in range(_NUM_EXAMPLES)]
+  return spec, examples
+
+
+def _wide_numeric_examples():
+  """Returns examples with many numeric features."""
+  spec = {}
+  for i in range(_NUM_WIDE_FEATURES):
+    if i % 2:
+      spec["float%d" % i] = tf.FixedLenFeature((8,), tf.float32)
+    else:
+      spec["int%d" % i] = tf.FixedLenFeature((8,), tf.int64)
+  examples = []
+  for _ in range(_NUM_EXAMPLES):
+    example = {}
+    for name in spec:
+      if name.startswith("float"):
+        example[name] = np.random.rand(8).astype(np.float32)
+      else:
+        example[name] = np.random.randint(1000, size=8)
+    examples.append(example)
+  return spec, examples
+
+
+class TFExampleEncoderBenchmark(tf.test.Benchmark):
+  """Examples serialized per second."""
+
+  def _report(self, name, encode_fn, examples):
+    start_time = time.time()
+    encode_fn(examples)
+    wall_time = time.time() - start_time
+    self.report_benchmark(
+        name=name,
+        iters=len(examples),
+        wall_time=wall_time,
+        extras={"examples_per_sec": len(examples) / wall_time})
+
+  def _benchmark(self, name, spec, examples):
+    def encode_dict_to_tf_example(examples):
+      return [
+          file_format_adapter._dict_to_tf_example(ex).SerializeToString()
+          for ex in examples
+      ]
+
+    encoder = file_format_adapter._TFExampleEncoder(spec)
+
+    def encode(examples):
+      return [encoder.encode(ex) for ex in examples]
+
+    self._report(name + "_dict_to_tf_example", encode_dict_to_tf_example,
+                 examples)
+    self._report(name + "_encoder", encode, examples)
+    self._report(name + "_encoder_batch", encoder.encode_batch, examples)
+
+  def benchmark_mnist_like(self):
+    self._benchmark("mnist_like", *_mnist_like_examples())
+
+  def benchmark_wide_numeric(self):
+    self._benchmark("wide_numeric", *_wide_numeric_examples())
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -19,10 +19,19 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import csv
+import functools
+import os
+
 import numpy as np
+import six
 import tensorflow as tf
 from tensorflow_datasets.core import dataset_builder
+from tensorflow_datasets.core import dataset_info
 from tensorflow_datasets.core import file_format_adapter
+from tensorflow_datasets.core import metrics
+from tensorflow_datasets.core import shuffle
 from tensorflow_datasets.core import test_utils
 
 tf.enable_eager_execution()
@@ -73,31 +82,93 @@ class DummyCSVBuilder(DummyTFRecordBuilder):
         feature_types={"x": tf.int32, "y": tf.int32, "z": tf.string})
 
 
+def _batch_examples(generator_fn, batch_size=7):
+  """Yields the examples of the generator in batches of column arrays."""
+  examples = list(generator_fn())
+  for i in range(0, len(examples), batch_size):
+    batch = examples[i:i + batch_size]
+    yield {k: np.array([ex[k] for ex in batch]) for k in batch[0]}
+
+
+class DummyBatchedCSVBuilder(DummyCSVBuilder):
+
+  def _dataset_split_generators(self, dl_manager):
+    split_generators = super(
+        DummyBatchedCSVBuilder, self)._dataset_split_generators(dl_manager)
+    return [
+        dataset_builder.SplitGenerator(
+            generator_fn=functools.partial(_batch_examples, sg.generator_fn),
+            split_files=sg.split_files)
+        for sg in split_generators
+    ]
+
+  @property
+  def _file_format_adapter(self):
+    return file_format_adapter.CSVAdapter(
+        feature_types={"x": tf.int32, "y": tf.int32, "z": tf.string},
+        batched=True)
+
+
+class DummyColumnarBuilder(DummyTFRecordBuilder):
+
+  @property
+  def _file_format_adapter(self):
+    adapter = super(DummyColumnarBuilder, self)._file_format_adapter
+    return file_format_adapter.ColumnarAdapter(adapter._example_reading_spec)
+
+
+class DummyCompressedTFRecordBuilder(DummyTFRecordBuilder):
+
+  @property
+  def _file_format_adapter(self):
+    adapter = super(DummyCompressedTFRecordBuilder, self)._file_format_adapter
+    return file_format_adapter.TFRecordExampleAdapter(
+        adapter._example_reading_spec, compression_type="GZIP")
+
+
+class DummyShuffledTFRecordBuilder(DummyTFRecordBuilder):
+
+  @property
+  def _shuffle_config(self):
+    # Spill the records to disk
+    return shuffle.ShuffleConfig(seed=123, memory_limit=10, num_buckets=4)
+
+
+class DummyShuffledCSVBuilder(DummyCSVBuilder):
+
+  @property
+  def _shuffle_config(self):
+    return shuffle.ShuffleConfig(seed=123, memory_limit=10, num_buckets=4)
+
+
 class FileFormatAdapterTest(tf.test.TestCase):
 
   def _test_generator_based_builder(self, builder_cls):
     with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
       builder = builder_cls(data_dir=tmp_dir)
       builder.download_and_prepare()
-      train_dataset = builder.as_dataset(split=dataset_builder.Split.TRAIN)
-      valid_dataset = builder.as_dataset(split=dataset_builder.Split.VALIDATION)
-      test_dataset = builder.as_dataset(split=dataset_builder.Split.TEST)
-
-      def validate_dataset(dataset, min_val, max_val, test_range=False):
-        els = []
-        for el in dataset:
-          x, y, z = el["x"].numpy(), el["y"].numpy(), el["z"].numpy()
-          self.assertEqual(-x, y)
-          self.assertEqual(x, int(z))
-          self.assertGreaterEqual(x, min_val)
-          self.assertLess(x, max_val)
-          els.append(x)
-        if test_range:
-          self.assertEqual(list(range(min_val, max_val)), sorted(els))
-
-      validate_dataset(train_dataset, 0, 30)
-      validate_dataset(valid_dataset, 0, 30)
-      validate_dataset(test_dataset, 30, 40, True)
+      self._validate_builder(builder)
+
+  def _validate_builder(self, builder):
+    train_dataset = builder.as_dataset(split=dataset_builder.Split.TRAIN)
+    valid_dataset = builder.as_dataset(split=dataset_builder.Split.VALIDATION)
+    test_dataset = builder.as_dataset(split=dataset_builder.Split.TEST)
+
+    def validate_dataset(dataset, min_val, max_val, test_range=False):
+      els = []
+      for el in dataset:
+        x, y, z = el["x"].numpy(), el["y"].numpy(), el["z"].numpy()
+        self.assertEqual(-x, y)
+        self.assertEqual(x, int(z))
+        self.assertGreaterEqual(x, min_val)
+        self.assertLess(x, max_val)
+        els.append(x)
+      if test_range:
+        self.assertEqual(list(range(min_val, max_val)), sorted(els))
+
+    validate_dataset(train_dataset, 0, 30)
+    validate_dataset(valid_dataset, 0, 30)
+    validate_dataset(test_dataset, 30, 40, True)
 
   def test_tfrecords(self):
     self._test_generator_based_builder(DummyTFRecordBuilder)
@@ -105,6 +176,47 @@ class FileFormatAdapterTest(tf.test.TestCase):
   def test_csv(self):
     self._test_generator_based_builder(DummyCSVBuilder)
 
+  def test_batched_csv(self):
+    self._test_generator_based_builder(DummyBatchedCSVBuilder)
+
+  def test_columnar(self):
+    self._test_generator_based_builder(DummyColumnarBuilder)
+
+  def test_features_projection(self):
+    for builder_cls in [
+        DummyTFRecordBuilder, DummyCSVBuilder, DummyColumnarBuilder]:
+      with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+        builder = builder_cls(data_dir=tmp_dir)
+        builder.download_and_prepare()
+        dataset = builder.as_dataset(
+            split=dataset_builder.Split.TEST, features=["x"])
+        els = list(dataset)
+        self.assertEqual([["x"]] * 10, [list(el) for el in els])
+        self.assertEqual(list(range(30, 40)),
+                         sorted(el["x"].numpy() for el in els))
+        with self.assertRaises(ValueError):
+          builder.as_dataset(split=dataset_builder.Split.TEST, features=["w"])
+
+  def test_compressed_tfrecords(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = DummyCompressedTFRecordBuilder(data_dir=tmp_dir)
+      builder.download_and_prepare()
+      info = dataset_info.load_dataset_info(builder._data_dir)
+      self.assertEqual("GZIP", info.compression_type)
+      filepattern = builder._split_files(
+          split=dataset_builder.Split.TEST).filepattern
+      with tf.gfile.Open(tf.gfile.Glob(filepattern)[0], "rb") as f:
+        self.assertEqual(b"\x1f\x8b", f.read(2))  # GZIP magic number
+
+      # The files are read with the compression recorded in the metadata
+      self._validate_builder(DummyTFRecordBuilder(data_dir=tmp_dir))
+
+  def test_shuffled_tfrecords(self):
+    self._test_generator_based_builder(DummyShuffledTFRecordBuilder)
+
+  def test_shuffled_csv(self):
+    self._test_generator_based_builder(DummyShuffledCSVBuilder)
+
 
 class TFRecordUtilsTest(tf.test.TestCase):
 
@@ -134,6 +246,322 @@ class TFRecordUtilsTest(tf.test.TestCase):
       example.ParseFromString(serialized_example)
       self.assertEqual(expected, example)
 
+  def test_example_encoder(self):
+    encoder = file_format_adapter._TFExampleEncoder({
+        "a": tf.FixedLenFeature(tuple(), tf.int64),
+        "b": tf.VarLenFeature(tf.string),
+        "c": tf.FixedLenFeature((2, 2), tf.float32),
+    })
+    example_dicts = [
+        {"a": 1, "b": ["foo", "bar"], "c": [2.0, 3.0, 4.0, 5.0], "d": 3},
+        {"a": np.int64(5), "b": np.array([b"x"]), "c": np.ones(4, np.float32)},
+        # Missing and None features, feature not in the spec
+        {"a": None, "c": [0.0, 0.0, 0.0, 0.0], "e": "q"},
+        {"a": 7, "b": "s", "c": [1.0, 1.0, 1.0, 1.0]},
+    ]
+    serialized_examples = encoder.encode_batch(example_dicts)
+    self.assertEqual(4, len(serialized_examples))
+    for example_dict, serialized_example in zip(example_dicts,
+                                                serialized_examples):
+      example = tf.train.Example()
+      example.ParseFromString(serialized_example)
+      expected = file_format_adapter._dict_to_tf_example(example_dict)
+      self.assertEqual(expected, example)
+
+    # Multi-dimensional arrays are flattened
+    example = tf.train.Example()
+    example.ParseFromString(encoder.encode({
+        "a": 1, "b": "s", "c": np.array([[1.0, 2.0], [3.0, 4.0]])}))
+    self.assertEqual([1.0, 2.0, 3.0, 4.0],
+                     list(example.features.feature["c"].float_list.value))
+
+  def test_example_encoder_values(self):
+    encoder = file_format_adapter._TFExampleEncoder({
+        "i": tf.VarLenFeature(tf.int64),
+        "f": tf.VarLenFeature(tf.float32),
+        "b": tf.FixedLenFeature(tuple(), tf.bool),
+    })
+    example_dicts = [
+        {"i": [0, 1, 127, 128, 300, -1, 2**63 - 1, -2**63], "f": [-1.5, 1e30],
+         "b": True},
+        # Values of different shapes across the batch
+        {"i": np.array([[5, -6], [7, 8]]), "f": np.float32(0.25), "b": False},
+        {"i": np.array([-1], np.int32), "f": [1, 2], "b": np.bool_(True)},
+    ]
+    serialized_examples = encoder.encode_batch(example_dicts)
+    for example_dict, serialized_example in zip(example_dicts,
+                                                serialized_examples):
+      example = tf.train.Example()
+      example.ParseFromString(serialized_example)
+      feature = example.features.feature
+      self.assertEqual(np.ravel(example_dict["i"]).tolist(),
+                       list(feature["i"].int64_list.value))
+      self.assertEqual(np.ravel(example_dict["f"]).astype(np.float32).tolist(),
+                       list(feature["f"].float_list.value))
+      self.assertEqual([int(example_dict["b"])],
+                       list(feature["b"].int64_list.value))
+
+    # Empty lists are still written, with their type
+    example = tf.train.Example()
+    example.ParseFromString(encoder.encode({"i": np.zeros((0,), np.int64)}))
+    self.assertEqual("int64_list", example.features.feature["i"].WhichOneof(
+        "kind"))
+    self.assertEqual([], list(example.features.feature["i"].int64_list.value))
+
+    # Values of the wrong type are rejected
+    with self.assertRaises(TypeError):
+      encoder.encode({"i": ["foo"]})
+
+  def test_example_encoder_serialization(self):
+    # Same bytes as the proto for each dtype and shape
+    dtypes = {
+        "int64_list": [np.int8, np.int16, np.int32, np.int64, np.uint8,
+                       np.uint16, np.uint32, np.uint64, np.bool_],
+        "float_list": [np.float16, np.float32, np.float64, np.int32],
+    }
+    shapes = [tuple(), (0,), (1,), (3,), (2, 3), (2, 0, 2)]
+    spec = {
+        "b%d" % i: tf.FixedLenFeature(shape, tf.string)
+        for i, shape in enumerate(shapes)
+    }
+    example_dict = {
+        "b%d" % i: np.array([b"", b"x", b"\xff" * 200] * 12)[:np.prod(
+            shape, dtype=int)].reshape(shape)
+        for i, shape in enumerate(shapes)
+    }
+    rng = np.random.RandomState(0)
+    for list_name, list_dtypes in dtypes.items():
+      tf_dtype = tf.int64 if list_name == "int64_list" else tf.float32
+      for dtype in list_dtypes:
+        for shape in shapes:
+          name = "%s_%s_%s" % (list_name, np.dtype(dtype).name,
+                               "x".join(str(d) for d in shape))
+          spec[name] = tf.FixedLenFeature(shape, tf_dtype)
+          if np.dtype(dtype).kind == "f":
+            value = rng.standard_normal(shape) * 1e3
+          else:
+            info = np.iinfo(dtype if dtype != np.bool_ else np.uint8)
+            # Extreme values of the dtype (within the int64 range)
+            extremes = [info.min, min(info.max, np.iinfo(np.int64).max)]
+            value = rng.randint(extremes[0], extremes[1], size=shape,
+                                dtype=np.int64)
+            value.flat[:2] = extremes[:value.size]
+          example_dict[name] = np.asarray(value).astype(dtype)
+    # Python values, and a feature not in the spec
+    spec["py_int"] = tf.VarLenFeature(tf.int64)
+    example_dict["py_int"] = [0, -1, 2**63 - 1, 300]
+    spec["py_float"] = tf.FixedLenFeature(tuple(), tf.float32)
+    example_dict["py_float"] = 0.1
+    spec["py_str"] = tf.FixedLenFeature(tuple(), tf.string)
+    example_dict["py_str"] = u"\u00e9t\u00e9"
+    example_dict["not_in_spec"] = [1.5, 2.5]
+    encoder = file_format_adapter._TFExampleEncoder(spec)
+
+    expected = tf.train.Example()
+    for name, value in example_dict.items():
+      feature = expected.features.feature[name]
+      if name not in spec:
+        feature.CopyFrom(file_format_adapter._item_to_tf_feature(name, value))
+        continue
+      if spec[name].dtype == tf.string:
+        list_name = "bytes_list"
+      elif spec[name].dtype == tf.int64:
+        list_name = "int64_list"
+      else:
+        list_name = "float_list"
+      value_list = getattr(feature, list_name)
+      value_list.SetInParent()
+      values = np.ravel(value).tolist()
+      if list_name == "int64_list":
+        values = [int(v) for v in values]  # Booleans are written as 0 and 1
+      elif list_name == "bytes_list":
+        values = [tf.compat.as_bytes(v) for v in values]
+      value_list.value.extend(values)
+    expected = expected.SerializeToString(deterministic=True)
+    self.assertEqual(expected, encoder.encode(example_dict))
+    self.assertEqual([expected, expected],
+                     encoder.encode_batch([example_dict, example_dict]))
+
+  def test_example_encoder_uint64_overflow(self):
+    encoder = file_format_adapter._TFExampleEncoder({
+        "a": tf.VarLenFeature(tf.int64),
+    })
+    example = tf.train.Example()
+    example.ParseFromString(encoder.encode(
+        {"a": np.array([2**63 - 1], np.uint64)}))
+    self.assertEqual([2**63 - 1],
+                     list(example.features.feature["a"].int64_list.value))
+    # Out of the int64 range, instead of wrapping around
+    with self.assertRaises(ValueError):
+      encoder.encode({"a": np.array([1, 2**63], np.uint64)})
+
+  def test_write_metrics(self):
+    adapter = file_format_adapter.TFRecordExampleAdapter({
+        "a": tf.FixedLenFeature(tuple(), tf.int64),
+        "b": tf.VarLenFeature(tf.string),
+        "c": tf.FixedLenFeature((1,), tf.float32),
+    })
+    sink = metrics.InMemorySink()
+    previous_sink = metrics.set_sink(sink)
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      filepaths = [os.path.join(tmp_dir, "shard-%d" % i) for i in range(2)]
+      try:
+        adapter.write_from_generator(self.generator, filepaths)
+      finally:
+        metrics.set_sink(previous_sink)
+      self.assertEqual(3, sink.counters["write.records"])
+      self.assertEqual(
+          sum(tf.gfile.Stat(path).length for path in filepaths),
+          sink.counters["write.bytes"])
+      self.assertEqual(1, len(sink.timers["write.serialization_time"]))
+
+  def test_decode_records(self):
+    adapter = file_format_adapter.TFRecordExampleAdapter({
+        "a": tf.FixedLenFeature(tuple(), tf.int64),
+        "b": tf.VarLenFeature(tf.string),
+        "c": tf.FixedLenFeature((1,), tf.float32),
+    })
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      filepath = os.path.join(tmp_dir, "shard-0")
+      adapter.write_from_generator(self.generator, [filepath])
+      # The records are decoded by decode_fn, with the selected features
+      records = adapter.records_from_filename(filepath, features=["a"])
+      decode_fn = adapter.decode_fn(features=["a"])
+      examples = [decode_fn(record) for record in records]
+      self.assertEqual(3, len(examples))
+      for example in examples:
+        self.assertEqual(["a"], list(example))
+        self.assertEqual(1, example["a"].numpy())
+
+  def test_write_statistics(self):
+    adapter = file_format_adapter.TFRecordExampleAdapter({
+        "a": tf.FixedLenFeature(tuple(), tf.int64),
+        "b": tf.VarLenFeature(tf.string),
+        "c": tf.FixedLenFeature((1,), tf.float32),
+    })
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      filepaths = [os.path.join(tmp_dir, "shard-%d" % i) for i in range(2)]
+      written = adapter.write_from_generator(self.generator, filepaths)
+      a_proto, b_proto, c_proto = written.statistics.to_protos()
+      self.assertEqual(3, a_proto.num_examples)
+      self.assertEqual([(1, 3)],
+                       [(h.value, h.num_examples) for h in a_proto.histogram])
+      self.assertEqual(6, b_proto.string_lengths.num_values)
+      self.assertEqual(3, b_proto.string_lengths.mean)
+      self.assertEqual(2.0, c_proto.mean)
+
+      # The existing files are not written again, so have no statistics
+      written = adapter.write_from_generator(self.generator, filepaths)
+      self.assertIsNone(written.statistics)
+
+
+class CSVUtilsTest(tf.test.TestCase):
+
+  def test_format_csv_lines(self):
+    columns = [
+        np.array([1, 2, 3]),
+        np.array([0.5, 1e-5, 3.0]),
+        np.array(["a,b", "q\"x", "plain"]),
+        np.array([b"x", b"y\nz", b""]),
+    ]
+    self._assert_same_as_csv_writer(columns)
+
+  def test_format_csv_lines_single_column(self):
+    columns = [np.array(["a", "", "b", ""])]
+    text = self._assert_same_as_csv_writer(columns)
+    # The empty strings are read back, not skipped as blank lines
+    self.assertEqual([["a"], [""], ["b"], [""]],
+                     list(csv.reader(six.StringIO(text))))
+    self._assert_same_as_csv_writer([np.array([b"", b"x"])])
+
+  def _assert_same_as_csv_writer(self, columns):
+    """Checks that the lines formatted in bulk are those of csv.writer."""
+    lines = file_format_adapter._format_csv_lines(columns)
+    expected = six.StringIO()
+    writer = csv.writer(expected)
+    for row in zip(*[column.tolist() for column in columns]):
+      writer.writerow([tf.compat.as_text(v) if isinstance(v, bytes) else v
+                       for v in row])
+    text = file_format_adapter._join_csv_lines(lines)
+    self.assertEqual(expected.getvalue(), text)
+    return text
+
+
+class ShardsUtilsTest(tf.test.TestCase):
+
+  def _write_shards(self, tmp_dir, records, open_writer_fn=None):
+    """Writes the records (`str`), 3 records per shard."""
+    def filepaths_fn(num_shards):
+      return [os.path.join(tmp_dir, "shard-%05d-of-%05d" % (i, num_shards))
+              for i in range(num_shards)]
+
+    if open_writer_fn is None:
+      open_writer_fn = lambda path: tf.gfile.Open(path, "w")
+    return file_format_adapter._write_size_based_shards(
+        records, filepaths_fn, shard_size=3,
+        open_writer_fn=open_writer_fn,
+        record_size_fn=lambda _: 1,
+        checkpoint_shards=True)
+
+  def test_checkpoint_shards(self):
+    records = [str(i) for i in range(10)]
+
+    def interrupted_records():
+      for record in records[:7]:
+        yield record
+      raise RuntimeError("Interrupted")
+
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      with self.assertRaises(RuntimeError):
+        self._write_shards(tmp_dir, interrupted_records())
+
+      # The 2 complete shards are kept, the records of the third one are
+      # written again.
+      written_records = []
+
+      def open_writer(path):
+        f = tf.gfile.Open(path, "w")
+        return collections.namedtuple("_writer", ["write", "close"])(
+            write=lambda record: (written_records.append(record),
+                                  f.write(record)),
+            close=f.close)
+
+      written = self._write_shards(tmp_dir, iter(records), open_writer)
+      output_files = written.filepaths
+      self.assertEqual(records[6:], written_records)
+      self.assertEqual([3, 3, 3, 1], written.shard_lengths)
+      self.assertEqual(sorted(output_files),
+                       sorted(os.path.join(tmp_dir, f)
+                              for f in tf.gfile.ListDirectory(tmp_dir)))
+      contents = []
+      for path in output_files:
+        with tf.gfile.Open(path) as f:
+          contents.append(f.read())
+      self.assertEqual(["012", "345", "678", "9"], contents)
+
+  def test_round_robin_lengths(self):
+    self.assertEqual([4, 3, 3], file_format_adapter._round_robin_lengths(10, 3))
+    self.assertEqual([1, 1, 0], file_format_adapter._round_robin_lengths(2, 3))
+
+  def test_resumable_dir(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      dirname = os.path.join(tmp_dir, "dataset")
+      with self.assertRaises(RuntimeError):
+        with file_format_adapter.resumable_dir(dirname) as resumable_dir:
+          for filename in ["done", "writing"]:
+            path = os.path.join(resumable_dir, filename)
+            if filename == "writing":
+              path = file_format_adapter.get_incomplete_path(path)
+            with tf.gfile.Open(path, "w") as f:
+              f.write(filename)
+          raise RuntimeError("Interrupted")
+
+      # The complete files are kept, the incomplete ones are deleted
+      with file_format_adapter.resumable_dir(dirname) as resumable_dir:
+        self.assertEqual(["done"], tf.gfile.ListDirectory(resumable_dir))
+      self.assertEqual(["done"], tf.gfile.ListDirectory(dirname))
+      self.assertFalse(tf.gfile.Exists(resumable_dir))
+
 
 if __name__ == "__main__":
   tf.test.main()
@@ -0,0 +1,189 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Metrics of the download, generation and reading of the datasets.
+
+The metrics (counters, timers and gauges) are sent to the `MetricsSink` set
+with `set_sink`, e.g. to export them to a monitoring system:
+
+```python
+class LoggingSink(tfds.metrics.MetricsSink):
+
+  def increment(self, name, value, tags):
+    logging.info("%s += %s %s", name, value, tags)
+
+tfds.metrics.set_sink(LoggingSink())
+```
+
+No sink is set by default, and recording a metric then does nothing. The hot
+loops aggregate their metrics and record them once (e.g. per shard) rather than
+per example.
+
+Recorded metrics:
+
+  * `download.bytes` (counter): size of each processed trial of the
+    `DownloadManager` (download, extraction,...).
+  * `download.latency` (timer): processing time of each successful trial.
+  * `download.retries`, `download.failures` (counters): failed attempts of
+    the trials, and trials failing after all their retries.
+  * `download.cache_hits` (counter): trials reused from the cache.
+  * `download.active_trials` (gauge): trials being processed.
+  * `write.records`, `write.bytes` (counters): examples and bytes of each
+    written shard.
+  * `write.serialization_time` (timer): time spent serializing the examples of
+    a split into `tf.train.Example`.
+  * `read.files_opened`, `read.records` (counters): files and records read by
+    the datasets built while a sink is set.
+
+The download metrics are tagged with the `host` of the trial URI (`extract` or
+`local` for the extractions and the `download_and_cache` calls), and the
+`write.*` ones with the `path` of the shard.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import threading
+import time
+
+__all__ = [
+    "MetricsSink",
+    "InMemorySink",
+    "get_sink",
+    "set_sink",
+    "is_enabled",
+    "increment",
+    "record_time",
+    "set_gauge",
+    "timer",
+]
+
+# Sink receiving the metrics (None to disable them)
+_sink = None
+
+
+class MetricsSink(object):
+  """Receives the metrics.
+
+  Subclasses override the methods of the metric types they export. The methods
+  can be called concurrently from several threads.
+  """
+
+  def increment(self, name, value, tags):
+    """Adds `value` to the counter `name`.
+
+    Args:
+      name (str): name of the metric.
+      value (int): increment of the counter.
+      tags (dict<str, str>): tags of the metric (may be empty).
+    """
+    pass
+
+  def record_time(self, name, seconds, tags):
+    """Records a duration (in seconds) of the timer `name`."""
+    pass
+
+  def set_gauge(self, name, value, tags):
+    """Sets the current value of the gauge `name`."""
+    pass
+
+
+class InMemorySink(MetricsSink):
+  """Aggregates the metrics in memory, ignoring their tags (e.g. for tests).
+
+  Attributes:
+    counters (dict<str, int>): sum of the increments of each counter.
+    timers (dict<str, list<float>>): durations recorded by each timer.
+    gauges (dict<str, float>): last value of each gauge.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.counters = collections.defaultdict(int)
+    self.timers = collections.defaultdict(list)
+    self.gauges = {}
+
+  def increment(self, name, value, tags):
+    with self._lock:
+      self.counters[name] += value
+
+  def record_time(self, name, seconds, tags):
+    with self._lock:
+      self.timers[name].append(seconds)
+
+  def set_gauge(self, name, value, tags):
+    with self._lock:
+      self.gauges[name] = value
+
+
+def get_sink():
+  """Returns the current `MetricsSink` (None if the metrics are disabled)."""
+  return _sink
+
+
+def set_sink(sink):
+  """Sets the `MetricsSink` receiving the metrics.
+
+  Args:
+    sink (MetricsSink): the new sink, or None to disable the metrics.
+
+  Returns:
+    The previous sink (None if there was none).
+  """
+  global _sink
+  previous_sink, _sink = _sink, sink
+  return previous_sink
+
+
+def is_enabled():
+  """Returns whether a sink receives the metrics."""
+  return _sink is not None
+
+
+def increment(name, value=1, tags=None):
+  """Adds `value` to the counter `name`."""
+  sink = _sink
+  if sink is not None:
+    sink.increment(name, value, tags or {})
+
+
+def record_time(name, seconds, tags=None):
+  """Records a duration (in seconds) of the timer `name`."""
+  sink = _sink
+  if sink is not None:
+    sink.record_time(name, seconds, tags or {})
+
+
+def set_gauge(name, value, tags=None):
+  """Sets the current value of the gauge `name`."""
+  sink = _sink
+  if sink is not None:
+    sink.set_gauge(name, value, tags or {})
+
+
+@contextlib.contextmanager
+def timer(name, tags=None):
+  """Records the time spent within the context in the timer `name`."""
+  if _sink is None:
+    yield
+    return
+  start_time = time.time()
+  try:
+    yield
+  finally:
+    record_time(name, time.time() - start_time, tags)
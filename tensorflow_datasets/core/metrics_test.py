@@ -0,0 +1,81 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.metrics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+from tensorflow_datasets.core import metrics
+
+
+class MetricsTest(tf.test.TestCase):
+
+  def tearDown(self):
+    metrics.set_sink(None)
+
+  def test_disabled(self):
+    self.assertFalse(metrics.is_enabled())
+    # Nothing is recorded (and nothing fails) without sink
+    metrics.increment("counter")
+    metrics.record_time("timer", 1.)
+    metrics.set_gauge("gauge", 1)
+    with metrics.timer("timer"):
+      pass
+
+  def test_in_memory_sink(self):
+    sink = metrics.InMemorySink()
+    self.assertIsNone(metrics.set_sink(sink))
+    self.assertTrue(metrics.is_enabled())
+    self.assertIs(sink, metrics.get_sink())
+
+    metrics.increment("counter")
+    metrics.increment("counter", 2, tags={"path": "a"})
+    metrics.record_time("timer", 1.)
+    with metrics.timer("timer"):
+      pass
+    metrics.set_gauge("gauge", 3)
+    metrics.set_gauge("gauge", 1)
+    self.assertEqual({"counter": 3}, dict(sink.counters))
+    self.assertEqual(2, len(sink.timers["timer"]))
+    self.assertEqual(1., sink.timers["timer"][0])
+    self.assertEqual({"gauge": 1}, sink.gauges)
+
+    self.assertIs(sink, metrics.set_sink(None))
+    metrics.increment("counter")
+    self.assertEqual(3, sink.counters["counter"])
+
+  def test_sink_api(self):
+    calls = []
+
+    class RecordingSink(metrics.MetricsSink):
+
+      def increment(self, name, value, tags):
+        calls.append((name, value, tags))
+
+    metrics.set_sink(RecordingSink())
+    metrics.increment("counter", 2, tags={"path": "a"})
+    metrics.increment("counter")
+    # Metric types not overridden are ignored
+    metrics.record_time("timer", 1.)
+    metrics.set_gauge("gauge", 1)
+    self.assertEqual(
+        [("counter", 2, {"path": "a"}), ("counter", 1, {})], calls)
+
+
+if __name__ == "__main__":
+  tf.test.main()
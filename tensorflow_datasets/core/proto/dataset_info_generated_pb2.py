@@ -0,0 +1,417 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: dataset_info.proto
+
+import sys
+_b=sys.version_info[0]<3 and (lambda x:x) or (lambda x:x.encode('latin1'))
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor.FileDescriptor(
+  name='dataset_info.proto',
+  package='tensorflow_datasets.proto',
+  syntax='proto3',
+  serialized_options=None,
+  serialized_pb=_b('\n\x12\x64\x61taset_info.proto\x12\x19tensorflow_datasets.proto\"\x99\x01\n\tSplitInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x12\n\nnum_shards\x18\x02 \x01(\x03\x12\x11\n\tnum_bytes\x18\x03 \x01(\x03\x12\x15\n\rshard_lengths\x18\x04 \x03(\x03\x12@\n\nstatistics\x18\x05 \x03(\x0b\x32,.tensorflow_datasets.proto.FeatureStatistics\"0\n\nShapeCount\x12\x0c\n\x04\x64ims\x18\x01 \x03(\x03\x12\x14\n\x0cnum_examples\x18\x02 \x01(\x03\"1\n\nValueCount\x12\r\n\x05value\x18\x01 \x01(\x03\x12\x14\n\x0cnum_examples\x18\x02 \x01(\x03\"\xbc\x02\n\x11\x46\x65\x61tureStatistics\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x14\n\x0cnum_examples\x18\x02 \x01(\x03\x12\x35\n\x06shapes\x18\x03 \x03(\x0b\x32%.tensorflow_datasets.proto.ShapeCount\x12\x12\n\nnum_values\x18\x04 \x01(\x03\x12\x0b\n\x03min\x18\x05 \x01(\x01\x12\x0b\n\x03max\x18\x06 \x01(\x01\x12\x0c\n\x04mean\x18\x07 \x01(\x01\x12\x10\n\x08variance\x18\x08 \x01(\x01\x12\x38\n\thistogram\x18\t \x03(\x0b\x32%.tensorflow_datasets.proto.ValueCount\x12\x44\n\x0estring_lengths\x18\n \x01(\x0b\x32,.tensorflow_datasets.proto.FeatureStatistics\"k\n\x0b\x44\x61tasetInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x34\n\x06splits\x18\x02 \x03(\x0b\x32$.tensorflow_datasets.proto.SplitInfo\x12\x18\n\x10\x63ompression_type\x18\x03 \x01(\t\"R\n\x10ShardsCheckpoint\x12\x12\n\nnum_shards\x18\x01 \x01(\x03\x12\x13\n\x0bnum_records\x18\x02 \x01(\x03\x12\x15\n\rshard_lengths\x18\x03 \x03(\x03\x62\x06proto3')
+)
+
+
+
+
+_SPLITINFO = _descriptor.Descriptor(
+  name='SplitInfo',
+  full_name='tensorflow_datasets.proto.SplitInfo',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='name', full_name='tensorflow_datasets.proto.SplitInfo.name', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_shards', full_name='tensorflow_datasets.proto.SplitInfo.num_shards', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_bytes', full_name='tensorflow_datasets.proto.SplitInfo.num_bytes', index=2,
+      number=3, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='shard_lengths', full_name='tensorflow_datasets.proto.SplitInfo.shard_lengths', index=3,
+      number=4, type=3, cpp_type=2, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='statistics', full_name='tensorflow_datasets.proto.SplitInfo.statistics', index=4,
+      number=5, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=50,
+  serialized_end=203,
+)
+
+
+_SHAPECOUNT = _descriptor.Descriptor(
+  name='ShapeCount',
+  full_name='tensorflow_datasets.proto.ShapeCount',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='dims', full_name='tensorflow_datasets.proto.ShapeCount.dims', index=0,
+      number=1, type=3, cpp_type=2, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_examples', full_name='tensorflow_datasets.proto.ShapeCount.num_examples', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=205,
+  serialized_end=253,
+)
+
+
+_VALUECOUNT = _descriptor.Descriptor(
+  name='ValueCount',
+  full_name='tensorflow_datasets.proto.ValueCount',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='value', full_name='tensorflow_datasets.proto.ValueCount.value', index=0,
+      number=1, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_examples', full_name='tensorflow_datasets.proto.ValueCount.num_examples', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=255,
+  serialized_end=304,
+)
+
+
+_FEATURESTATISTICS = _descriptor.Descriptor(
+  name='FeatureStatistics',
+  full_name='tensorflow_datasets.proto.FeatureStatistics',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='name', full_name='tensorflow_datasets.proto.FeatureStatistics.name', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_examples', full_name='tensorflow_datasets.proto.FeatureStatistics.num_examples', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='shapes', full_name='tensorflow_datasets.proto.FeatureStatistics.shapes', index=2,
+      number=3, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_values', full_name='tensorflow_datasets.proto.FeatureStatistics.num_values', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='min', full_name='tensorflow_datasets.proto.FeatureStatistics.min', index=4,
+      number=5, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='max', full_name='tensorflow_datasets.proto.FeatureStatistics.max', index=5,
+      number=6, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='mean', full_name='tensorflow_datasets.proto.FeatureStatistics.mean', index=6,
+      number=7, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='variance', full_name='tensorflow_datasets.proto.FeatureStatistics.variance', index=7,
+      number=8, type=1, cpp_type=5, label=1,
+      has_default_value=False, default_value=float(0),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='histogram', full_name='tensorflow_datasets.proto.FeatureStatistics.histogram', index=8,
+      number=9, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='string_lengths', full_name='tensorflow_datasets.proto.FeatureStatistics.string_lengths', index=9,
+      number=10, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=307,
+  serialized_end=623,
+)
+
+
+_DATASETINFO = _descriptor.Descriptor(
+  name='DatasetInfo',
+  full_name='tensorflow_datasets.proto.DatasetInfo',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='name', full_name='tensorflow_datasets.proto.DatasetInfo.name', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='splits', full_name='tensorflow_datasets.proto.DatasetInfo.splits', index=1,
+      number=2, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='compression_type', full_name='tensorflow_datasets.proto.DatasetInfo.compression_type', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=625,
+  serialized_end=732,
+)
+
+
+_SHARDSCHECKPOINT = _descriptor.Descriptor(
+  name='ShardsCheckpoint',
+  full_name='tensorflow_datasets.proto.ShardsCheckpoint',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='num_shards', full_name='tensorflow_datasets.proto.ShardsCheckpoint.num_shards', index=0,
+      number=1, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='num_records', full_name='tensorflow_datasets.proto.ShardsCheckpoint.num_records', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='shard_lengths', full_name='tensorflow_datasets.proto.ShardsCheckpoint.shard_lengths', index=2,
+      number=3, type=3, cpp_type=2, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=734,
+  serialized_end=816,
+)
+
+_SPLITINFO.fields_by_name['statistics'].message_type = _FEATURESTATISTICS
+_FEATURESTATISTICS.fields_by_name['shapes'].message_type = _SHAPECOUNT
+_FEATURESTATISTICS.fields_by_name['histogram'].message_type = _VALUECOUNT
+_FEATURESTATISTICS.fields_by_name['string_lengths'].message_type = _FEATURESTATISTICS
+_DATASETINFO.fields_by_name['splits'].message_type = _SPLITINFO
+DESCRIPTOR.message_types_by_name['SplitInfo'] = _SPLITINFO
+DESCRIPTOR.message_types_by_name['ShapeCount'] = _SHAPECOUNT
+DESCRIPTOR.message_types_by_name['ValueCount'] = _VALUECOUNT
+DESCRIPTOR.message_types_by_name['FeatureStatistics'] = _FEATURESTATISTICS
+DESCRIPTOR.message_types_by_name['DatasetInfo'] = _DATASETINFO
+DESCRIPTOR.message_types_by_name['ShardsCheckpoint'] = _SHARDSCHECKPOINT
+_sym_db.RegisterFileDescriptor(DESCRIPTOR)
+
+SplitInfo = _reflection.GeneratedProtocolMessageType('SplitInfo', (_message.Message,), dict(
+  DESCRIPTOR = _SPLITINFO,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.SplitInfo)
+  ))
+_sym_db.RegisterMessage(SplitInfo)
+
+ShapeCount = _reflection.GeneratedProtocolMessageType('ShapeCount', (_message.Message,), dict(
+  DESCRIPTOR = _SHAPECOUNT,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.ShapeCount)
+  ))
+_sym_db.RegisterMessage(ShapeCount)
+
+ValueCount = _reflection.GeneratedProtocolMessageType('ValueCount', (_message.Message,), dict(
+  DESCRIPTOR = _VALUECOUNT,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.ValueCount)
+  ))
+_sym_db.RegisterMessage(ValueCount)
+
+FeatureStatistics = _reflection.GeneratedProtocolMessageType('FeatureStatistics', (_message.Message,), dict(
+  DESCRIPTOR = _FEATURESTATISTICS,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.FeatureStatistics)
+  ))
+_sym_db.RegisterMessage(FeatureStatistics)
+
+DatasetInfo = _reflection.GeneratedProtocolMessageType('DatasetInfo', (_message.Message,), dict(
+  DESCRIPTOR = _DATASETINFO,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.DatasetInfo)
+  ))
+_sym_db.RegisterMessage(DatasetInfo)
+
+ShardsCheckpoint = _reflection.GeneratedProtocolMessageType('ShardsCheckpoint', (_message.Message,), dict(
+  DESCRIPTOR = _SHARDSCHECKPOINT,
+  __module__ = 'dataset_info_pb2'
+  # @@protoc_insertion_point(class_scope:tensorflow_datasets.proto.ShardsCheckpoint)
+  ))
+_sym_db.RegisterMessage(ShardsCheckpoint)
+
+
+# @@protoc_insertion_point(module_scope)
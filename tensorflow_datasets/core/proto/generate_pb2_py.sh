@@ -0,0 +1,11 @@
+#!/bin/bash
+
+# This script use the protoc compiler to generate the python code of the
+# dataset_info.proto file.
+
+if [[ $(protoc --version) != 'libprotoc 3.6.1' ]]; then
+  echo 'Please use version 3.6.1 of protoc for compatibility with Python 2 and 3.'
+  exit
+fi
+protoc dataset_info.proto --python_out=.
+mv dataset_info_pb2.py dataset_info_generated_pb2.py
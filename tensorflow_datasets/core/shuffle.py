@@ -0,0 +1,193 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Disk-backed shuffling of the records written during dataset generation.
+
+The records are kept in memory as long as they fit in the memory limit. Beyond
+that, each record is written to a randomly selected bucket file on disk. Each
+bucket is then loaded and shuffled in memory, one at a time. Randomly
+distributing the records across buckets then shuffling each bucket produces a
+uniformly random permutation of the records, while only one bucket at a time
+needs to fit in memory.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import random
+
+import tensorflow as tf
+
+from tensorflow_datasets.core import api_utils
+
+__all__ = [
+    "ShuffleConfig",
+    "Shuffler",
+    "shuffle_records",
+]
+
+_DEFAULT_MEMORY_LIMIT = 1 << 30  # 1 GiB
+_DEFAULT_NUM_BUCKETS = 256
+
+
+class ShuffleConfig(object):
+  """Configuration of the shuffling of the generated records."""
+
+  @api_utils.disallow_positional_args
+  def __init__(self,
+               seed=None,
+               memory_limit=_DEFAULT_MEMORY_LIMIT,
+               num_buckets=_DEFAULT_NUM_BUCKETS):
+    """Constructs a ShuffleConfig.
+
+    Args:
+      seed (int): Seed of the shuffling. For a given seed and memory limit, the
+        same records generated in the same order are always shuffled the same
+        way. If None, the shuffling is not reproducible.
+      memory_limit (int): Size in bytes of the records to keep in memory before
+        spilling them to disk.
+      num_buckets (int): Number of bucket files the records are spilled into.
+        Datasets of up to `num_buckets * memory_limit` bytes are shuffled
+        without exceeding the memory limit.
+    """
+    self.seed = seed
+    self.memory_limit = memory_limit
+    self.num_buckets = num_buckets
+
+
+class Shuffler(object):
+  """Shuffles the added records, using disk once they exceed the memory limit.
+
+  Typical usage:
+
+  ```python
+  shuffler = Shuffler(tmp_dir, ShuffleConfig(seed=123))
+  for record in records:
+    shuffler.add(record)
+  for record in shuffler:
+    ...
+  shuffler.close()
+  ```
+  """
+
+  def __init__(self, tmp_dir, config):
+    """Constructs a Shuffler.
+
+    Args:
+      tmp_dir (str): Directory where the bucket files are written. Created if
+        needed and deleted on `close`.
+      config (ShuffleConfig): The shuffling configuration.
+    """
+    self._tmp_dir = tmp_dir
+    self._config = config
+    self._rng = random.Random(config.seed)
+    self._records = []
+    self._records_size = 0
+    self._bucket_writers = None  # Created when the records are spilled
+
+  def add(self, record):
+    """Adds a record (`bytes`) to shuffle."""
+    if self._bucket_writers is None:
+      self._records.append(record)
+      self._records_size += len(record)
+      if self._records_size > self._config.memory_limit:
+        self._spill()
+    else:
+      self._write_to_bucket(record)
+
+  def __iter__(self):
+    """Yields the added records in random order."""
+    if self._bucket_writers is None:
+      records, self._records = self._records, []
+      self._rng.shuffle(records)
+      for record in records:
+        yield record
+      return
+
+    tf.logging.info("Shuffling records from %d buckets in %s",
+                    self._config.num_buckets, self._tmp_dir)
+    for writer in self._bucket_writers:
+      writer.close()
+    for i in range(self._config.num_buckets):
+      path = self._bucket_path(i)
+      records = list(tf.python_io.tf_record_iterator(path))
+      bucket_size = sum(len(record) for record in records)
+      if bucket_size > self._config.memory_limit:
+        tf.logging.warning(
+            "Shuffle bucket %d (%d bytes) exceeds the memory limit (%d bytes). "
+            "Consider increasing num_buckets.",
+            i, bucket_size, self._config.memory_limit)
+      self._rng.shuffle(records)
+      for record in records:
+        yield record
+      del records
+      tf.gfile.Remove(path)
+
+  def close(self):
+    """Deletes the bucket files."""
+    if self._bucket_writers is not None:
+      for writer in self._bucket_writers:
+        writer.close()
+    self._records = []
+    if tf.gfile.Exists(self._tmp_dir):
+      tf.gfile.DeleteRecursively(self._tmp_dir)
+
+  def _spill(self):
+    """Moves the in-memory records to the bucket files."""
+    tf.logging.info("Records exceed the shuffle memory limit (%d bytes). "
+                    "Spilling them to %s", self._config.memory_limit,
+                    self._tmp_dir)
+    tf.gfile.MakeDirs(self._tmp_dir)
+    self._bucket_writers = [
+        tf.python_io.TFRecordWriter(self._bucket_path(i))
+        for i in range(self._config.num_buckets)
+    ]
+    for record in self._records:
+      self._write_to_bucket(record)
+    self._records = []
+    self._records_size = 0
+
+  def _write_to_bucket(self, record):
+    bucket = self._rng.randrange(self._config.num_buckets)
+    self._bucket_writers[bucket].write(record)
+
+  def _bucket_path(self, bucket):
+    return os.path.join(self._tmp_dir, "bucket-%05d" % bucket)
+
+
+def shuffle_records(records, tmp_dir, config):
+  """Yields the records in random order.
+
+  All the records are consumed before the first one is yielded.
+
+  Args:
+    records (iterable): The records (`bytes`) to shuffle.
+    tmp_dir (str): Directory where the bucket files are written (deleted once
+      done).
+    config (ShuffleConfig): The shuffling configuration.
+
+  Yields:
+    The shuffled records.
+  """
+  shuffler = Shuffler(tmp_dir, config)
+  try:
+    for record in records:
+      shuffler.add(record)
+    for record in shuffler:
+      yield record
+  finally:
+    shuffler.close()
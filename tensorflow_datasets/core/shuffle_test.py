@@ -0,0 +1,63 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.shuffle."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import tensorflow as tf
+from tensorflow_datasets.core import shuffle
+from tensorflow_datasets.core import test_utils
+
+_RECORDS = [str(i).encode("utf-8") for i in range(1000)]
+
+
+class ShuffleTest(tf.test.TestCase):
+
+  def _shuffle(self, tmp_dir, **config_kwargs):
+    config = shuffle.ShuffleConfig(**config_kwargs)
+    shuffle_dir = os.path.join(tmp_dir, "shuffle")
+    records = list(shuffle.shuffle_records(_RECORDS, shuffle_dir, config))
+    self.assertFalse(tf.gfile.Exists(shuffle_dir))
+    return records
+
+  def test_shuffle_in_memory(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      records = self._shuffle(tmp_dir, seed=0)
+      self.assertNotEqual(_RECORDS, records)
+      self.assertEqual(sorted(_RECORDS), sorted(records))
+
+  def test_shuffle_on_disk(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      records = self._shuffle(tmp_dir, seed=0, memory_limit=100, num_buckets=8)
+      self.assertNotEqual(_RECORDS, records)
+      self.assertEqual(sorted(_RECORDS), sorted(records))
+
+  def test_seed(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      for config_kwargs in [{}, {"memory_limit": 100, "num_buckets": 8}]:
+        records1 = self._shuffle(tmp_dir, seed=123, **config_kwargs)
+        records2 = self._shuffle(tmp_dir, seed=123, **config_kwargs)
+        records3 = self._shuffle(tmp_dir, seed=456, **config_kwargs)
+        self.assertEqual(records1, records2)
+        self.assertNotEqual(records1, records3)
+
+
+if __name__ == "__main__":
+  tf.test.main()
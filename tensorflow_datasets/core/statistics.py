@@ -0,0 +1,296 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Statistics of the features of the datasets.
+
+The statistics are accumulated over batches of examples with vectorized numpy
+reductions. The accumulators of parts of a split (e.g. of each shard) can be
+computed in parallel and merged, and are saved as `FeatureStatistics` protos
+in the dataset metadata.
+
+The statistics of the stored features are accumulated while the examples are
+written (see `StatisticsAccumulator.accumulate`), so they do not require
+reading the dataset again.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+
+import numpy as np
+import six
+
+from tensorflow_datasets.core import dataset_info
+
+__all__ = [
+    "FeatureStatisticsAccumulator",
+    "StatisticsAccumulator",
+]
+
+# Maximum number of distinct values of the histogram of an integer feature
+_MAX_HISTOGRAM_SIZE = 1000
+# Number of examples buffered by `StatisticsAccumulator.accumulate` before
+# updating the statistics
+_ACCUMULATE_BATCH_SIZE = 1000
+
+
+class FeatureStatisticsAccumulator(object):
+  """Accumulates the statistics of a feature.
+
+  The variance is accumulated with the parallel algorithm of Chan et al., so
+  that the statistics of batches (and of accumulators) can be merged without
+  loss of precision.
+  """
+
+  def __init__(self, name):
+    self.name = name
+    self.num_examples = 0
+    self.shapes = collections.Counter()
+    self.num_values = 0
+    self.min = None
+    self.max = None
+    self.mean = 0.
+    self._sum_squared_deviations = 0.
+    # Value counts of scalar integer features (None if too many values)
+    self.histogram = collections.Counter()
+    # Statistics of the lengths of string features
+    self.string_lengths = None
+
+  def update_batch(self, values):
+    """Updates the statistics with the values of a batch of examples.
+
+    Args:
+      values (np.array): values of the feature, with the examples on the first
+        dimension.
+    """
+    values = np.asarray(values)
+    num_examples = len(values)
+    if not num_examples:
+      return
+    self.num_examples += num_examples
+    self.shapes[values.shape[1:]] += num_examples
+    if values.ndim != 1:
+      self._drop_histogram()
+    if values.size and np.issubdtype(values.dtype, np.number):
+      self._update_values(values)
+    else:
+      self._drop_histogram()
+      if values.size and values.dtype.kind in "OSU":
+        self._update_string_lengths(values)
+
+  def update(self, value):
+    """Updates the statistics with the value of a single example."""
+    value = np.asarray(value)
+    self.update_batch(value.reshape((1,) + value.shape))
+
+  def update_values(self, values):
+    """Updates the statistics with the values of a list of examples.
+
+    The values are reduced at once if they have the same shape, and one by one
+    otherwise.
+
+    Args:
+      values (list): values of the feature (e.g. from feature dicts).
+    """
+    if isinstance(values[0], (six.binary_type, six.text_type)):
+      # The strings are not copied into a fixed-size array
+      array = np.empty(len(values), dtype=object)
+      array[:] = values
+      self.update_batch(array)
+      return
+    try:
+      array = np.asarray(values)
+    except ValueError:  # Values of different shapes
+      array = None
+    if array is None or array.dtype == object:
+      for value in values:
+        self.update(value)
+    else:
+      self.update_batch(array)
+
+  def _update_values(self, values):
+    """Updates the statistics of the numeric values."""
+    batch_mean = values.mean(dtype=np.float64)
+    self._merge_moments(
+        num_values=values.size,
+        mean=batch_mean,
+        sum_squared_deviations=np.square(values - batch_mean).sum())
+    self._merge_min_max(values.min(), values.max())
+    if self.histogram is not None:
+      if np.issubdtype(values.dtype, np.integer):
+        unique_values, counts = np.unique(values, return_counts=True)
+        self.histogram.update(dict(zip(unique_values.tolist(),
+                                       counts.tolist())))
+        if len(self.histogram) > _MAX_HISTOGRAM_SIZE:
+          self._drop_histogram()
+      else:
+        self._drop_histogram()
+
+  def _update_string_lengths(self, values):
+    lengths = np.fromiter((len(v) for v in values.ravel()), dtype=np.int64,
+                          count=values.size)
+    if self.string_lengths is None:
+      self.string_lengths = FeatureStatisticsAccumulator(self.name)
+    self.string_lengths.update_batch(lengths)
+
+  def _merge_moments(self, num_values, mean, sum_squared_deviations):
+    total = self.num_values + num_values
+    delta = mean - self.mean
+    self.mean += delta * num_values / total
+    self._sum_squared_deviations += (
+        sum_squared_deviations +
+        delta * delta * self.num_values * num_values / total)
+    self.num_values = total
+
+  def _merge_min_max(self, min_value, max_value):
+    self.min = min_value if self.min is None else min(self.min, min_value)
+    self.max = max_value if self.max is None else max(self.max, max_value)
+
+  def _drop_histogram(self):
+    self.histogram = None
+
+  @property
+  def variance(self):
+    if not self.num_values:
+      return 0.
+    return self._sum_squared_deviations / self.num_values
+
+  def merge(self, other):
+    """Adds the statistics of another accumulator of the same feature."""
+    self.num_examples += other.num_examples
+    self.shapes.update(other.shapes)
+    if other.num_values:
+      self._merge_moments(other.num_values, other.mean,
+                          other._sum_squared_deviations)  # pylint: disable=protected-access
+      self._merge_min_max(other.min, other.max)
+    if self.histogram is not None and other.histogram is not None:
+      self.histogram.update(other.histogram)
+      if len(self.histogram) > _MAX_HISTOGRAM_SIZE:
+        self._drop_histogram()
+    else:
+      self._drop_histogram()
+    if other.string_lengths is not None:
+      if self.string_lengths is None:
+        self.string_lengths = FeatureStatisticsAccumulator(self.name)
+      self.string_lengths.merge(other.string_lengths)
+
+  def to_proto(self):
+    """Returns the `FeatureStatistics` proto of the statistics."""
+    proto = dataset_info.FeatureStatistics(
+        name=self.name,
+        num_examples=self.num_examples,
+        num_values=self.num_values,
+        mean=float(self.mean),
+        variance=float(self.variance),
+    )
+    if self.num_values:
+      proto.min = float(self.min)
+      proto.max = float(self.max)
+    for shape, num_examples in sorted(self.shapes.items()):
+      proto.shapes.add(dims=shape, num_examples=num_examples)
+    if self.num_values and self.histogram:
+      for value, num_examples in sorted(self.histogram.items()):
+        proto.histogram.add(value=value, num_examples=num_examples)
+    if self.string_lengths is not None:
+      proto.string_lengths.CopyFrom(self.string_lengths.to_proto())
+    return proto
+
+
+class StatisticsAccumulator(object):
+  """Accumulates the statistics of all the features of the examples."""
+
+  def __init__(self):
+    self._features = {}
+
+  def _feature(self, name):
+    if name not in self._features:
+      self._features[name] = FeatureStatisticsAccumulator(name)
+    return self._features[name]
+
+  def update_batch(self, batch):
+    """Updates the statistics with a batch of examples.
+
+    Args:
+      batch (dict): feature name to the values of the batch of examples.
+    """
+    for name, values in batch.items():
+      self._feature(name).update_batch(values)
+
+  def update(self, example):
+    """Updates the statistics with a single example (feature dict)."""
+    for name, value in example.items():
+      self._feature(name).update(value)
+
+  def update_examples(self, examples):
+    """Updates the statistics with a list of examples (feature dicts).
+
+    The `None` values (missing features) are ignored.
+    """
+    columns = collections.defaultdict(list)
+    for example in examples:
+      for name, value in example.items():
+        if value is not None:
+          columns[name].append(value)
+    for name, values in columns.items():
+      self._feature(name).update_values(values)
+
+  def accumulate(self, examples):
+    """Yields the examples, accumulating their statistics.
+
+    The examples are buffered and reduced by batches, so the overhead per
+    example is small.
+
+    Args:
+      examples (generator): yields the examples (feature dicts). They should
+        not be modified once yielded.
+
+    Yields:
+      The examples.
+    """
+    batch = []
+    for example in examples:
+      batch.append(example)
+      if len(batch) == _ACCUMULATE_BATCH_SIZE:
+        self.update_examples(batch)
+        batch = []
+      yield example
+    self.update_examples(batch)
+
+  def accumulate_batches(self, batches):
+    """Yields the batches of examples, accumulating their statistics.
+
+    Args:
+      batches (generator): yields the batches of examples (feature name to the
+        values of the batch).
+
+    Yields:
+      The batches.
+    """
+    for batch in batches:
+      self.update_batch(batch)
+      yield batch
+
+  def merge(self, other):
+    """Adds the statistics of another accumulator."""
+    for name, feature in other._features.items():  # pylint: disable=protected-access
+      self._feature(name).merge(feature)
+    return self
+
+  def to_protos(self):
+    """Returns the `FeatureStatistics` protos, sorted by feature name."""
+    return [self._features[name].to_proto()
+            for name in sorted(self._features)]
@@ -0,0 +1,126 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.statistics."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+import tensorflow as tf
+from tensorflow_datasets.core import statistics
+
+
+class StatisticsTest(tf.test.TestCase):
+
+  def test_feature_statistics(self):
+    values = np.random.randint(10, size=(100,))
+    accumulator = statistics.FeatureStatisticsAccumulator("label")
+    accumulator.update_batch(values[:30])
+    for value in values[30:40]:
+      accumulator.update(value)
+    accumulator.update_batch(values[40:])
+    proto = accumulator.to_proto()
+
+    self.assertEqual("label", proto.name)
+    self.assertEqual(100, proto.num_examples)
+    self.assertEqual(100, proto.num_values)
+    self.assertEqual(values.min(), proto.min)
+    self.assertEqual(values.max(), proto.max)
+    self.assertAlmostEqual(values.mean(), proto.mean)
+    self.assertAlmostEqual(values.var(), proto.variance)
+    self.assertEqual([((), 100)],
+                     [(tuple(s.dims), s.num_examples) for s in proto.shapes])
+    unique_values, counts = np.unique(values, return_counts=True)
+    self.assertEqual(
+        list(zip(unique_values.tolist(), counts.tolist())),
+        [(h.value, h.num_examples) for h in proto.histogram])
+
+  def test_merge(self):
+    images = np.random.randint(256, size=(20, 4, 4, 1)).astype(np.uint8)
+    small_images = np.random.randint(256, size=(5, 2, 4, 1)).astype(np.uint8)
+    accumulators = [statistics.StatisticsAccumulator() for _ in range(3)]
+    accumulators[0].update_batch({"image": images[:15], "text": [b"a"] * 15})
+    accumulators[1].update_batch({"image": images[15:], "text": [b"b"] * 5})
+    for image in small_images:
+      accumulators[2].update({"image": image, "text": b"c"})
+    merged = accumulators[0].merge(accumulators[1]).merge(accumulators[2])
+    image_proto, text_proto = merged.to_protos()
+
+    all_values = np.concatenate([images.ravel(), small_images.ravel()])
+    self.assertEqual("image", image_proto.name)
+    self.assertEqual(25, image_proto.num_examples)
+    self.assertEqual(all_values.size, image_proto.num_values)
+    self.assertEqual(all_values.min(), image_proto.min)
+    self.assertEqual(all_values.max(), image_proto.max)
+    self.assertAlmostEqual(all_values.mean(), image_proto.mean)
+    self.assertAlmostEqual(all_values.var(), image_proto.variance)
+    self.assertEqual(
+        [((2, 4, 1), 5), ((4, 4, 1), 20)],
+        [(tuple(s.dims), s.num_examples) for s in image_proto.shapes])
+    # Only scalar integer features have an histogram
+    self.assertEqual([], list(image_proto.histogram))
+
+    # Non-numeric features only have a number of examples and shapes
+    self.assertEqual("text", text_proto.name)
+    self.assertEqual(25, text_proto.num_examples)
+    self.assertEqual(0, text_proto.num_values)
+    self.assertEqual([], list(text_proto.histogram))
+
+  def test_histogram_size(self):
+    accumulator = statistics.FeatureStatisticsAccumulator("id")
+    accumulator.update_batch(np.arange(statistics._MAX_HISTOGRAM_SIZE))
+    self.assertEqual(statistics._MAX_HISTOGRAM_SIZE,
+                     len(accumulator.to_proto().histogram))
+    accumulator.update_batch(np.arange(10) - 10)
+    proto = accumulator.to_proto()
+    self.assertEqual([], list(proto.histogram))
+    self.assertEqual(-10, proto.min)
+
+  def test_accumulate(self):
+    examples = [
+        {"label": i % 3, "tokens": list(range(i)), "text": b"x" * i,
+         "extra": None if i % 2 else 1.5}
+        for i in range(statistics._ACCUMULATE_BATCH_SIZE + 5)
+    ]
+    accumulator = statistics.StatisticsAccumulator()
+    self.assertEqual(examples, list(accumulator.accumulate(iter(examples))))
+    extra_proto, label_proto, text_proto, tokens_proto = (
+        accumulator.to_protos())
+
+    num_examples = len(examples)
+    self.assertEqual(num_examples, label_proto.num_examples)
+    self.assertEqual(
+        [(0, 335), (1, 335), (2, 335)],
+        [(h.value, h.num_examples) for h in label_proto.histogram])
+    # Missing features are ignored
+    self.assertEqual((num_examples + 1) // 2, extra_proto.num_examples)
+    self.assertEqual(1.5, extra_proto.mean)
+    # Lists of different lengths are reduced one by one
+    self.assertEqual(num_examples, tokens_proto.num_examples)
+    self.assertEqual(num_examples, len(tokens_proto.shapes))
+    self.assertEqual(num_examples - 2, tokens_proto.max)
+    # Strings have the statistics of their lengths
+    self.assertEqual(0, text_proto.num_values)
+    self.assertEqual(num_examples, text_proto.string_lengths.num_values)
+    self.assertEqual(0, text_proto.string_lengths.min)
+    self.assertEqual(num_examples - 1, text_proto.string_lengths.max)
+    self.assertAlmostEqual((num_examples - 1) / 2,
+                           text_proto.string_lengths.mean)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,152 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Slices of the splits (e.g. "train[:10%]" or "train[5000:10000]").
+
+A subsplit is read from the number of examples of each shard of the split,
+recorded in the dataset metadata: only the shards overlapping the slice are
+read, and only the first and last of them are partially skipped.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import re
+
+__all__ = [
+    "Subsplit",
+    "parse_subsplit",
+    "shard_slices",
+]
+
+_SUBSPLIT_RE = re.compile(
+    r"^(?P<split>\w+)(\[(?P<start>-?\d*%?):(?P<stop>-?\d*%?)\])?$")
+
+
+class Subsplit(collections.namedtuple(
+    "_Subsplit", ["split", "start", "stop", "percent"])):
+  """Slice of a split.
+
+  Args:
+    split: `str`, name of the split.
+    start: `int`, start of the slice (None for the start of the split).
+    stop: `int`, end of the slice, excluded (None for the end of the split).
+    percent: `bool`, whether `start` and `stop` are percentages of the split
+      instead of example indices.
+  """
+
+  @property
+  def is_slice(self):
+    """Whether the subsplit is only part of the split."""
+    return self.start is not None or self.stop is not None
+
+  def example_range(self, num_examples):
+    """Returns the (start, stop) example indices of the slice.
+
+    Args:
+      num_examples (int): number of examples of the split.
+
+    Returns:
+      (start, stop): the slice covers the examples `start` to `stop - 1`.
+    """
+    start, stop = self.start, self.stop
+    if self.percent:
+      start, stop = [
+          None if p is None else _percent_to_index(p, num_examples)
+          for p in (start, stop)
+      ]
+    start, stop, _ = slice(start, stop).indices(num_examples)
+    return start, max(start, stop)
+
+
+def _percent_to_index(percent, num_examples):
+  # Negative percentages count from the end of the split, so "[:-10%]" and
+  # "[-10%:]" are complementary
+  if percent < 0:
+    percent += 100
+  return percent * num_examples // 100
+
+
+def _parse_boundary(boundary, spec):
+  """Returns the (value, is_percent) of a slice boundary."""
+  if not boundary:
+    return None, None
+  percent = boundary.endswith("%")
+  try:
+    value = int(boundary.rstrip("%"))
+  except ValueError:
+    raise ValueError("Invalid subsplit %s" % spec)
+  if percent and not -100 <= value <= 100:
+    raise ValueError("Percentages should be between -100 and 100: %s" % spec)
+  return value, percent
+
+
+def parse_subsplit(spec):
+  """Parses a subsplit specification.
+
+  Args:
+    spec (str): the name of a split (e.g. "train") optionally followed by a
+      slice of example indices (e.g. "train[5000:10000]") or of percentages of
+      the split (e.g. "train[:10%]"). As in python, the boundaries can be
+      omitted or negative.
+
+  Returns:
+    Subsplit
+
+  Raises:
+    ValueError: if the specification is invalid.
+  """
+  match = _SUBSPLIT_RE.match(spec)
+  if not match:
+    raise ValueError(
+        "Invalid subsplit %s. Should be like 'train', 'train[:10%%]' or "
+        "'train[5000:10000]'." % spec)
+  start, start_percent = _parse_boundary(match.group("start"), spec)
+  stop, stop_percent = _parse_boundary(match.group("stop"), spec)
+  if None not in (start_percent, stop_percent) and (
+      start_percent != stop_percent):
+    raise ValueError(
+        "Both boundaries of subsplit %s should be percentages or indices." %
+        spec)
+  return Subsplit(
+      split=match.group("split"),
+      start=start,
+      stop=stop,
+      percent=bool(start_percent or stop_percent))
+
+
+def shard_slices(shard_lengths, start, stop):
+  """Returns the parts of the shards covering the examples `start:stop`.
+
+  Args:
+    shard_lengths (list<int>): number of examples of each shard.
+    start (int): index of the first example.
+    stop (int): index after the last example.
+
+  Returns:
+    list<tuple>: (shard index, number of examples to skip, number of examples
+      to take) of each shard overlapping the examples.
+  """
+  slices = []
+  offset = 0
+  for i, length in enumerate(shard_lengths):
+    skip = max(start - offset, 0)
+    take = min(stop - offset, length) - skip
+    if take > 0:
+      slices.append((i, skip, take))
+    offset += length
+  return slices
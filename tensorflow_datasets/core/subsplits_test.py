@@ -0,0 +1,84 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.subsplits."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tensorflow as tf
+from tensorflow_datasets.core import subsplits
+
+
+class SubsplitsTest(tf.test.TestCase):
+
+  def test_parse_subsplit(self):
+    self.assertEqual(
+        subsplits.Subsplit("train", None, None, False),
+        subsplits.parse_subsplit("train"))
+    self.assertEqual(
+        subsplits.Subsplit("train", None, 10, True),
+        subsplits.parse_subsplit("train[:10%]"))
+    self.assertEqual(
+        subsplits.Subsplit("test", 5000, 10000, False),
+        subsplits.parse_subsplit("test[5000:10000]"))
+    self.assertEqual(
+        subsplits.Subsplit("train", -10, None, True),
+        subsplits.parse_subsplit("train[-10%:]"))
+    self.assertFalse(subsplits.parse_subsplit("train").is_slice)
+    self.assertTrue(subsplits.parse_subsplit("train[1:]").is_slice)
+
+    for spec in ["train[", "train[10]", "train[%:]", "train[10%:20]",
+                 "train[:200%]", "train/test"]:
+      with self.assertRaises(ValueError):
+        subsplits.parse_subsplit(spec)
+
+  def test_example_range(self):
+    def example_range(spec, num_examples):
+      return subsplits.parse_subsplit(spec).example_range(num_examples)
+
+    self.assertEqual((0, 10), example_range("train[:10%]", 100))
+    self.assertEqual((10, 100), example_range("train[10%:]", 100))
+    self.assertEqual((0, 33), example_range("train[:33%]", 101))
+    self.assertEqual((90, 100), example_range("train[-10%:]", 100))
+    self.assertEqual((0, 90), example_range("train[:-10%]", 100))
+    self.assertEqual((5000, 10000), example_range("train[5000:10000]", 60000))
+    self.assertEqual((5000, 6000), example_range("train[5000:10000]", 6000))
+    self.assertEqual((5000, 5000), example_range("train[5000:4000]", 6000))
+    self.assertEqual((5000, 6000), example_range("train[-1000:]", 6000))
+
+    # Complementary slices cover all the examples exactly once
+    for num_examples in [0, 1, 7, 101]:
+      _, middle = example_range("train[:37%]", num_examples)
+      start, stop = example_range("train[37%:]", num_examples)
+      self.assertEqual((middle, num_examples), (start, stop))
+
+  def test_shard_slices(self):
+    shard_lengths = [10, 10, 5, 10]
+    self.assertEqual(
+        [(0, 0, 10), (1, 0, 10), (2, 0, 5), (3, 0, 10)],
+        subsplits.shard_slices(shard_lengths, 0, 35))
+    self.assertEqual(
+        [(0, 5, 5), (1, 0, 10), (2, 0, 2)],
+        subsplits.shard_slices(shard_lengths, 5, 22))
+    self.assertEqual(
+        [(2, 1, 3)], subsplits.shard_slices(shard_lengths, 21, 24))
+    self.assertEqual([], subsplits.shard_slices(shard_lengths, 10, 10))
+    self.assertEqual([], subsplits.shard_slices([], 0, 0))
+
+
+if __name__ == "__main__":
+  tf.test.main()
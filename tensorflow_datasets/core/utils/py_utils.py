@@ -21,6 +21,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import contextlib
+import errno
 import functools
 import itertools
 
@@ -47,6 +49,51 @@ class memoized_property(object):  # pylint: disable=invalid-name
     return value
 
 
+@contextlib.contextmanager
+def file_lock(lock_path, blocking=True):
+  """Exclusive lock shared across threads and processes.
+
+  The lock is based on `flock`, so it is only reliable on local filesystems.
+  Non-local paths (ex: `gs://`) cannot be locked and the lock is a no-op, as on
+  the platforms without `fcntl` (ex: Windows).
+
+  Usage:
+    with file_lock('/tmp/my_lock.lock'):
+      ...
+
+  Args:
+    lock_path (str): Path of the lock file (created if it does not exist). The
+      parent directory should exist.
+    blocking (bool): If False, do not wait if the lock is already taken.
+
+  Yields:
+    locked (bool): Whether the lock has been acquired (always True if
+      `blocking`).
+  """
+  try:
+    import fcntl  # pylint: disable=g-import-not-at-top
+  except ImportError:  # Not available on Windows
+    fcntl = None
+  if '://' in lock_path or fcntl is None:
+    yield True
+    return
+  # Each open() creates a new file description, so the lock is also exclusive
+  # between threads of the same process.
+  with open(lock_path, 'a') as f:
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    try:
+      fcntl.flock(f.fileno(), flags)
+    except IOError as e:
+      if e.errno not in (errno.EAGAIN, errno.EACCES):
+        raise
+      yield False  # Lock already taken
+      return
+    try:
+      yield True
+    finally:
+      fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
 def zip_dict(*dicts):
   """Iterate over items of dictionaries grouped by their keys."""
   for key in set(itertools.chain(*dicts)):  # set merge all keys
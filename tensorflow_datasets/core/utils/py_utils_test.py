@@ -0,0 +1,56 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.core.utils.py_utils."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import sys
+
+import tensorflow as tf
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.core.utils import py_utils
+
+
+class PyUtilsTest(tf.test.TestCase):
+
+  def test_file_lock(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      lock_path = os.path.join(tmp_dir, 'test.lock')
+      with py_utils.file_lock(lock_path) as locked:
+        self.assertTrue(locked)
+        # The lock is exclusive, even within the same process
+        with py_utils.file_lock(lock_path, blocking=False) as locked_2:
+          self.assertFalse(locked_2)
+      # Lock released
+      with py_utils.file_lock(lock_path, blocking=False) as locked:
+        self.assertTrue(locked)
+
+  def test_file_lock_without_fcntl(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      lock_path = os.path.join(tmp_dir, 'test.lock')
+      # As on Windows, where fcntl cannot be imported
+      with tf.test.mock.patch.dict(sys.modules, {'fcntl': None}):
+        with py_utils.file_lock(lock_path) as locked:
+          self.assertTrue(locked)
+          with py_utils.file_lock(lock_path, blocking=False) as locked_2:
+            self.assertTrue(locked_2)
+
+
+if __name__ == '__main__':
+  tf.test.main()
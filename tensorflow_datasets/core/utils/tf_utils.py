@@ -20,6 +20,8 @@ from __future__ import division
 from __future__ import print_function
 
 import collections
+import os
+import threading
 
 import numpy as np
 import tensorflow as tf
@@ -32,6 +34,74 @@ GraphRun = collections.namedtuple(
 # Struct containing the run args, kwargs
 RunArgs = collections.namedtuple('RunArgs', 'fct, input')
 
+# Default maximum number of graphs (and sessions) cached by a TFGraphRunner
+DEFAULT_GRAPH_CACHE_SIZE = 32
+
+# Number of threads of the sessions opened by the utils (0 for the number of
+# cores), see `configure_sessions`
+_session_threads = {
+    'inter_op_parallelism_threads': 0,
+    'intra_op_parallelism_threads': 0,
+}
+
+
+def configure_sessions(inter_op_parallelism_threads=0,
+                       intra_op_parallelism_threads=0):
+  """Sets the number of threads of the sessions opened by the utils.
+
+  The sessions of the utils (`TFGraphRunner`, `ImagePNGEncoder`,
+  `iterate_over_dataset`,...) run their ops on process-wide thread pools
+  instead of allocating their own, so running them concurrently (e.g. from
+  several generator threads) does not oversubscribe the CPU.
+
+  Only the sessions opened afterwards are affected. The intra-op thread pool
+  is shared by all the sessions of the process, so is sized by the first
+  session opened.
+
+  Args:
+    inter_op_parallelism_threads (int): number of threads running independent
+      ops in parallel (0 for the number of cores).
+    intra_op_parallelism_threads (int): number of threads running each op
+      (0 for the number of cores).
+  """
+  _session_threads.update(
+      inter_op_parallelism_threads=inter_op_parallelism_threads,
+      intra_op_parallelism_threads=intra_op_parallelism_threads)
+
+
+def session_config(**kwargs):
+  """Returns the `tf.ConfigProto` of the sessions sharing the thread pools.
+
+  Args:
+    **kwargs: other options of the `tf.ConfigProto`.
+
+  Returns:
+    The `tf.ConfigProto`.
+  """
+  config = tf.ConfigProto(
+      intra_op_parallelism_threads=(
+          _session_threads['intra_op_parallelism_threads']),
+      **kwargs)
+  # The sessions using a pool with the same global name share it
+  num_threads = _session_threads['inter_op_parallelism_threads']
+  config.session_inter_op_thread_pool.add(
+      num_threads=num_threads,
+      global_name='tfds_inter_op_{}'.format(num_threads))
+  return config
+
+
+def new_session(graph=None, **kwargs):
+  """Returns a `tf.Session` sharing the process-wide thread pools.
+
+  Args:
+    graph (tf.Graph): graph of the session (the default graph if None).
+    **kwargs: other options of the `tf.ConfigProto` of the session.
+
+  Returns:
+    The `tf.Session`.
+  """
+  return tf.Session(graph=graph, config=session_config(**kwargs))
+
 
 class TFGraphRunner(object):
   """Run in session mode or Eager mode.
@@ -47,24 +117,58 @@ class TFGraphRunner(object):
 
   Ideally, one graph runner should only be used with a single function to avoid
   having too many opened session in session mode.
+  The cached graphs are bounded: once `max_cache_size` graphs are cached, the
+  least recently used one is evicted and its session closed.
+
+  The sessions share the process-wide thread pools (see `configure_sessions`),
+  and `run` can be called concurrently from several threads.
+
   Limitations:
    * Currently the graph runner only support function with single input
      and output. Support for more complex function could be added and should be
      relativelly straighforward.
-   * A different graph is created for each input shape, so isn't really addapted
-     for dynamic batch size.
+   * By default, a different graph is created for each input shape. With
+     `dynamic_shapes=True`, the placeholder has unknown dimensions, so the
+     inputs of different shapes (but same rank) share one graph. The function
+     should then not depend on the static shape of its input.
 
   Usage:
     graph_runner = TFGraphRunner()
     output = graph_runner.run(tf.sigmoid, np.ones(shape=(5,)))
 
+  Attributes:
+    num_cache_hits (int): number of graph mode runs using a cached graph.
+    num_cache_misses (int): number of graph mode runs building a new graph.
   """
 
-  def __init__(self):
-    """Constructor."""
-    # Cache containing all compiled graph and opened session. Only used in
-    # non-eager mode.
-    self._graph_run_cache = {}
+  def __init__(self, max_cache_size=DEFAULT_GRAPH_CACHE_SIZE,
+               dynamic_shapes=False):
+    """Constructor.
+
+    Args:
+      max_cache_size (int): maximum number of graphs (each with its session)
+        cached at once.
+      dynamic_shapes (bool): whether the inputs of all shapes (of the same
+        rank) share the same graph.
+
+    Raises:
+      ValueError: if `max_cache_size` is not positive.
+    """
+    if max_cache_size < 1:
+      raise ValueError(
+          'max_cache_size should be positive: {}'.format(max_cache_size))
+    self._max_cache_size = max_cache_size
+    self._dynamic_shapes = dynamic_shapes
+    # Cache containing the compiled graphs and opened sessions, from the least
+    # to the most recently used. Only used in non-eager mode.
+    self._graph_run_cache = collections.OrderedDict()
+    self.num_cache_hits = 0
+    self.num_cache_misses = 0
+    # Protects the cache. The sessions are run outside of the lock, and the
+    # evicted sessions still running are only closed once their runs return.
+    self._lock = threading.Lock()
+    self._num_runs = collections.Counter()
+    self._evicted_sessions = set()
 
   def run(self, fct, input_):
     """Execute the given TensorFlow function."""
@@ -78,17 +182,40 @@ class TFGraphRunner(object):
         input_ = np.array(input_)
       run_args = RunArgs(fct=fct, input=input_)
       signature = self._build_signature(run_args)
-      if signature not in self._graph_run_cache:
-        graph_run = self._build_graph_run(run_args)
+      with self._lock:
+        graph_run = self._graph_run_cache.pop(signature, None)
+        if graph_run is None:
+          self.num_cache_misses += 1
+          graph_run = self._build_graph_run(run_args)
+          if len(self._graph_run_cache) >= self._max_cache_size:
+            _, evicted_graph_run = self._graph_run_cache.popitem(last=False)
+            self._close_session(evicted_graph_run.session)
+        else:
+          self.num_cache_hits += 1
+        # (Re-)inserted as the most recently used
         self._graph_run_cache[signature] = graph_run
-      else:
-        graph_run = self._graph_run_cache[signature]
+        self._num_runs[graph_run.session] += 1
 
       # Then execute the cached graph
-      return graph_run.session.run(
-          graph_run.output,
-          feed_dict={graph_run.placeholder: input_},
-      )
+      try:
+        return graph_run.session.run(
+            graph_run.output,
+            feed_dict={graph_run.placeholder: input_},
+        )
+      finally:
+        with self._lock:
+          self._num_runs[graph_run.session] -= 1
+          if graph_run.session in self._evicted_sessions:
+            self._close_session(graph_run.session)
+
+  def _close_session(self, session):
+    """Closes the session, or once its runs return if it is running."""
+    if self._num_runs[session]:
+      self._evicted_sessions.add(session)
+      return
+    del self._num_runs[session]
+    self._evicted_sessions.discard(session)
+    session.close()
 
   def _build_graph_run(self, run_args):
     """Create a new graph for the given args."""
@@ -99,10 +226,14 @@ class TFGraphRunner(object):
     with tf.Graph().as_default() as g:
       # Create placeholder
       input_ = run_args.input
-      placeholder = tf.placeholder(dtype=input_.dtype, shape=input_.shape)
+      if self._dynamic_shapes:
+        shape = [None] * input_.ndim
+      else:
+        shape = input_.shape
+      placeholder = tf.placeholder(dtype=input_.dtype, shape=shape)
       output = run_args.fct(placeholder)
       return GraphRun(
-          session=tf.Session(),
+          session=new_session(),
           graph=g,
           placeholder=placeholder,
           output=output,
@@ -110,12 +241,18 @@ class TFGraphRunner(object):
 
   def _build_signature(self, run_args):
     """Create a unique signature for each fct/inputs."""
-    return (id(run_args.fct), run_args.input.dtype, run_args.input.shape)
+    if self._dynamic_shapes:
+      shape = run_args.input.ndim
+    else:
+      shape = run_args.input.shape
+    return (id(run_args.fct), run_args.input.dtype, shape)
 
   def __del__(self):
-    # Close all sessions
+    # Close all sessions, including the evicted ones not closed yet
     for graph_run in self._graph_run_cache.values():
       graph_run.session.close()
+    for session in self._evicted_sessions:
+      session.close()
 
 
 def is_dytpe(value):
@@ -145,3 +282,14 @@ def assert_shape_match(shape1, shape2):
       for s1, s2 in zip(shape1, shape2)
       if s2 is not None):
     raise ValueError('Shape {} do not match {}'.format(shape1, shape2))
+
+
+def get_path_size(path):
+  """Returns the total size in bytes of the file or directory."""
+  if not tf.gfile.IsDirectory(path):
+    return tf.gfile.Stat(path).length
+  total_size = 0
+  for dirpath, _, filenames in tf.gfile.Walk(path):
+    for filename in filenames:
+      total_size += tf.gfile.Stat(os.path.join(dirpath, filename)).length
+  return total_size
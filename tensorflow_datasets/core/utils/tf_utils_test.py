@@ -19,6 +19,9 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import concurrent.futures
+
+import numpy as np
 import tensorflow as tf
 from tensorflow_datasets.core.utils import tf_utils
 
@@ -52,6 +55,85 @@ class TfUtilsTest(tf.test.TestCase):
     else:
       self.assertEqual(len(graph_runner._graph_run_cache), 0)
 
+  def test_graph_runner_cache_size(self):
+    with tf.Graph().as_default():
+      graph_runner = tf_utils.TFGraphRunner(max_cache_size=2)
+      graph_runner.run(tf.nn.relu, [1, -1])
+      first_session = list(graph_runner._graph_run_cache.values())[0].session
+      graph_runner.run(tf.nn.relu, [1, -1, 1])
+      graph_runner.run(tf.nn.relu, [-1, 1])  # Hit, now most recently used
+      self.assertEqual(1, graph_runner.num_cache_hits)
+
+      # The least recently used graph ([1, -1, 1]) is evicted
+      output = graph_runner.run(tf.nn.relu, [1, -1, 1, -1])
+      self.assertAllEqual(output, [1, 0, 1, 0])
+      self.assertEqual(2, len(graph_runner._graph_run_cache))
+      self.assertEqual(3, graph_runner.num_cache_misses)
+      self.assertEqual(
+          [(2,), (4,)],
+          [signature[2] for signature in graph_runner._graph_run_cache])
+      self.assertIs(
+          first_session,
+          list(graph_runner._graph_run_cache.values())[0].session)
+
+  def test_graph_runner_dynamic_shapes(self):
+    with tf.Graph().as_default():
+      graph_runner = tf_utils.TFGraphRunner(dynamic_shapes=True)
+      for shape in [(2, 3), (4, 1), (1, 5)]:
+        output = graph_runner.run(tf.nn.relu, -np.ones(shape, dtype=np.int32))
+        self.assertAllEqual(output, np.zeros(shape, dtype=np.int32))
+      # The inputs of the same rank share a graph
+      self.assertEqual(1, len(graph_runner._graph_run_cache))
+      self.assertEqual(1, graph_runner.num_cache_misses)
+      self.assertEqual(2, graph_runner.num_cache_hits)
+
+  def test_graph_runner_threads(self):
+    with tf.Graph().as_default():
+      graph_runner = tf_utils.TFGraphRunner(max_cache_size=2)
+      inputs = [-np.ones(i % 5 + 1, dtype=np.int32) for i in range(50)]
+      with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        outputs = list(executor.map(
+            lambda input_: graph_runner.run(tf.nn.relu, input_), inputs))
+      for input_, output in zip(inputs, outputs):
+        self.assertAllEqual(np.zeros_like(input_), output)
+      self.assertEqual(50, graph_runner.num_cache_hits +
+                       graph_runner.num_cache_misses)
+      self.assertEqual(2, len(graph_runner._graph_run_cache))
+      # The evicted sessions are closed once their runs returned
+      self.assertFalse(graph_runner._evicted_sessions)
+
+  def test_graph_runner_del(self):
+    graph_runner = tf_utils.TFGraphRunner()
+    sessions = [tf.test.mock.Mock(), tf.test.mock.Mock()]
+    graph_runner._graph_run_cache['cached'] = tf_utils.GraphRun(
+        session=sessions[0], graph=None, placeholder=None, output=None)
+    # Evicted while running, and not closed yet
+    graph_runner._evicted_sessions.add(sessions[1])
+    del graph_runner
+    for session in sessions:
+      session.close.assert_called_once_with()
+
+  def test_session_config(self):
+    tf_utils.configure_sessions(inter_op_parallelism_threads=2,
+                                intra_op_parallelism_threads=4)
+    try:
+      config = tf_utils.session_config(device_count={'GPU': 0})
+      other_config = tf_utils.session_config()
+    finally:
+      tf_utils.configure_sessions()
+    default_config = tf_utils.session_config()
+    self.assertEqual(4, config.intra_op_parallelism_threads)
+    self.assertEqual(0, config.device_count['GPU'])
+    pool, = config.session_inter_op_thread_pool
+    self.assertEqual(2, pool.num_threads)
+    # The sessions with the same number of threads share the pool
+    self.assertEqual(
+        pool.global_name,
+        other_config.session_inter_op_thread_pool[0].global_name)
+    self.assertNotEqual(
+        pool.global_name,
+        default_config.session_inter_op_thread_pool[0].global_name)
+
 
 if __name__ == '__main__':
   tf.test.main()
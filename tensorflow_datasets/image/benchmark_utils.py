@@ -0,0 +1,60 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Utilities shared by the benchmarks of the image datasets."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import resource
+import sys
+
+MNIST_SHAPE = (28, 28, 1)
+CIFAR_SHAPE = (32, 32, 3)
+
+
+def cpu_time():
+  """Returns the user + system CPU time of the process (all threads)."""
+  times = os.times()
+  return times[0] + times[1]
+
+
+def reset_peak_rss():
+  """Resets the peak resident set size of the process (Linux only).
+
+  On other platforms, `peak_rss` keeps returning the peak since the start of
+  the process.
+  """
+  try:
+    with open("/proc/self/clear_refs", "w") as f:
+      f.write("5")
+  except (IOError, OSError):
+    pass
+
+
+def peak_rss():
+  """Returns the peak resident set size of the process, in bytes."""
+  try:
+    with open("/proc/self/status") as f:
+      for line in f:
+        if line.startswith("VmHWM:"):
+          return int(line.split()[1]) * 1024  # kB
+  except (IOError, OSError):
+    pass
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Bytes on macOS, kilobytes on Linux
+  return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -22,7 +22,6 @@ from __future__ import print_function
 import collections
 import functools
 import os
-import random
 
 import numpy as np
 import six
@@ -51,7 +50,6 @@ _CIFAR100_TEST_FILES = ["test"]
 _CIFAR_IMAGE_SIZE = 32
 
 
-# TODO(rsepassi): Add tests
 class Cifar10(dataset_builder.GeneratorBasedDatasetBuilder):
   """CIFAR-10."""
 
@@ -105,9 +103,10 @@ class Cifar10(dataset_builder.GeneratorBasedDatasetBuilder):
     return file_format_adapter.TFRecordExampleAdapter(example_spec)
 
   def _preprocess(self, record):
-    record["input"] = image_utils.decode_png(
-        record.pop("input/encoded"),
-        [_CIFAR_IMAGE_SIZE, _CIFAR_IMAGE_SIZE, 3])
+    if "input/encoded" in record:  # Not read if as_dataset(features=...)
+      record["input"] = image_utils.decode_png(
+          record.pop("input/encoded"),
+          [_CIFAR_IMAGE_SIZE, _CIFAR_IMAGE_SIZE, 3])
     return record
 
   def _generate_cifar_examples(self, filepaths):
@@ -137,8 +136,8 @@ class Cifar10(dataset_builder.GeneratorBasedDatasetBuilder):
     if use_extra_labels:
       assert len(label_keys) == 2
 
-    images, labels = [], []
-    extra_labels = []
+    batches_images = []
+    labels, extra_labels = [], []
     for path in filepaths:
       with tf.gfile.Open(path, "rb") as f:
         if six.PY2:
@@ -147,35 +146,33 @@ class Cifar10(dataset_builder.GeneratorBasedDatasetBuilder):
           data = cPickle.load(f, encoding="latin1")
       batch_images = data["data"]
       num_images = batch_images.shape[0]
+      # Get images into [height, width, channels] format. The transpose is
+      # applied once per batch and only creates a view (no copy).
       batch_images = batch_images.reshape(
           (num_images, 3, _CIFAR_IMAGE_SIZE, _CIFAR_IMAGE_SIZE))
-      # Get images into [height, width, channels] format
-      images.extend([
-          np.squeeze(batch_images[j]).transpose((1, 2, 0))
-          for j in range(num_images)
-      ])
-      batch_labels = data[label_keys[0]]
-      labels.extend([batch_labels[j] for j in range(num_images)])
+      batches_images.append(batch_images.transpose((0, 2, 3, 1)))
+      labels.append(np.asarray(data[label_keys[0]], dtype=np.int64))
       if use_extra_labels:
-        batch_extra_labels = data[label_keys[1]]
-        extra_labels.extend([batch_extra_labels[j] for j in range(num_images)])
-
-    # Shuffle the data to make sure classes are well distributed.
-    data = [images, labels]
-    if use_extra_labels:
-      data.append(extra_labels)
-    data = list(zip(*data))
-    random.shuffle(data)
+        extra_labels.append(np.asarray(data[label_keys[1]], dtype=np.int64))
+    labels = np.concatenate(labels)
     if use_extra_labels:
-      images, labels, extra_labels = list(zip(*data))
-    else:
-      images, labels = list(zip(*data))
-      extra_labels = None
-
+      extra_labels = np.concatenate(extra_labels)
+
+    # Shuffle the data to make sure classes are well distributed. Only the
+    # indices are shuffled, then mapped to (batch, index in batch) to read the
+    # images from the batches without copying them.
+    permutation = np.random.permutation(len(labels))
+    batch_offsets = np.cumsum([0] + [len(b) for b in batches_images])
+    batch_ids = np.searchsorted(batch_offsets, permutation, side="right") - 1
+    image_ids = permutation - batch_offsets[batch_ids]
+
+    images_and_labels = (
+        (batches_images[b][j], labels[i])
+        for i, b, j in zip(permutation, batch_ids, image_ids))
     example_gen = image_utils.image_classification_generator(
-        zip(images, labels))
-    for i, feature_dict in enumerate(example_gen):
-      if extra_labels:
+        images_and_labels)
+    for i, feature_dict in zip(permutation, example_gen):
+      if use_extra_labels:
         feature_dict[cifar_info.out_label_keys[0]] = feature_dict.pop(
             "target")
         feature_dict[cifar_info.out_label_keys[1]] = extra_labels[i]
@@ -223,7 +220,8 @@ class Cifar100(Cifar10):
   def _preprocess(self, record):
     record = super(Cifar100, self)._preprocess(record)
     target_key = "coarse_label" if self._use_coarse_labels else "fine_label"
-    record["target"] = record[target_key]
+    if target_key in record:
+      record["target"] = record[target_key]
     return record
 
 
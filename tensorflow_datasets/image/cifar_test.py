@@ -0,0 +1,101 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.image.cifar."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+from six.moves import cPickle
+import tensorflow as tf
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.image import cifar
+from tensorflow_datasets.image import image_utils
+
+# Number of images of each fake batch file
+_BATCH_SIZES = [3, 5]
+
+
+def _write_cifar_batches(dirname, label_keys):
+  """Writes fake batch files, whose labels are the index of their image."""
+  num_images = sum(_BATCH_SIZES)
+  images = np.random.randint(
+      256, size=(num_images, 32, 32, 3), dtype=np.uint8)
+  filepaths = []
+  offset = 0
+  for i, batch_size in enumerate(_BATCH_SIZES):
+    indices = np.arange(offset, offset + batch_size)
+    offset += batch_size
+    # Stored channels first, as in the original batches
+    data = {"data": images[indices].transpose((0, 3, 1, 2)).reshape(
+        (batch_size, -1))}
+    for j, key in enumerate(label_keys):
+      data[key] = (indices * (j + 1)).tolist()
+    filepath = os.path.join(dirname, "batch_%d" % i)
+    with tf.gfile.Open(filepath, "wb") as f:
+      cPickle.dump(data, f, protocol=2)
+    filepaths.append(filepath)
+  return images, filepaths
+
+
+def _encode_raw(unused_encoder, image):
+  """Replaces the PNG encoding, to compare the images without decoding them."""
+  return image.tobytes()
+
+
+class CifarTest(tf.test.TestCase):
+
+  def _generate_examples(self, builder, filepaths):
+    with tf.test.mock.patch.object(image_utils.ImagePNGEncoder, "encode",
+                                   _encode_raw):
+      return list(builder._generate_cifar_examples(filepaths=filepaths))
+
+  def test_generate_cifar10_examples(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = cifar.Cifar10(data_dir=tmp_dir)
+      images, filepaths = _write_cifar_batches(tmp_dir, ["labels"])
+      examples = self._generate_examples(builder, filepaths)
+
+      # The permutation covers each example exactly once
+      labels = [example["target"] for example in examples]
+      self.assertEqual(list(range(len(images))), sorted(labels))
+      # The images still match their labels
+      for example in examples:
+        self.assertEqual(images[example["target"]].tobytes(),
+                         example["input/encoded"])
+        self.assertEqual([32, 32, 3], example["input/shape"])
+
+  def test_generate_cifar100_examples(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      builder = cifar.Cifar100(data_dir=tmp_dir)
+      images, filepaths = _write_cifar_batches(
+          tmp_dir, ["fine_labels", "coarse_labels"])
+      examples = self._generate_examples(builder, filepaths)
+
+      fine_labels = [example["fine_label"] for example in examples]
+      self.assertEqual(list(range(len(images))), sorted(fine_labels))
+      for example in examples:
+        self.assertNotIn("target", example)
+        self.assertEqual(2 * example["fine_label"], example["coarse_label"])
+        self.assertEqual(images[example["fine_label"]].tobytes(),
+                         example["input/encoded"])
+
+
+if __name__ == "__main__":
+  tf.test.main()
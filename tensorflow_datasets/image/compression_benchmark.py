@@ -0,0 +1,141 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the TFRecord compression on MNIST and CIFAR shaped datasets.
+
+Writes synthetic examples with the same features as the MNIST and CIFAR
+builders (PNG encoded images and labels) with each compression type, then reads
+and decodes them as `as_dataset` does. Reports the size on disk, the read
+throughput and the CPU time spent per example. The images are random noise, so
+the size reduction is a lower bound of what real images give.
+
+Run with:
+
+```
+python -m tensorflow_datasets.image.compression_benchmark --benchmarks=.
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_datasets.core import dataset_utils
+from tensorflow_datasets.core import file_format_adapter
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.image import benchmark_utils
+from tensorflow_datasets.image import image_utils
+
+_NUM_EXAMPLES = 10000
+_NUM_SHARDS = 4
+_BATCH_SIZE = 128
+
+_EXAMPLE_SPEC = {
+    "input/encoded": tf.FixedLenFeature(tuple(), tf.string),
+    "target": tf.FixedLenFeature(tuple(), tf.int64),
+}
+
+
+def _generate_examples(image_shape):
+  """Returns synthetic image classification examples."""
+  images = np.random.randint(
+      256, size=(_NUM_EXAMPLES,) + image_shape, dtype=np.uint8)
+  labels = np.random.randint(10, size=_NUM_EXAMPLES)
+  with tf.Graph().as_default():
+    return list(image_utils.image_classification_generator(
+        zip(images, labels)))
+
+
+class CompressionBenchmark(tf.test.Benchmark):
+  """Read throughput of compressed vs uncompressed TFRecords."""
+
+  def _benchmark(self, name, image_shape, compression_type):
+    examples = _generate_examples(image_shape)
+    adapter = file_format_adapter.TFRecordExampleAdapter(
+        _EXAMPLE_SPEC, compression_type=compression_type)
+
+    with test_utils.tmp_dir() as tmp_dir:
+      filepaths = [
+          os.path.join(tmp_dir, "%s.tfrecord-%05d-of-%05d" % (
+              name, i, _NUM_SHARDS))
+          for i in range(_NUM_SHARDS)
+      ]
+      adapter.write_from_generator(lambda: iter(examples), filepaths)
+      num_bytes = sum(tf.gfile.Stat(f).length for f in filepaths)
+
+      def decode(record):
+        record["input"] = image_utils.decode_png(
+            record.pop("input/encoded"), list(image_shape))
+        return record
+
+      with tf.Graph().as_default():
+        dataset = dataset_utils.build_dataset(
+            filepattern=os.path.join(tmp_dir, "*"),
+            dataset_from_file_fn=adapter.dataset_from_filename,
+            process_fn=decode)
+        dataset = dataset.batch(_BATCH_SIZE)
+        next_batch = dataset.make_one_shot_iterator().get_next()
+        with tf.Session() as sess:
+          num_examples = 0
+          start_time = time.time()
+          start_cpu_time = benchmark_utils.cpu_time()
+          while True:
+            try:
+              batch = sess.run(next_batch)
+            except tf.errors.OutOfRangeError:
+              break
+            num_examples += len(batch["target"])
+          wall_time = time.time() - start_time
+          cpu_time = benchmark_utils.cpu_time() - start_cpu_time
+
+    self.report_benchmark(
+        name="%s_%s" % (name, (compression_type or "none").lower()),
+        iters=num_examples,
+        wall_time=wall_time,
+        extras={
+            "bytes_on_disk": num_bytes,
+            "examples_per_sec": num_examples / wall_time,
+            "bytes_per_sec": num_bytes / wall_time,
+            "cpu_time_per_example": cpu_time / num_examples,
+            "cpu_utilization": cpu_time / wall_time,
+        })
+
+  def benchmark_mnist_uncompressed(self):
+    self._benchmark("mnist", (28, 28, 1), None)
+
+  def benchmark_mnist_gzip(self):
+    self._benchmark("mnist", (28, 28, 1), "GZIP")
+
+  def benchmark_mnist_zlib(self):
+    self._benchmark("mnist", (28, 28, 1), "ZLIB")
+
+  def benchmark_cifar_uncompressed(self):
+    self._benchmark("cifar", (32, 32, 3), None)
+
+  def benchmark_cifar_gzip(self):
+    self._benchmark("cifar", (32, 32, 3), "GZIP")
+
+  def benchmark_cifar_zlib(self):
+    self._benchmark("cifar", (32, 32, 3), "ZLIB")
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,256 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the generation of the MNIST and CIFAR datasets, by phase.
+
+Writes synthetic MNIST (gzipped idx files) and CIFAR-10 (tar.gz of pickled
+batches) sources locally, then runs the phases of `download_and_prepare` of
+their TRAIN split one after the other, with the code of the builders:
+
+  * `extraction`: `DownloadManager.extract` of the sources.
+  * `example_generation`: reading of the images and labels from the extracted
+    files (the generator of the builder, without the PNG encoding).
+  * `png_encoding`: `ImagePNGEncoder.encode` calls made by the generator.
+  * `serialization`: encoding of the feature dicts into `tf.train.Example`.
+  * `shard_writing`: round-robin writing of the records to the TFRecord shards.
+
+For each phase, reports its wall time, share of the total time, records/sec and
+CPU utilization (CPU time of the process divided by the wall time, so above 1
+for multi-threaded phases).
+
+Run with:
+
+```
+python -m tensorflow_datasets.image.generation_benchmark --benchmarks=.
+```
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import collections
+import contextlib
+import functools
+import gzip
+import os
+import tarfile
+import time
+
+import numpy as np
+from six.moves import cPickle
+import tensorflow as tf
+
+from tensorflow_datasets.core import download
+from tensorflow_datasets.core import file_format_adapter
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.image import benchmark_utils
+from tensorflow_datasets.image import cifar
+from tensorflow_datasets.image import image_utils
+from tensorflow_datasets.image import mnist
+
+_NUM_EXAMPLES = 10000
+_NUM_SHARDS = 10
+_NUM_CIFAR_BATCHES = 5
+
+_PHASES = [
+    "extraction",
+    "example_generation",
+    "png_encoding",
+    "serialization",
+    "shard_writing",
+]
+
+
+class _PhaseTimer(object):
+  """Accumulates the wall and CPU time spent in a phase."""
+
+  def __init__(self):
+    self.wall_time = 0.
+    self.cpu_time = 0.
+
+  @contextlib.contextmanager
+  def time(self):
+    start_time = time.time()
+    start_cpu_time = benchmark_utils.cpu_time()
+    try:
+      yield
+    finally:
+      self.wall_time += time.time() - start_time
+      self.cpu_time += benchmark_utils.cpu_time() - start_cpu_time
+
+
+@contextlib.contextmanager
+def _time_method(cls, method_name, timer):
+  """Accumulates the time spent in the method of the class in the timer."""
+  method = getattr(cls, method_name)
+
+  @functools.wraps(method)
+  def timed_method(*args, **kwargs):
+    with timer.time():
+      return method(*args, **kwargs)
+
+  setattr(cls, method_name, timed_method)
+  try:
+    yield
+  finally:
+    setattr(cls, method_name, method)
+
+
+def _random_images(image_shape):
+  images = np.random.randint(
+      256, size=(_NUM_EXAMPLES,) + image_shape, dtype=np.uint8)
+  labels = np.random.randint(10, size=_NUM_EXAMPLES).astype(np.uint8)
+  return images, labels
+
+
+def _write_mnist_sources(dirname):
+  """Writes the gzipped idx files of the MNIST train split."""
+  images, labels = _random_images(benchmark_utils.MNIST_SHAPE)
+  data_path = os.path.join(dirname, mnist._MNIST_TRAIN_DATA_FILENAME)  # pylint: disable=protected-access
+  label_path = os.path.join(dirname, mnist._MNIST_TRAIN_LABELS_FILENAME)  # pylint: disable=protected-access
+  with gzip.open(data_path, "wb") as f:
+    f.write(b"\0" * 16 + images.tobytes())  # header
+  with gzip.open(label_path, "wb") as f:
+    f.write(b"\0" * 8 + labels.tobytes())  # header
+  return {"data": data_path, "labels": label_path}
+
+
+def _generate_mnist(extracted_paths):
+  return mnist._generate_mnist_examples(  # pylint: disable=protected-access
+      nb_examples=_NUM_EXAMPLES,
+      data_path=extracted_paths["data"],
+      label_path=extracted_paths["labels"])
+
+
+def _write_cifar_sources(dirname):
+  """Writes the tar.gz of pickled batches of the CIFAR-10 train split."""
+  images, labels = _random_images(benchmark_utils.CIFAR_SHAPE)
+  # Stored channels first, as in the original batches
+  images = images.transpose((0, 3, 1, 2)).reshape((_NUM_EXAMPLES, -1))
+  archive_path = os.path.join(dirname, "cifar-10-python.tar.gz")
+  with tarfile.open(archive_path, "w:gz") as archive:
+    for i, batch_indices in enumerate(
+        np.array_split(np.arange(_NUM_EXAMPLES), _NUM_CIFAR_BATCHES)):
+      batch_path = os.path.join(dirname, "data_batch_%d" % (i + 1))
+      with tf.gfile.Open(batch_path, "wb") as f:
+        cPickle.dump({
+            "data": images[batch_indices],
+            "labels": labels[batch_indices].tolist(),
+        }, f, protocol=2)
+      archive.add(batch_path, arcname=os.path.join(
+          cifar._CIFAR10_PREFIX, os.path.basename(batch_path)))  # pylint: disable=protected-access
+      tf.gfile.Remove(batch_path)
+  return {"archive": archive_path}
+
+
+def _generate_cifar(builder, extracted_paths):
+  filepaths = [
+      os.path.join(extracted_paths["archive"], cifar._CIFAR10_PREFIX, f)  # pylint: disable=protected-access
+      for f in cifar._CIFAR10_TRAIN_FILES  # pylint: disable=protected-access
+  ]
+  return builder._generate_cifar_examples(filepaths=filepaths)  # pylint: disable=protected-access
+
+
+class GenerationBenchmark(tf.test.Benchmark):
+  """Time spent in each phase of the generation of the datasets."""
+
+  def _benchmark(self, name, builder, write_sources_fn, generator_fn):
+    """Runs and reports the phases of the generation.
+
+    Args:
+      name (str): name of the benchmark.
+      builder (DatasetBuilder): builder of the dataset, providing the file
+        format adapter.
+      write_sources_fn (function): writes the archives to the given directory
+        and returns a dict of their paths.
+      generator_fn (function): takes the dict of the extracted paths and yields
+        the feature dicts.
+    """
+    timers = collections.OrderedDict(
+        (phase, _PhaseTimer()) for phase in _PHASES)
+    generation_timer = _PhaseTimer()
+
+    with test_utils.tmp_dir() as tmp_dir:
+      dl_manager = download.DownloadManager(
+          cache_dir=os.path.join(tmp_dir, "cache"))
+      # The archives must be in the cache of the download manager
+      sources_dir = os.path.join(tmp_dir, "cache", "sources")
+      tf.gfile.MakeDirs(sources_dir)
+      archive_paths = write_sources_fn(sources_dir)
+
+      with timers["extraction"].time():
+        extracted_paths = dl_manager.extract(archive_paths)
+
+      with _time_method(image_utils.ImagePNGEncoder, "encode",
+                        timers["png_encoding"]):
+        with generation_timer.time():
+          examples = list(generator_fn(extracted_paths))
+      timers["example_generation"].wall_time = (
+          generation_timer.wall_time - timers["png_encoding"].wall_time)
+      timers["example_generation"].cpu_time = (
+          generation_timer.cpu_time - timers["png_encoding"].cpu_time)
+
+      adapter = builder._file_format_adapter  # pylint: disable=protected-access
+      encoder = file_format_adapter._TFExampleEncoder(  # pylint: disable=protected-access
+          adapter._example_reading_spec)  # pylint: disable=protected-access
+      with timers["serialization"].time():
+        records = encoder.encode_batch(examples)
+
+      filepaths = [
+          os.path.join(tmp_dir, "%s-train.tfrecord-%05d-of-%05d" % (
+              name, i, _NUM_SHARDS))
+          for i in range(_NUM_SHARDS)
+      ]
+      with timers["shard_writing"].time():
+        file_format_adapter._write_tfrecords_from_generator(  # pylint: disable=protected-access
+            iter(records), filepaths)
+
+    num_records = len(records)
+    total_wall_time = sum(timer.wall_time for timer in timers.values())
+    extras = {"records_per_sec": num_records / total_wall_time}
+    for phase, timer in timers.items():
+      extras.update({
+          phase + "_wall_time": timer.wall_time,
+          phase + "_time_share": timer.wall_time / total_wall_time,
+          phase + "_records_per_sec": num_records / timer.wall_time,
+          phase + "_cpu_utilization": timer.cpu_time / timer.wall_time,
+      })
+    self.report_benchmark(
+        name=name,
+        iters=num_records,
+        wall_time=total_wall_time,
+        extras=extras)
+
+  def benchmark_mnist(self):
+    with test_utils.tmp_dir() as data_dir:
+      self._benchmark(
+          "mnist",
+          mnist.MNIST(data_dir=data_dir),
+          _write_mnist_sources,
+          _generate_mnist)
+
+  def benchmark_cifar(self):
+    with test_utils.tmp_dir() as data_dir:
+      builder = cifar.Cifar10(data_dir=data_dir)
+      self._benchmark(
+          "cifar",
+          builder,
+          _write_cifar_sources,
+          functools.partial(_generate_cifar, builder))
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -19,8 +19,12 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import threading
+
 import tensorflow as tf
 
+from tensorflow_datasets.core.utils import tf_utils
+
 
 def encode_image_as_png_dict(image, key_prefix="image", encoder=None):
   """Encode image as png and include format and shape in returned dict."""
@@ -44,11 +48,23 @@ def image_classification_generator(images_and_labels):
 
 
 class ImagePNGEncoder(object):
-  """Encodes Tensor images to PNG in graph mode and Eager mode."""
+  """Encodes Tensor images to PNG in graph mode and Eager mode.
+
+  In graph mode, the images are fed to a placeholder of shape
+  `[None, None, channels]`, so the images of all sizes are encoded by the same
+  graph and session (one encoding op per number of channels). The encoder can
+  be shared by several threads.
+
+  The session shares the process-wide thread pools of the sessions of the utils
+  (see `tf_utils.configure_sessions`).
+  """
 
   def __init__(self):
-    self._graph_initialized = False
+    self._lock = threading.Lock()
+    self._graph = None
     self._session = None
+    # Number of channels to the (placeholder, encoded tensor) encoding them
+    self._encoding_ops = {}
 
   def encode(self, image):
     """Encode image to PNG.
@@ -65,21 +81,26 @@ class ImagePNGEncoder(object):
       return self._graph_encode(image)
 
   def _graph_encode(self, image):
-    if not self._graph_initialized:
-      self._init_graph_mode_encoder(image)
-    return self._session.run(
-        self._encoded_t, feed_dict={self._image_placeholder: image})
-
-  def _init_graph_mode_encoder(self, image):
-    assert not self._graph_initialized
-    self._graph_initialized = True
-
-    self._graph = tf.Graph()
-    with self._graph.as_default():
-      self._image_placeholder = tf.placeholder(
-          dtype=tf.uint8, shape=image.shape)
-      self._encoded_t = tf.image.encode_png(self._image_placeholder)
-      self._session = tf.Session()
+    image_placeholder, encoded_t = self._get_encoding_ops(image.shape[-1])
+    return self._session.run(encoded_t, feed_dict={image_placeholder: image})
+
+  def _get_encoding_ops(self, num_channels):
+    """Returns the placeholder and encoded tensor for the number of channels."""
+    encoding_ops = self._encoding_ops.get(num_channels)
+    if encoding_ops is not None:
+      return encoding_ops
+    # The graph is only modified by one thread at a time
+    with self._lock:
+      if num_channels not in self._encoding_ops:
+        if self._graph is None:
+          self._graph = tf.Graph()
+          self._session = tf_utils.new_session(graph=self._graph)
+        with self._graph.as_default():
+          image_placeholder = tf.placeholder(
+              dtype=tf.uint8, shape=[None, None, num_channels])
+          encoded_t = tf.image.encode_png(image_placeholder)
+        self._encoding_ops[num_channels] = (image_placeholder, encoded_t)
+      return self._encoding_ops[num_channels]
 
   def __del__(self):
     if self._session is not None:
@@ -19,6 +19,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import concurrent.futures
+
 import numpy as np
 import tensorflow as tf
 from tensorflow_datasets.image import image_utils
@@ -56,6 +58,20 @@ class ImageUtilsTest(tf.test.TestCase):
                                        image_shape)
       self.assertAllEqual(images[i], self.evaluate(decoded))
 
+  def test_encode_variable_shapes(self):
+    shapes = [[24, 24, 3], [10, 32, 3], [16, 8, 1], [24, 24, 3]]
+    images = [self._random_image(shape) for shape in shapes]
+    with tf.Graph().as_default():
+      encoder = image_utils.ImagePNGEncoder()
+      with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        encoded_images = list(executor.map(encoder.encode, images))
+      # One encoding op per number of channels
+      self.assertEqual([1, 3], sorted(encoder._encoding_ops))
+      with self.test_session() as sess:
+        for image, encoded in zip(images, encoded_images):
+          decoded = image_utils.decode_png(encoded, image.shape)
+          self.assertAllEqual(image, sess.run(decoded))
+
 
 if __name__ == "__main__":
   tf.test.main()
@@ -20,7 +20,6 @@ from __future__ import division
 from __future__ import print_function
 
 import functools
-import random
 
 import numpy as np
 import six.moves.urllib as urllib
@@ -97,9 +96,10 @@ class MNIST(dataset_builder.GeneratorBasedDatasetBuilder):
     return file_format_adapter.TFRecordExampleAdapter(example_spec)
 
   def _preprocess(self, record):
-    record["input"] = image_utils.decode_png(
-        record.pop("input/encoded"),
-        [_MNIST_IMAGE_SIZE, _MNIST_IMAGE_SIZE, 1])
+    if "input/encoded" in record:  # Not read if as_dataset(features=...)
+      record["input"] = image_utils.decode_png(
+          record.pop("input/encoded"),
+          [_MNIST_IMAGE_SIZE, _MNIST_IMAGE_SIZE, 1])
     return record
 
 
@@ -121,9 +121,12 @@ def _generate_mnist_examples(nb_examples, data_path, label_path):
   """
   images = _extract_mnist_images(data_path, nb_examples)
   labels = _extract_mnist_labels(label_path, nb_examples)
-  # Shuffle the data to make sure classes are well distributed.
-  data = list(zip(images, labels))
-  random.shuffle(data)
+  # Shuffle the data to make sure classes are well distributed. Only the
+  # indices are shuffled: the images of local files are lazily read from the
+  # memory-mapped file, so the memory usage does not depend on the number of
+  # examples.
+  permutation = np.random.permutation(nb_examples)
+  data = ((images[i], labels[i]) for i in permutation)
 
   return image_utils.image_classification_generator(data)
 
@@ -133,13 +136,31 @@ class FashionMNIST(MNIST):
 
 
 def _extract_mnist_images(image_filepath, num_images):
+  """Returns the images as a `np.array`.
+
+  Local files are memory-mapped (read-only), so the images are lazily read.
+  Other files (e.g. on GCS) are read in memory.
+
+  Args:
+    image_filepath (str): path to the (extracted) idx file of the images.
+    num_images (int): number of images of the file.
+
+  Returns:
+    `np.array` of shape `(num_images, 28, 28, 1)`.
+  """
+  shape = (num_images, _MNIST_IMAGE_SIZE, _MNIST_IMAGE_SIZE, 1)
+  if "://" not in image_filepath:
+    return np.memmap(
+        image_filepath,
+        dtype=np.uint8,
+        mode="r",
+        offset=16,  # header
+        shape=shape,
+    )
   with tf.gfile.Open(image_filepath, "rb") as f:
     f.read(16)  # header
-    buf = f.read(_MNIST_IMAGE_SIZE * _MNIST_IMAGE_SIZE * num_images)
-    data = np.frombuffer(
-        buf, dtype=np.uint8).reshape(num_images, _MNIST_IMAGE_SIZE,
-                                     _MNIST_IMAGE_SIZE, 1)
-    return data
+    buf = f.read(int(np.prod(shape)))
+    return np.frombuffer(buf, dtype=np.uint8).reshape(shape)
 
 
 def _extract_mnist_labels(labels_filepath, num_labels):
@@ -0,0 +1,95 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for tensorflow_datasets.image.mnist."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.image import image_utils
+from tensorflow_datasets.image import mnist
+
+_NUM_EXAMPLES = 20
+
+
+def _write_mnist_files(dirname):
+  """Write fake images and labels in the idx format."""
+  images = np.random.randint(
+      256, size=(_NUM_EXAMPLES, 28, 28, 1), dtype=np.uint8)
+  labels = np.arange(_NUM_EXAMPLES, dtype=np.uint8) % 10
+  data_path = os.path.join(dirname, "images-idx3-ubyte")
+  label_path = os.path.join(dirname, "labels-idx1-ubyte")
+  with tf.gfile.Open(data_path, "wb") as f:
+    f.write(b"\0" * 16 + images.tobytes())
+  with tf.gfile.Open(label_path, "wb") as f:
+    f.write(b"\0" * 8 + labels.tobytes())
+  return images, labels, data_path, label_path
+
+
+class MnistTest(tf.test.TestCase):
+
+  def test_extract_mnist(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      images, labels, data_path, label_path = _write_mnist_files(tmp_dir)
+      extracted_images = mnist._extract_mnist_images(data_path, _NUM_EXAMPLES)
+      self.assertIsInstance(extracted_images, np.memmap)
+      self.assertAllEqual(images, extracted_images)
+      self.assertAllEqual(
+          labels, mnist._extract_mnist_labels(label_path, _NUM_EXAMPLES))
+
+  def test_extract_mnist_not_local(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      images, _, data_path, _ = _write_mnist_files(tmp_dir)
+      # Read with tf.gfile (e.g. from GCS) instead of being memory-mapped
+      with tf.gfile.Open(data_path, "rb") as f:
+        content = f.read()
+      open_mock = tf.test.mock.mock_open(read_data=content)
+      with tf.test.mock.patch.object(tf.gfile, "Open", open_mock):
+        extracted_images = mnist._extract_mnist_images(
+            "gs://bucket/images-idx3-ubyte", _NUM_EXAMPLES)
+      open_mock.assert_called_once_with("gs://bucket/images-idx3-ubyte", "rb")
+      self.assertNotIsInstance(extracted_images, np.memmap)
+      self.assertAllEqual(images, extracted_images)
+
+  def test_generate_mnist_examples(self):
+    with test_utils.tmp_dir(self.get_temp_dir()) as tmp_dir:
+      images, labels, data_path, label_path = _write_mnist_files(tmp_dir)
+      examples = list(mnist._generate_mnist_examples(
+          nb_examples=_NUM_EXAMPLES,
+          data_path=data_path,
+          label_path=label_path,
+      ))
+      self.assertEqual(_NUM_EXAMPLES, len(examples))
+
+      # All the examples are yielded (in a shuffled order)
+      expected = {
+          (images[i].tobytes(), labels[i]) for i in range(_NUM_EXAMPLES)
+      }
+      generated = set()
+      for example in examples:
+        image = self.evaluate(
+            image_utils.decode_png(example["input/encoded"], [28, 28, 1]))
+        generated.add((image.tobytes(), example["target"]))
+      self.assertEqual(expected, generated)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -0,0 +1,255 @@
+# coding=utf-8
+# Copyright 2018 The TensorFlow Datasets Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark of the reading of the datasets (`as_dataset`, `numpy_iterator`).
+
+Generates MNIST and CIFAR shaped synthetic datasets with `download_and_prepare`
+(nothing is downloaded), then reads their TRAIN split in each read mode:
+
+  * `as_dataset`: batches of decoded examples, in graph mode.
+  * `as_dataset_sequential`: same, but decoding the examples sequentially
+    instead of with an autotuned parallelism (A/B of `_num_parallel_calls`).
+  * `as_dataset_features`: only the labels (`features=["target"]`), so the
+    images are neither parsed nor decoded (no bytes/sec reported).
+  * `as_dataset_subsplit`: batches of the first 10% of the split.
+  * `numpy_iterator`: decoded examples, one at a time.
+
+For each mode, reports the examples/sec, the bytes/sec of the records read, the
+latency of the first element (including the construction of the pipeline) and
+the peak resident memory of the process.
+
+Run with:
+
+```
+python -m tensorflow_datasets.image.read_benchmark --benchmarks=.
+```
+
+The size of the datasets is set with `--num_examples` and `--num_shards`. To
+benchmark other image shapes, pass e.g. `--image_shape=64,64,3` (reported as
+`64x64x3_*`).
+
+The results are logged. To also write them as `BenchmarkEntries` protos (one
+file per benchmark), to compare them across commits, set
+`TEST_REPORT_FILE_PREFIX` (e.g. `TEST_REPORT_FILE_PREFIX=/tmp/read_`).
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow_datasets.core import dataset_builder
+from tensorflow_datasets.core import dataset_utils
+from tensorflow_datasets.core import file_format_adapter
+from tensorflow_datasets.core import test_utils
+from tensorflow_datasets.image import benchmark_utils
+from tensorflow_datasets.image import image_utils
+
+flags = tf.flags
+FLAGS = flags.FLAGS
+
+flags.DEFINE_integer("num_examples", 10000,
+                     "Number of examples of the synthetic datasets.")
+flags.DEFINE_integer("num_shards", 10,
+                     "Number of shards of the synthetic datasets.")
+flags.DEFINE_list("image_shape", None,
+                  "Shape height,width,channels of the images of an additional "
+                  "benchmark (none by default).")
+
+_BATCH_SIZE = 128
+
+
+class SyntheticImages(dataset_builder.GeneratorBasedDatasetBuilder):
+  """Random images and labels, generated locally.
+
+  The examples have the same features as the MNIST and CIFAR datasets and are
+  written and read by the same code, but nothing is downloaded.
+
+  Like the builders of the tests, it is defined in the module using it, so it
+  is only registered (and listed by `tfds.list_builders()`) when the benchmark
+  runs.
+  """
+
+  def __init__(self, image_shape=benchmark_utils.MNIST_SHAPE, num_examples=10000,
+               num_shards=10, num_parallel_calls=dataset_utils.AUTOTUNE,
+               **kwargs):
+    """Constructs a synthetic dataset.
+
+    Args:
+      image_shape (tuple<int>): shape of the images, `(height, width,
+        channels)`.
+      num_examples (int): number of examples of the TRAIN split.
+      num_shards (int): number of shards of the TRAIN split.
+      num_parallel_calls (int): number of examples decoded in parallel when
+        reading (None to decode them sequentially).
+      **kwargs: See DatasetBuilder.__init__.
+    """
+    super(SyntheticImages, self).__init__(**kwargs)
+    self._image_shape = tuple(image_shape)
+    self._num_examples = num_examples
+    self._num_shards = num_shards
+    self._parallel_calls = num_parallel_calls
+
+  def _dataset_split_generators(self, dl_manager):
+    del dl_manager  # Nothing is downloaded
+    split_files = self._split_files(
+        split=dataset_builder.Split.TRAIN, num_shards=self._num_shards)
+    return [
+        dataset_builder.SplitGenerator(generator_fn=self._generate_examples,
+                                       split_files=[split_files]),
+    ]
+
+  def _generate_examples(self):
+    random_state = np.random.RandomState(0)
+    images = random_state.randint(
+        256, size=(self._num_examples,) + self._image_shape, dtype=np.uint8)
+    labels = random_state.randint(10, size=self._num_examples)
+    return image_utils.image_classification_generator(zip(images, labels))
+
+  @property
+  def _file_format_adapter(self):
+    example_spec = {
+        "input/encoded": tf.FixedLenFeature(tuple(), tf.string),
+        "target": tf.FixedLenFeature(tuple(), tf.int64),
+    }
+    return file_format_adapter.TFRecordExampleAdapter(example_spec)
+
+  @property
+  def _num_parallel_calls(self):
+    return self._parallel_calls
+
+  def _preprocess(self, record):
+    if "input/encoded" in record:  # Not read if as_dataset(features=...)
+      record["input"] = image_utils.decode_png(
+          record.pop("input/encoded"), list(self._image_shape))
+    return record
+
+
+def _as_dataset_batches(builder, **as_dataset_kwargs):
+  """Yields the size of the batches read by `as_dataset`."""
+  with tf.Graph().as_default():
+    dataset = builder.as_dataset(**as_dataset_kwargs).batch(_BATCH_SIZE)
+    next_batch = dataset.make_one_shot_iterator().get_next()
+    with tf.Session() as sess:
+      while True:
+        try:
+          batch = sess.run(next_batch)
+        except tf.errors.OutOfRangeError:
+          return
+        yield len(batch["target"])
+
+
+def _numpy_iterator_examples(builder, **as_dataset_kwargs):
+  """Yields 1 for each example read by `numpy_iterator`."""
+  for _ in builder.numpy_iterator(**as_dataset_kwargs):
+    yield 1
+
+
+class ReadBenchmark(tf.test.Benchmark):
+  """Read throughput of the datasets."""
+
+  def _report(self, name, batch_sizes, bytes_per_example):
+    """Reads all the elements and reports the metrics.
+
+    Args:
+      name (str): name of the benchmark.
+      batch_sizes (generator): lazily builds the input pipeline and yields the
+        number of examples of each element read.
+      bytes_per_example (float): average size of the records on disk, or None
+        if the images are not read (then no bytes/sec is reported).
+    """
+    benchmark_utils.reset_peak_rss()
+    start_time = time.time()
+    start_cpu_time = benchmark_utils.cpu_time()
+    num_examples = next(batch_sizes, 0)
+    first_element_latency = time.time() - start_time
+    num_examples += sum(batch_sizes)
+    wall_time = time.time() - start_time
+    cpu_time = benchmark_utils.cpu_time() - start_cpu_time
+
+    extras = {
+        "examples_per_sec": num_examples / wall_time,
+        "first_element_latency": first_element_latency,
+        "peak_rss_bytes": benchmark_utils.peak_rss(),
+        "cpu_utilization": cpu_time / wall_time,
+    }
+    if bytes_per_example is not None:
+      extras["bytes_per_sec"] = num_examples * bytes_per_example / wall_time
+    self.report_benchmark(
+        name=name, iters=num_examples, wall_time=wall_time, extras=extras)
+
+  def _benchmark(self, name, image_shape):
+    with test_utils.tmp_dir() as tmp_dir:
+      builder = SyntheticImages(
+          image_shape=image_shape,
+          num_examples=FLAGS.num_examples,
+          num_shards=FLAGS.num_shards,
+          data_dir=tmp_dir)
+      builder.download_and_prepare()
+      split_files = builder._split_files(  # pylint: disable=protected-access
+          split=dataset_builder.Split.TRAIN, num_shards=None)
+      num_bytes = sum(
+          tf.gfile.Stat(f).length
+          for f in tf.gfile.Glob(split_files.filepattern))
+      bytes_per_example = num_bytes / FLAGS.num_examples
+
+      train = dataset_builder.Split.TRAIN
+      self._report(
+          name + "_as_dataset",
+          _as_dataset_batches(builder, split=train),
+          bytes_per_example)
+      # Reads the same files
+      sequential_builder = SyntheticImages(
+          image_shape=image_shape,
+          num_examples=FLAGS.num_examples,
+          num_shards=FLAGS.num_shards,
+          num_parallel_calls=None,
+          data_dir=tmp_dir)
+      self._report(
+          name + "_as_dataset_sequential",
+          _as_dataset_batches(sequential_builder, split=train),
+          bytes_per_example)
+      self._report(
+          name + "_as_dataset_features",
+          _as_dataset_batches(builder, split=train, features=["target"]),
+          None)  # The images are not parsed
+      self._report(
+          name + "_as_dataset_subsplit",
+          _as_dataset_batches(builder, split="train[:10%]"),
+          bytes_per_example)
+      self._report(
+          name + "_numpy_iterator",
+          _numpy_iterator_examples(builder, split=train),
+          bytes_per_example)
+
+  def benchmark_mnist(self):
+    self._benchmark("mnist", benchmark_utils.MNIST_SHAPE)
+
+  def benchmark_cifar(self):
+    self._benchmark("cifar", benchmark_utils.CIFAR_SHAPE)
+
+  def benchmark_image_shape(self):
+    if not FLAGS.image_shape:
+      return
+    image_shape = [int(dim) for dim in FLAGS.image_shape]
+    self._benchmark("x".join(FLAGS.image_shape), image_shape)
+
+
+if __name__ == "__main__":
+  tf.test.main()